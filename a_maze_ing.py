@@ -2,12 +2,15 @@
 
 import sys
 import curses
-from typing import Tuple
+from typing import List, Tuple
 
+from mazegen import instrument
 from mazegen.maze_generator import Maze
 from mazegen.parser import parse_file
 from mazegen.curses_renderer import render_maze_curses
 from mazegen.output_writer import write_output_file
+from mazegen.placement import place_entry_exit
+from mazegen.stencil import Stencil
 
 
 def _validate_entry_exit(
@@ -23,27 +26,72 @@ def _validate_entry_exit(
         raise ValueError("ENTRY or EXIT is inside the 42 pattern")
 
 
+def _profile_flags(argv: List[str]) -> List[str]:
+    """Enable instrumentation for ``--profile`` flags; return the rest.
+
+    ``--profile`` writes the report to the default path and
+    ``--profile=PATH`` to ``PATH``; ``--profile-cprofile`` also records
+    a cProfile ``.prof`` next to it.
+    """
+    rest: List[str] = []
+    path = None
+    cprofile = False
+    for arg in argv:
+        if arg == "--profile":
+            path = instrument.DEFAULT_REPORT
+        elif arg.startswith("--profile="):
+            path = arg.split("=", 1)[1] or instrument.DEFAULT_REPORT
+        elif arg == "--profile-cprofile":
+            cprofile = True
+        else:
+            rest.append(arg)
+    if cprofile and path is None:
+        path = instrument.DEFAULT_REPORT
+    if path is not None:
+        instrument.enable(path, cprofile=cprofile)
+    return rest
+
+
 def main() -> None:
     """Main entry point for A-maze-ing interactive maze generator."""
     try:
-        config_file = sys.argv[1] if len(sys.argv) > 1 else "config.txt"
-        config = parse_file(config_file)
+        args = _profile_flags(sys.argv[1:])
+        config_file = args[0] if args else "config.txt"
+        with instrument.span("parse"):
+            config = parse_file(config_file)
 
+        stencil = None
+        if config.stencil:
+            try:
+                stencil = Stencil.load(config.stencil)
+            except OSError as e:
+                raise ValueError(f"cannot read STENCIL: {e}")
         maze = Maze(config.width, config.height)
         maze.generate_maze(seed=config.seed, algo=config.algo,
-                           perfect=config.perfect)
+                           perfect=config.perfect,
+                           tile_size=config.tile_size,
+                           random_source=config.random_source,
+                           loops=config.loops,
+                           loop_density=config.loop_density,
+                           braid=config.braid,
+                           stencil=stencil)
 
-        if maze.pattern_origin is None:
+        if stencil is None and maze.pattern_origin is None:
             print(
                 "Error: maze too small to place the 42 pattern. "
                 "Continuing without it."
             )
 
-        _validate_entry_exit(maze, config.entry, config.exit)
+        entry, exit_pos = place_entry_exit(maze, config.entry, config.exit,
+                                           config.auto_border)
+        _validate_entry_exit(maze, entry, exit_pos)
 
         try:
             write_output_file(config.output_file, maze,
-                              config.entry, config.exit)
+                              entry, exit_pos,
+                              config.move_encoding,
+                              config.compression,
+                              config.compression_thread)
         except ValueError as e:
             print(f"Error: {e}")
             sys.exit(1)
@@ -51,12 +99,19 @@ def main() -> None:
         curses.wrapper(
             render_maze_curses,
             maze,
-            config.entry,
-            config.exit,
+            entry,
+            exit_pos,
             config.algo,
             config.seed,
             config.perfect,
             config.output_file,
+            {"stencil": stencil, "loops": config.loops,
+             "loop_density": config.loop_density, "braid": config.braid,
+             "random_source": config.random_source,
+             "tile_size": config.tile_size},
+            config.move_encoding,
+            config.compression,
+            config.compression_thread,
         )
 
     except FileNotFoundError:
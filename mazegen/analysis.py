@@ -0,0 +1,274 @@
+"""Maze statistics and difficulty metrics.
+
+``analyze`` works directly on the wall grid in linear time. The grid is
+first reduced to one byte of open directions per cell (a passage counts
+only when both cells are open and inside the grid); every metric is then
+a handful of passes over that buffer:
+
+- dead ends and junctions are cells of degree 1 and of degree 3 or more;
+- corridors are the runs of degree-2 cells between two other cells, each
+  walked once from both ends;
+- the solution and the diameter come from breadth-first searches; the
+  diameter is measured in the component holding the entry with a double
+  sweep, which is exact for perfect mazes and a lower bound with loops;
+- the loop count is the cycle rank ``passages - cells + components``.
+
+With NumPy installed, grids of at least ``VECTORIZE_CELLS`` cells build
+the direction buffer with array operations. ``direction_buffer``,
+``neighbor_table``, ``bfs`` and ``count_components`` are shared by the
+other modules that search the passage graph.
+"""
+
+from array import array
+from dataclasses import dataclass, field
+from typing import AbstractSet, Dict, List, Optional, Sequence, Tuple
+
+from .maze_generator import Maze
+from .output_writer import read_output_file
+from .stencil import row_masks
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised without numpy
+    np = None  # type: ignore[assignment]
+
+VECTORIZE_CELLS = 1 << 16
+_INVERT = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+N, E, S, W = Maze.N, Maze.E, Maze.S, Maze.W
+
+
+@dataclass
+class MazeStats:
+    """Structural metrics of one maze."""
+
+    width: int
+    height: int
+    open_cells: int
+    passages: int
+    components: int
+    dead_ends: int
+    junctions: int
+    loops: int
+    diameter: int
+    corridor_lengths: Dict[int, int] = field(default_factory=dict)
+    solution_length: Optional[int] = None
+    solution_fraction: Optional[float] = None
+
+
+def _open_dirs_python(
+    walls: Sequence[Sequence[int]],
+    blocked: AbstractSet[Tuple[int, int]],
+    width: int,
+    height: int,
+) -> bytearray:
+    """Return per-cell open-direction bits using plain loops."""
+    dirs = bytearray(width * height)
+    masks = row_masks(blocked, width)
+    free = bytes(width)
+    for y in range(height):
+        row = walls[y]
+        here = masks.get(y, free)
+        below = masks.get(y + 1, free)
+        base = y * width
+        for x in range(width):
+            if here[x]:
+                continue
+            cell = base + x
+            if (x + 1 < width and not row[x] & E
+                    and not here[x + 1]):
+                dirs[cell] |= E
+                dirs[cell + 1] |= W
+            if (y + 1 < height and not row[x] & S
+                    and not below[x]):
+                dirs[cell] |= S
+                dirs[cell + width] |= N
+    return dirs
+
+
+def _open_dirs_numpy(
+    walls: Sequence[Sequence[int]],
+    blocked: AbstractSet[Tuple[int, int]],
+    width: int,
+    height: int,
+) -> bytearray:
+    """Return per-cell open-direction bits using array operations."""
+    grid = np.array(walls, dtype=np.uint8).reshape(height, width)
+    free = np.ones((height, width), dtype=bool)
+    for y, mask in row_masks(blocked, width).items():
+        if 0 <= y < height:
+            free[y] = np.frombuffer(mask, dtype=np.uint8) == 0
+    east = (grid[:, :-1] & E == 0) & free[:, :-1] & free[:, 1:]
+    south = (grid[:-1] & S == 0) & free[:-1] & free[1:]
+    dirs = np.zeros((height, width), dtype=np.uint8)
+    dirs[:, :-1] |= east * np.uint8(E)
+    dirs[:, 1:] |= east * np.uint8(W)
+    dirs[:-1] |= south * np.uint8(S)
+    dirs[1:] |= south * np.uint8(N)
+    return bytearray(dirs.tobytes())
+
+
+def direction_buffer(
+    walls: Sequence[Sequence[int]],
+    blocked: AbstractSet[Tuple[int, int]],
+    width: int,
+    height: int,
+    vectorized: Optional[bool] = None,
+) -> bytearray:
+    """Build the open-direction buffer, with NumPy for large grids.
+
+    ``vectorized`` forces (True) or disables (False) the NumPy path.
+    """
+    if vectorized is None:
+        vectorized = np is not None and width * height >= VECTORIZE_CELLS
+    if not vectorized:
+        return _open_dirs_python(walls, blocked, width, height)
+    if np is None:
+        raise ValueError("the vectorized analysis needs NumPy")
+    return _open_dirs_numpy(walls, blocked, width, height)
+
+
+def neighbor_table(width: int) -> List[Tuple[int, ...]]:
+    """Map each open-direction byte to its neighbor offsets."""
+    steps = ((N, -width), (E, 1), (S, width), (W, -1))
+    return [tuple(off for bit, off in steps if mask & bit)
+            for mask in range(16)]
+
+
+def bfs(
+    nbrs: List[Tuple[int, ...]], dirs: bytearray, start: int
+) -> Tuple["array[int]", List[int]]:
+    """Return distances from ``start`` (-1 if unreachable) and the order."""
+    dist = array("i", [-1]) * len(dirs)
+    dist[start] = 0
+    order = [start]
+    for cell in order:
+        step = dist[cell] + 1
+        for off in nbrs[dirs[cell]]:
+            nxt = cell + off
+            if dist[nxt] < 0:
+                dist[nxt] = step
+                order.append(nxt)
+    return dist, order
+
+
+def count_components(
+    nbrs: List[Tuple[int, ...]], dirs: bytearray, free: bytearray
+) -> int:
+    """Count the connected components of the open cells."""
+    seen = bytearray(free.translate(bytes.maketrans(b"\0\1", b"\1\0")))
+    count = 0
+    start = seen.find(0)
+    while start >= 0:
+        count += 1
+        seen[start] = 1
+        stack = [start]
+        while stack:
+            cell = stack.pop()
+            for off in nbrs[dirs[cell]]:
+                if not seen[cell + off]:
+                    seen[cell + off] = 1
+                    stack.append(cell + off)
+        start = seen.find(0, start + 1)
+    return count
+
+
+def _corridors(
+    nbrs: List[Tuple[int, ...]], dirs: bytearray, degree: bytearray
+) -> Dict[int, int]:
+    """Histogram corridor lengths (passages between non-degree-2 cells)."""
+    walks: Dict[int, int] = {}
+    for cell, deg in enumerate(degree):
+        if deg == 0 or deg == 2:
+            continue
+        for off in nbrs[dirs[cell]]:
+            prev, cur, length = cell, cell + off, 1
+            while degree[cur] == 2:
+                a, b = nbrs[dirs[cur]]
+                prev, cur = cur, (cur + a if cur + a != prev else cur + b)
+                length += 1
+            walks[length] = walks.get(length, 0) + 1
+    return {length: count // 2 for length, count in sorted(walks.items())}
+
+
+def analyze_walls(
+    walls: Sequence[Sequence[int]],
+    blocked: Optional[AbstractSet[Tuple[int, int]]] = None,
+    entry: Optional[Tuple[int, int]] = None,
+    exit_pos: Optional[Tuple[int, int]] = None,
+    vectorized: Optional[bool] = None,
+) -> MazeStats:
+    """Compute ``MazeStats`` for a grid of wall masks.
+
+    Args:
+        walls: Rows of 4-bit wall masks.
+        blocked: Cells excluded from the maze (the 42 pattern).
+        entry: Start of the solution; needed with ``exit_pos`` for the
+            solution metrics.
+        exit_pos: End of the solution.
+        vectorized: Force (True) or disable (False) the NumPy path; by
+            default it is used for large grids when NumPy is available.
+    """
+    height = len(walls)
+    width = len(walls[0]) if height else 0
+    blocked = blocked or set()
+    size = width * height
+    dirs = direction_buffer(walls, blocked, width, height, vectorized)
+    popcount = bytes(bin(mask).count("1") for mask in range(256))
+    degree = dirs.translate(popcount)
+    free = bytearray(b"\1") * size
+    for y, mask in row_masks(blocked, width).items():
+        if 0 <= y < height:
+            free[y * width:(y + 1) * width] = mask.translate(_INVERT)
+
+    open_cells = size - free.count(0)
+    passages = sum(degree) // 2
+    nbrs = neighbor_table(width)
+    components = count_components(nbrs, dirs, free)
+
+    diameter = 0
+    solution_length = None
+    solution_fraction = None
+    start = free.find(1)
+    if entry is not None and free[entry[1] * width + entry[0]]:
+        start = entry[1] * width + entry[0]
+    if start >= 0:
+        dist, order = bfs(nbrs, dirs, start)
+        if entry is not None and exit_pos is not None:
+            goal = dist[exit_pos[1] * width + exit_pos[0]]
+            if goal >= 0 and start == entry[1] * width + entry[0]:
+                solution_length = goal
+                solution_fraction = (goal + 1) / open_cells
+        far_dist, far_order = bfs(nbrs, dirs, order[-1])
+        diameter = far_dist[far_order[-1]]
+
+    return MazeStats(
+        width=width,
+        height=height,
+        open_cells=open_cells,
+        passages=passages,
+        components=components,
+        dead_ends=degree.count(1),
+        junctions=degree.count(3) + degree.count(4),
+        loops=passages - open_cells + components,
+        diameter=diameter,
+        corridor_lengths=_corridors(nbrs, dirs, degree),
+        solution_length=solution_length,
+        solution_fraction=solution_fraction,
+    )
+
+
+def analyze(
+    maze: Maze,
+    entry: Optional[Tuple[int, int]] = None,
+    exit_pos: Optional[Tuple[int, int]] = None,
+    vectorized: Optional[bool] = None,
+) -> MazeStats:
+    """Compute ``MazeStats`` for an in-memory maze."""
+    return analyze_walls(maze.walls, maze.blocked_cells, entry, exit_pos,
+                         vectorized)
+
+
+def analyze_file(path: str, vectorized: Optional[bool] = None) -> MazeStats:
+    """Compute ``MazeStats`` for a maze output file."""
+    maze, entry, exit_pos, _moves = read_output_file(path)
+    return analyze(maze, entry, exit_pos, vectorized)
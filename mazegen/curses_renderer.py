@@ -1,8 +1,9 @@
 import curses
 import random
 import time
-from typing import List, Optional, Set, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 
+from . import instrument
 from .maze_generator import Maze
 from .ascii_renderer import AsciiCorner, _is_wall_between
 from .path_finder import bfs_find_path
@@ -300,8 +301,19 @@ def render_maze_curses(
     seed: Optional[int] = None,
     perfect: bool = True,
     output_file: Optional[str] = None,
+    options: Optional[Dict[str, Any]] = None,
+    move_encoding: str = "plain",
+    compression: Optional[str] = None,
+    compression_thread: bool = False,
 ) -> None:
-    """Render maze using curses with keyboard controls."""
+    """Render maze using curses with keyboard controls.
+
+    The view starts on ``maze`` as generated by the caller; ``options``
+    holds the other ``generate_maze`` keywords (``stencil``, ``loops``,
+    ``random_source``, ``tile_size`` and so on) reused by every
+    regeneration. The S key saves with ``move_encoding``,
+    ``compression`` and ``compression_thread``, like the CLI.
+    """
     curses.curs_set(0)
     stdscr.nodelay(False)
     stdscr.keypad(True)
@@ -322,10 +334,13 @@ def render_maze_curses(
     h = maze.height
     color_42 = 3
     color_wall = 4
-    algo_cycle = ["dfs", "prim", "hunt"]
+    algo_cycle = [
+        "dfs", "prim", "hunt", "kruskal", "binarytree", "sidewinder",
+    ]
     current_algo = algo if algo in algo_cycle else "dfs"
     current_perfect = perfect
     current_seed = seed
+    generate_options = dict(options or {})
 
     status_msg = [""]
     start, end = setup_phase(stdscr, start, end)
@@ -489,6 +504,8 @@ def render_maze_curses(
                           display_status)
 
         stdscr.refresh()
+        instrument.count("frames_rendered")
+        instrument.mark("first_frame")
 
     def _update_path_state() -> None:
         try:
@@ -538,11 +555,20 @@ def render_maze_curses(
         path_set.clear()
         path_ref[0] = None
         path_found_ref[0] = False
+        extra = generate_options
+        if current_perfect:
+            # Loops and braiding only apply to imperfect mazes (T key).
+            extra = {key: value for key, value in extra.items()
+                     if key not in ("loops", "loop_density", "braid")}
         maze.generate_maze(
             seed=current_seed,
             algo=current_algo,
-            perfect=current_perfect
+            perfect=current_perfect,
+            **extra
         )
+        _reset_view(status)
+
+    def _reset_view(status: str) -> None:
         _update_path_state()
         new_horiz, new_vert = _compute_wall_grids(maze)
         horiz[:] = new_horiz
@@ -572,8 +598,8 @@ def render_maze_curses(
         path_set.update(saved_path)
         needs_full_redraw[0] = True
 
-    # Animate initial generation first, then render solved-path animation.
-    _regenerate_maze("Ready to play (Use ARROWS)")
+    # Show the maze the caller generated, then animate its solved path.
+    _reset_view("Ready to play (Use ARROWS)")
 
     # Draw the completed maze first before path animation
     if path_ref[0]:
@@ -632,7 +658,9 @@ def render_maze_curses(
                 status_msg[0] = "Error: no output file configured."
             else:
                 try:
-                    write_output_file(output_file, maze, start, end)
+                    write_output_file(output_file, maze, start, end,
+                                      move_encoding, compression,
+                                      compression_thread)
                     status_msg[0] = f"Saved to {output_file}."
                 except Exception as e:
                     status_msg[0] = f"Error: {e}"
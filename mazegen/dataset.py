@@ -0,0 +1,350 @@
+"""Bulk maze datasets in one memory-mapped file.
+
+``write_dataset`` generates ``count`` mazes of one size (maze ``i`` uses
+seed ``seed_start + i``) on a process pool and stores them in a single
+preallocated file, so millions of mazes cost one file instead of
+millions. The layout is fixed-size, so maze ``i`` is read in O(1):
+
+- ``DATASET_HEADER`` (72 bytes): magic ``AMZD``, version, width, height,
+  count, seed_start, algo and random source (NUL-padded ASCII), the
+  placement mode and the perfect flag;
+- ``count`` records of ``record_size`` bytes (a multiple of 8), each
+  ``RECORD_HEAD`` (done flag, entry x/y, exit x/y, solution length or -1,
+  seed) followed by one wall-mask byte per cell, row-major.
+
+All integers are little-endian. A record's done flag is only set once its
+contents have been flushed, so an interrupted run is resumed by calling
+``write_dataset`` again with the same arguments: finished records are
+kept and only the missing ones are generated.
+
+``MazeDataset`` reads records back as mazes, as raw wall bytes, or (with
+NumPy) as one structured array over the whole file::
+
+    python -m mazegen.dataset mazes.amzd --size 16x16 --count 1000000
+"""
+
+import argparse
+import itertools
+import mmap
+import os
+import struct
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Deque, List, Optional, Sequence, Tuple
+
+from .maze_generator import Maze
+from .path_finder import bfs_flat_path
+from .placement import place_entry_exit
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised without numpy
+    np = None  # type: ignore[assignment]
+
+MAGIC = b"AMZD"
+VERSION = 1
+DATASET_HEADER = struct.Struct("<4sIIIQq16s16sBB6x")
+RECORD_HEAD = struct.Struct("<B3xiiiiiq")
+PLACEMENTS = ("corners", "auto", "border")
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """Everything that determines a dataset's contents."""
+
+    width: int
+    height: int
+    count: int
+    seed_start: int = 0
+    algo: str = "prim"
+    perfect: bool = True
+    random_source: str = "std"
+    placement: str = "corners"
+
+    @property
+    def record_size(self) -> int:
+        """Bytes per record, padded to a multiple of 8."""
+        size = RECORD_HEAD.size + self.width * self.height
+        return size + -size % 8
+
+    @property
+    def file_size(self) -> int:
+        """Total size of the dataset file."""
+        return DATASET_HEADER.size + self.count * self.record_size
+
+    def header(self) -> bytes:
+        """Pack the file header."""
+        return DATASET_HEADER.pack(
+            MAGIC, VERSION, self.width, self.height, self.count,
+            self.seed_start, self.algo.encode("ascii"),
+            self.random_source.encode("ascii"),
+            PLACEMENTS.index(self.placement), self.perfect)
+
+    @classmethod
+    def from_header(cls, data: bytes) -> "DatasetSpec":
+        """Unpack a file header."""
+        (magic, version, width, height, count, seed_start, algo, source,
+         placement, perfect) = DATASET_HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a maze dataset file")
+        return cls(width, height, count, seed_start,
+                   algo.rstrip(b"\0").decode("ascii"), bool(perfect),
+                   source.rstrip(b"\0").decode("ascii"),
+                   PLACEMENTS[placement])
+
+
+@dataclass
+class DatasetRecord:
+    """One maze read from a dataset."""
+
+    seed: int
+    maze: Maze
+    entry: Tuple[int, int]
+    exit_pos: Tuple[int, int]
+    solution_length: Optional[int]
+
+
+def _build_records(spec: DatasetSpec, indices: Sequence[int]) -> List[bytes]:
+    """Generate and pack the records for ``indices``; runs in a worker."""
+    maze = Maze(spec.width, spec.height)
+    records = []
+    for index in indices:
+        seed = spec.seed_start + index
+        maze.generate_maze(seed=seed, algo=spec.algo, perfect=spec.perfect,
+                           random_source=spec.random_source)
+        if spec.placement == "corners":
+            entry, exit_pos = (0, 0), (spec.width - 1, spec.height - 1)
+        else:
+            entry, exit_pos = place_entry_exit(
+                maze, None, None, spec.placement == "border")
+        path = bfs_flat_path(maze, entry, exit_pos)
+        head = RECORD_HEAD.pack(1, *entry, *exit_pos,
+                                len(path) - 1 if path else -1, seed)
+        body = b"".join(map(bytes, maze.walls))
+        records.append((head + body).ljust(spec.record_size, b"\0"))
+    return records
+
+
+def _open_file(path: str, spec: DatasetSpec) -> None:
+    """Create a preallocated dataset file, or check an existing one."""
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            existing = DatasetSpec.from_header(f.read(DATASET_HEADER.size))
+        if existing != spec:
+            raise ValueError(
+                f"{path} holds a different dataset ({existing}); "
+                f"remove it or use the same settings to resume")
+        if os.path.getsize(path) != spec.file_size:
+            raise ValueError(f"{path} is truncated")
+        return
+    with open(path, "wb") as f:
+        f.write(spec.header())
+        f.truncate(spec.file_size)
+
+
+def write_dataset(
+    path: str,
+    width: int,
+    height: int,
+    count: int,
+    seed_start: int = 0,
+    algo: str = "prim",
+    perfect: bool = True,
+    random_source: str = "std",
+    placement: str = "corners",
+    workers: Optional[int] = None,
+    chunk_size: int = 256,
+) -> int:
+    """Generate (or finish) a dataset file; return the records written.
+
+    Args:
+        path: Dataset file; resumed if it already exists.
+        width: Maze width.
+        height: Maze height.
+        count: Number of mazes.
+        seed_start: Seed of maze 0.
+        algo: Generation algorithm.
+        perfect: Generate perfect mazes.
+        random_source: RNG provider passed to ``generate_maze``.
+        placement: ``corners`` (top-left to bottom-right), ``auto`` or
+            ``border`` (farthest pair, see ``mazegen.placement``).
+        workers: Worker processes; defaults to the CPU count.
+        chunk_size: Mazes per worker task.
+    """
+    if placement not in PLACEMENTS:
+        raise ValueError(
+            f"placement must be one of: {', '.join(PLACEMENTS)}")
+    for name, value in (("algo", algo), ("random_source", random_source)):
+        # The header stores both in 16-byte fields; longer names would be
+        # cut and no longer match on resume.
+        if len(value.encode("ascii")) > 16:
+            raise ValueError(f"{name} must be at most 16 ASCII characters")
+    spec = DatasetSpec(width, height, count, seed_start, algo, perfect,
+                       random_source, placement)
+    _open_file(path, spec)
+    size = spec.record_size
+    with open(path, "r+b") as f, \
+            mmap.mmap(f.fileno(), spec.file_size) as data:
+
+        def offset(index: int) -> int:
+            return DATASET_HEADER.size + index * size
+
+        todo = [i for i in range(count) if not data[offset(i)]]
+        chunks = [todo[i:i + chunk_size]
+                  for i in range(0, len(todo), chunk_size)]
+
+        def store(indices: Sequence[int], records: List[bytes]) -> None:
+            # Contents reach the disk before any done flag that vouches
+            # for them.
+            for index, record in zip(indices, records):
+                data[offset(index) + 1:offset(index) + size] = record[1:]
+            data.flush()
+            for index in indices:
+                data[offset(index)] = 1
+            data.flush()
+
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            for chunk in chunks:
+                store(chunk, _build_records(spec, chunk))
+            return len(todo)
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            queued = iter(chunks)
+            pending: Deque[
+                Tuple[List[int], "Future[List[bytes]]"]] = deque(
+                (chunk, pool.submit(_build_records, spec, chunk))
+                for chunk in itertools.islice(queued, workers * 2))
+            while pending:
+                chunk, future = pending.popleft()
+                store(chunk, future.result())
+                following = next(queued, None)
+                if following is not None:
+                    pending.append((following, pool.submit(
+                        _build_records, spec, following)))
+    return len(todo)
+
+
+class MazeDataset:
+    """Random-access reader over a dataset file (memory-mapped)."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.spec = DatasetSpec.from_header(
+            self._data[:DATASET_HEADER.size])
+        if len(self._data) != self.spec.file_size:
+            self._data.close()
+            raise ValueError(f"{path} is truncated")
+        self.path = path
+
+    def __len__(self) -> int:
+        return self.spec.count
+
+    def _offset(self, index: int) -> int:
+        if not 0 <= index < self.spec.count:
+            raise IndexError(index)
+        return DATASET_HEADER.size + index * self.spec.record_size
+
+    def done(self, index: int) -> bool:
+        """True when record ``index`` has been written."""
+        return bool(self._data[self._offset(index)])
+
+    def missing(self) -> List[int]:
+        """Indices of records not written yet."""
+        return [i for i in range(len(self)) if not self.done(i)]
+
+    def walls(self, index: int) -> memoryview:
+        """Wall-mask bytes of maze ``index``, row-major, without copying."""
+        start = self._offset(index) + RECORD_HEAD.size
+        cells = self.spec.width * self.spec.height
+        return memoryview(self._data)[start:start + cells]
+
+    def __getitem__(self, index: int) -> DatasetRecord:
+        start = self._offset(index)
+        done, ex, ey, xx, xy, length, seed = RECORD_HEAD.unpack_from(
+            self._data, start)
+        if not done:
+            raise KeyError(f"maze {index} has not been written")
+        width = self.spec.width
+        maze = Maze(width, self.spec.height)
+        maze.create_42_pattern()
+        with self.walls(index) as cells:
+            for y in range(self.spec.height):
+                maze.walls[y] = list(cells[y * width:(y + 1) * width])
+        return DatasetRecord(seed, maze, (ex, ey), (xx, xy),
+                             None if length < 0 else length)
+
+    def as_numpy(self) -> Any:
+        """Return all records as one read-only NumPy structured array."""
+        if np is None:
+            raise ValueError("as_numpy needs NumPy")
+        spec = self.spec
+        dtype = np.dtype({
+            "names": ["done", "entry", "exit", "solution_length", "seed",
+                      "walls"],
+            "formats": ["u1", ("<i4", 2), ("<i4", 2), "<i4", "<i8",
+                        ("u1", (spec.height, spec.width))],
+            "offsets": [0, 4, 12, 20, 24, RECORD_HEAD.size],
+            "itemsize": spec.record_size,
+        })
+        return np.frombuffer(self._data, dtype=dtype, count=spec.count,
+                             offset=DATASET_HEADER.size)
+
+    def close(self) -> None:
+        """Unmap the file.
+
+        Views from ``walls`` and arrays from ``as_numpy`` stay valid after
+        closing; the mapping is released with the last of them.
+        """
+        try:
+            self._data.close()
+        except BufferError:
+            # Exported views keep the mmap object, and so the mapping,
+            # alive until they are garbage collected.
+            pass
+
+    def __enter__(self) -> "MazeDataset":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def _size(text: str) -> Tuple[int, int]:
+    """Parse ``WIDTHxHEIGHT``."""
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point; rerun the same command to resume."""
+    parser = argparse.ArgumentParser(
+        description="Generate a maze dataset file.")
+    parser.add_argument("path")
+    parser.add_argument("--size", type=_size, required=True,
+                        help="maze size as WIDTHxHEIGHT")
+    parser.add_argument("--count", type=int, required=True)
+    parser.add_argument("--seed-start", type=int, default=0)
+    parser.add_argument("--algo", default="prim")
+    parser.add_argument("--imperfect", action="store_true",
+                        help="generate mazes with loops")
+    parser.add_argument("--random-source", default="std")
+    parser.add_argument("--placement", choices=PLACEMENTS,
+                        default="corners")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+    width, height = args.size
+    try:
+        written = write_dataset(
+            args.path, width, height, args.count, args.seed_start,
+            args.algo, not args.imperfect, args.random_source,
+            args.placement, args.workers)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"{args.path}: wrote {written} of {args.count} mazes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Shortest path maintenance under wall edits.
+
+``DynamicSolver`` keeps the breadth-first distance field from ``start``
+and one shortest path to ``goal`` for a maze whose walls change. Each
+edit is repaired locally:
+
+- opening a wall can only shorten distances: a search starts at the cell
+  that got closer and visits only the cells that improve;
+- closing a wall only matters when it carried a shortest path (the two
+  distances differ by one). The cells that lost all their shortest-path
+  neighbors are collected level by level, then settled again from their
+  unaffected neighbors with a small Dijkstra over just those cells.
+
+When one edit affects more than ``full_search_fraction`` of the cells,
+the solver falls back to a full search. The path is kept as long as it
+is still a shortest path, so it does not jump between equal routes.
+"""
+
+import heapq
+from array import array
+from collections import deque
+from typing import Deque, List, Optional, Set, Tuple
+
+from . import instrument
+from .analysis import bfs, direction_buffer, neighbor_table
+from .maze_generator import Maze
+
+FULL_SEARCH_FRACTION = 0.25
+Point = Tuple[int, int]
+
+
+class DynamicSolver:
+    """Distance field and shortest path kept in sync with wall edits.
+
+    Edit walls through ``open_wall``/``close_wall``, or edit the maze
+    directly and report each changed wall with ``wall_changed``.
+    """
+
+    def __init__(
+        self,
+        maze: Maze,
+        start: Point,
+        goal: Point,
+        full_search_fraction: float = FULL_SEARCH_FRACTION,
+    ) -> None:
+        self.maze = maze
+        self.width = maze.width
+        self.start = start
+        self.goal = goal
+        self.limit = max(1, int(maze.width * maze.height
+                                * full_search_fraction))
+        self.nbrs = neighbor_table(maze.width)
+        self.full_searches = 0
+        self._cells: List[int] = []
+        self.refresh()
+
+    def _flat(self, point: Point) -> Optional[int]:
+        """Flat index of ``point``, or None if it cannot be on a path."""
+        x, y = point
+        if not self.maze.in_bounds(x, y) or self.maze.is_blocked(x, y):
+            return None
+        return y * self.width + x
+
+    def refresh(self) -> None:
+        """Rebuild everything from the maze with a full search."""
+        maze = self.maze
+        self.dirs = direction_buffer(maze.walls, maze.blocked_cells,
+                                     maze.width, maze.height)
+        first = self._flat(self.start)
+        if first is None:
+            self.dist = array("i", [-1]) * len(self.dirs)
+        else:
+            self.dist = bfs(self.nbrs, self.dirs, first)[0]
+        self.full_searches += 1
+        instrument.count("dynamic_full_searches")
+        self._cells = []
+        self._repair_path()
+
+    @property
+    def path(self) -> Optional[List[Point]]:
+        """Current shortest path as ``(x, y)`` cells, or None."""
+        if not self._cells:
+            return None
+        return [(cell % self.width, cell // self.width)
+                for cell in self._cells]
+
+    def distance(self, point: Point) -> Optional[int]:
+        """Distance of ``point`` from ``start``, or None if unreachable."""
+        cell = self._flat(point)
+        if cell is None or self.dist[cell] < 0:
+            return None
+        return self.dist[cell]
+
+    def set_goal(self, goal: Point) -> None:
+        """Move the goal; the distance field stays valid."""
+        self.goal = goal
+        self._cells = []
+        self._repair_path()
+
+    def set_start(self, start: Point) -> None:
+        """Move the start, which needs a full search."""
+        self.start = start
+        self.refresh()
+
+    def open_wall(self, x: int, y: int, direction: int) -> None:
+        """Open a wall of ``(x, y)`` and repair the path."""
+        if self.maze.set_wall(x, y, direction, closed=False):
+            self.wall_changed(x, y, direction)
+
+    def close_wall(self, x: int, y: int, direction: int) -> None:
+        """Close a wall of ``(x, y)`` and repair the path."""
+        if self.maze.set_wall(x, y, direction, closed=True):
+            self.wall_changed(x, y, direction)
+
+    def wall_changed(self, x: int, y: int, direction: int) -> None:
+        """Repair after the maze's wall at ``(x, y)`` was edited."""
+        dx, dy, bit, opp_bit = next(
+            d for d in Maze.dirs if d[2] == direction)
+        nx, ny = x + dx, y + dy
+        a, b = self._flat((x, y)), self._flat((nx, ny))
+        if a is None or b is None:
+            return
+        # Like the analysis buffer, the west/north cell decides.
+        wx, wy, side = (x, y, bit) if bit in (Maze.E, Maze.S) else (
+            nx, ny, opp_bit)
+        is_open = not self.maze.walls[wy][wx] & side
+        if bool(self.dirs[a] & bit) == is_open:
+            return
+        if is_open:
+            self.dirs[a] |= bit
+            self.dirs[b] |= opp_bit
+            self._shorten(a, b)
+            self._shorten(b, a)
+        else:
+            self.dirs[a] &= ~bit
+            self.dirs[b] &= ~opp_bit
+            da, db = self.dist[a], self.dist[b]
+            if da >= 0 and db >= 0 and abs(da - db) == 1:
+                self._lengthen(b if db > da else a)
+        self._repair_path()
+
+    def _shorten(self, near: int, far: int) -> None:
+        """Propagate the shortcut ``near -> far`` to every cell it helps."""
+        dist, dirs, nbrs = self.dist, self.dirs, self.nbrs
+        if dist[near] < 0 or 0 <= dist[far] <= dist[near] + 1:
+            return
+        dist[far] = dist[near] + 1
+        queue = [far]
+        for cell in queue:
+            step = dist[cell] + 1
+            for off in nbrs[dirs[cell]]:
+                nxt = cell + off
+                if dist[nxt] < 0 or dist[nxt] > step:
+                    dist[nxt] = step
+                    queue.append(nxt)
+        instrument.count("dynamic_cells_repaired", len(queue))
+
+    def _lengthen(self, root: int) -> None:
+        """Re-settle the cells that lost their support through ``root``."""
+        dist, dirs, nbrs = self.dist, self.dirs, self.nbrs
+        affected: Set[int] = set()
+        queued = {root}
+        queue: Deque[int] = deque([root])
+        # Cells come out level by level, so every lower neighbor has
+        # been decided by the time a cell checks its support.
+        while queue:
+            cell = queue.popleft()
+            level = dist[cell]
+            if any(dist[cell + off] == level - 1
+                   and cell + off not in affected
+                   for off in nbrs[dirs[cell]]):
+                continue
+            affected.add(cell)
+            if len(affected) > self.limit:
+                self.refresh()
+                return
+            for off in nbrs[dirs[cell]]:
+                nxt = cell + off
+                if dist[nxt] == level + 1 and nxt not in queued:
+                    queued.add(nxt)
+                    queue.append(nxt)
+
+        heap: List[Tuple[int, int]] = []
+        for cell in affected:
+            dist[cell] = -1
+        for cell in affected:
+            reach = [dist[cell + off] for off in nbrs[dirs[cell]]
+                     if dist[cell + off] >= 0]
+            if reach:
+                heap.append((min(reach) + 1, cell))
+        heapq.heapify(heap)
+        while heap:
+            level, cell = heapq.heappop(heap)
+            if 0 <= dist[cell] <= level:
+                continue
+            dist[cell] = level
+            for off in nbrs[dirs[cell]]:
+                nxt = cell + off
+                if nxt in affected and (dist[nxt] < 0
+                                        or dist[nxt] > level + 1):
+                    heapq.heappush(heap, (level + 1, nxt))
+        instrument.count("dynamic_cells_repaired", len(affected))
+
+    def _repair_path(self) -> None:
+        """Keep the path if still shortest, else walk back from the goal."""
+        goal = self._flat(self.goal)
+        if goal is None or self.dist[goal] < 0:
+            self._cells = []
+            return
+        dist, dirs, nbrs = self.dist, self.dirs, self.nbrs
+        cells = self._cells
+        if (len(cells) == dist[goal] + 1 and cells[-1] == goal
+                and all(dist[cell] == i for i, cell in enumerate(cells))
+                and all(b - a in nbrs[dirs[a]]
+                        for a, b in zip(cells, cells[1:]))):
+            return
+        path = [goal]
+        while dist[path[-1]]:
+            cell = path[-1]
+            path.append(next(cell + off for off in nbrs[dirs[cell]]
+                             if dist[cell + off] == dist[cell] - 1))
+        path.reverse()
+        self._cells = path
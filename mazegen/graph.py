@@ -0,0 +1,177 @@
+"""Passage-graph export in compressed sparse row (CSR) form.
+
+Node ``y * width + x`` is cell ``(x, y)``; blocked cells stay in the
+numbering with no edges, so node ids map straight back to coordinates.
+The neighbors of node ``i`` are ``indices[indptr[i]:indptr[i + 1]]``,
+sorted ascending (N, W, E, S). Every passage appears once in each
+direction. ``indptr`` is int64 and ``indices`` int32.
+
+``save_csr`` writes ``.npz`` (NumPy) or a raw binary file laid out as
+``CSR_HEADER`` (magic ``AMZG``, width, height, indptr and indices
+lengths, padded to 32 bytes) followed by the two arrays, little-endian.
+``load_csr`` memory-maps raw files, so loading is instant whatever the
+size; SciPy users can wrap the arrays with
+``scipy.sparse.csr_matrix((data, indices, indptr))``.
+
+Convert an output file with ``python -m mazegen.graph maze.txt maze.csr``.
+"""
+
+import argparse
+import mmap
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from .analysis import direction_buffer
+from .maze_generator import Maze
+from .output_writer import read_output_file
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised without numpy
+    np = None  # type: ignore[assignment]
+
+CSR_MAGIC = b"AMZG"
+CSR_HEADER = struct.Struct("<4sIIQQ4x")
+N, E, S, W = Maze.N, Maze.E, Maze.S, Maze.W
+
+
+@dataclass
+class CSRGraph:
+    """A maze passage graph as CSR arrays (NumPy arrays or buffers)."""
+
+    width: int
+    height: int
+    indptr: Any
+    indices: Any
+
+    @property
+    def num_nodes(self) -> int:
+        """Number of nodes (all cells, blocked ones included)."""
+        return len(self.indptr) - 1
+
+    @property
+    def num_edges(self) -> int:
+        """Number of passages (each stored twice)."""
+        return len(self.indices) // 2
+
+    def neighbors(self, node: int) -> List[int]:
+        """Return the nodes joined to ``node`` by a passage."""
+        start, end = int(self.indptr[node]), int(self.indptr[node + 1])
+        return [int(other) for other in self.indices[start:end]]
+
+
+def _csr_python(dirs: bytearray, width: int, height: int) -> CSRGraph:
+    """Build the CSR arrays with plain loops."""
+    steps = ((N, -width), (W, -1), (E, 1), (S, width))
+    table = [tuple(off for bit, off in steps if mask & bit)
+             for mask in range(16)]
+    indptr = array("q", [0])
+    indices = array("i")
+    for cell, mask in enumerate(dirs):
+        indices.extend(cell + off for off in table[mask])
+        indptr.append(len(indices))
+    return CSRGraph(width, height, indptr, indices)
+
+
+def _csr_numpy(dirs: bytearray, width: int, height: int) -> CSRGraph:
+    """Build the CSR arrays in one vectorized pass over the bits."""
+    bits = np.frombuffer(bytes(dirs), dtype=np.uint8)
+    order = np.array([N, W, E, S], dtype=np.uint8)
+    offsets = np.array([-width, -1, 1, width], dtype=np.int64)
+    is_open = (bits[:, None] & order) != 0
+    cells = np.arange(len(bits), dtype=np.int64)
+    indices = (cells[:, None] + offsets)[is_open].astype(np.int32)
+    indptr = np.zeros(len(bits) + 1, dtype=np.int64)
+    np.cumsum(is_open.sum(axis=1), out=indptr[1:])
+    return CSRGraph(width, height, indptr, indices)
+
+
+def to_csr(maze: Maze, vectorized: Optional[bool] = None) -> CSRGraph:
+    """Export ``maze``'s passages as a ``CSRGraph``.
+
+    With NumPy (the default when installed) the arrays are NumPy arrays;
+    ``vectorized=False`` returns ``array.array`` objects instead.
+    """
+    if vectorized is None:
+        vectorized = np is not None
+    dirs = direction_buffer(maze.walls, maze.blocked_cells, maze.width,
+                            maze.height, vectorized)
+    build = _csr_numpy if vectorized else _csr_python
+    return build(dirs, maze.width, maze.height)
+
+
+def save_csr(graph: CSRGraph, path: str) -> None:
+    """Write ``graph`` to ``.npz`` or to the raw binary layout."""
+    if path.endswith(".npz"):
+        if np is None:
+            raise ValueError("saving .npz files needs NumPy")
+        np.savez(path, indptr=np.asarray(graph.indptr, dtype=np.int64),
+                 indices=np.asarray(graph.indices, dtype=np.int32),
+                 shape=np.array([graph.width, graph.height]))
+        return
+    with open(path, "wb") as f:
+        f.write(CSR_HEADER.pack(CSR_MAGIC, graph.width, graph.height,
+                                len(graph.indptr), len(graph.indices)))
+        for values, code in ((graph.indptr, "q"), (graph.indices, "i")):
+            if np is not None:
+                np.asarray(values, dtype="<" + code).tofile(f)
+                continue
+            data = array(code, values)
+            if sys.byteorder != "little":
+                data.byteswap()
+            data.tofile(f)
+
+
+def load_csr(path: str) -> CSRGraph:
+    """Load a graph; raw files are memory-mapped read-only.
+
+    Raw files give NumPy arrays when NumPy is installed and memoryviews
+    otherwise; ``.npz`` files always need NumPy.
+    """
+    if path.endswith(".npz"):
+        if np is None:
+            raise ValueError("loading .npz files needs NumPy")
+        with np.load(path) as data:
+            width, height = data["shape"].tolist()
+            return CSRGraph(width, height, data["indptr"], data["indices"])
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, width, height, n_indptr, n_indices = CSR_HEADER.unpack_from(
+        mapped)
+    if magic != CSR_MAGIC:
+        raise ValueError(f"{path} is not a CSR maze graph")
+    start = CSR_HEADER.size
+    middle = start + 8 * n_indptr
+    if np is not None:
+        return CSRGraph(
+            width, height,
+            np.frombuffer(mapped, dtype="<i8", count=n_indptr,
+                          offset=start),
+            np.frombuffer(mapped, dtype="<i4", count=n_indices,
+                          offset=middle))
+    if sys.byteorder != "little":
+        raise ValueError("memory-mapping needs NumPy on big-endian hosts")
+    view = memoryview(mapped)
+    return CSRGraph(width, height, view[start:middle].cast("q"),
+                    view[middle:middle + 4 * n_indices].cast("i"))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Convert a maze output file to a CSR graph file."""
+    parser = argparse.ArgumentParser(
+        description="Export a maze output file as a CSR passage graph.")
+    parser.add_argument("maze", help="maze output file (may be compressed)")
+    parser.add_argument("output", help="graph file (.npz or raw binary)")
+    args = parser.parse_args(argv)
+    maze = read_output_file(args.maze)[0]
+    graph = to_csr(maze)
+    save_csr(graph, args.output)
+    print(f"{args.output}: {graph.num_nodes} nodes, "
+          f"{graph.num_edges} passages")
+
+
+if __name__ == "__main__":
+    main()
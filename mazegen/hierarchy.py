@@ -0,0 +1,292 @@
+"""Hierarchical path-planning index (HPA*-style) for repeated queries.
+
+``ClusterIndex`` splits the grid into ``cluster_size`` x
+``cluster_size`` clusters. Every passage that crosses a cluster border
+makes its two cells abstract nodes, joined by an edge of length 1; inside
+each cluster, breadth-first searches restricted to the cluster give the
+distances between all of its nodes. Clusters are independent, so they
+are indexed on a process pool.
+
+A query searches only its start and goal clusters cell by cell, runs A*
+(Manhattan distance) over the abstract graph, and refines each abstract
+edge back into cells with a search inside one cluster. Every crossing
+passage is a node and intra-cluster distances are exact, so the paths
+are shortest paths, as long as ``bfs_find_path``'s; on mazes with loops
+they may take a different route of the same length.
+
+``index_for(maze)`` caches the index on the maze and rebuilds it when
+``maze.revision`` changes. Code that edits ``maze.walls`` directly
+should increment ``maze.revision``.
+"""
+
+import heapq
+import os
+import weakref
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from . import instrument
+from .analysis import bfs, direction_buffer, neighbor_table
+from .maze_generator import Maze
+
+CLUSTER_SIZE = 32
+Point = Tuple[int, int]
+# (x0, y0, width, height, open-direction bytes, local node cells)
+ClusterJob = Tuple[int, int, int, int, bytes, List[int]]
+
+_CACHE: "weakref.WeakKeyDictionary[Maze, Dict[int, ClusterIndex]]" = (
+    weakref.WeakKeyDictionary())
+
+
+def _local_dirs(
+    dirs: bytearray, width: int, x0: int, y0: int, w: int, h: int
+) -> bytearray:
+    """Open directions of one cluster, with its borders closed."""
+    local = bytearray()
+    for y in range(y0, y0 + h):
+        local += dirs[y * width + x0:y * width + x0 + w]
+    for y in range(h):
+        local[y * w] &= ~Maze.W
+        local[y * w + w - 1] &= ~Maze.E
+    for x in range(w):
+        local[x] &= ~Maze.N
+        local[(h - 1) * w + x] &= ~Maze.S
+    return local
+
+
+def _cluster_distances(job: ClusterJob) -> List[List[int]]:
+    """All-pairs distances between a cluster's nodes (-1 if apart)."""
+    _x0, _y0, w, _h, dirs, nodes = job
+    nbrs = neighbor_table(w)
+    local = bytearray(dirs)
+    rows = []
+    for node in nodes:
+        dist = bfs(nbrs, local, node)[0]
+        rows.append([dist[other] for other in nodes])
+    return rows
+
+
+def _local_path(
+    nbrs: List[Tuple[int, ...]], dirs: bytearray, start: int, goal: int
+) -> List[int]:
+    """Shortest path between two cells of one cluster (local indices)."""
+    parent = array("i", [-1]) * len(dirs)
+    parent[start] = start
+    queue = [start]
+    for cell in queue:
+        if cell == goal:
+            break
+        for off in nbrs[dirs[cell]]:
+            if parent[cell + off] < 0:
+                parent[cell + off] = cell
+                queue.append(cell + off)
+    path = [goal]
+    while path[-1] != start:
+        path.append(parent[path[-1]])
+    path.reverse()
+    return path
+
+
+class ClusterIndex:
+    """Abstract graph over cluster entrances of one maze revision."""
+
+    def __init__(
+        self,
+        maze: Maze,
+        cluster_size: int = CLUSTER_SIZE,
+        workers: Optional[int] = None,
+    ) -> None:
+        if cluster_size <= 0:
+            raise ValueError("cluster_size must be positive")
+        self.maze = maze
+        self.revision = maze.revision
+        self.width, self.height = maze.width, maze.height
+        self.size = cluster_size
+        self.blocked = {y * maze.width + x for x, y in maze.blocked_cells}
+        with instrument.span("cluster_index"):
+            self.dirs = direction_buffer(maze.walls, maze.blocked_cells,
+                                         maze.width, maze.height)
+            self._build(workers)
+
+    def cluster_of(self, cell: int) -> int:
+        """Cluster number of a flat cell index."""
+        y, x = divmod(cell, self.width)
+        return (y // self.size) * self.clusters_x + x // self.size
+
+    def _bounds(self, cluster: int) -> Tuple[int, int, int, int]:
+        """``(x0, y0, width, height)`` of a cluster."""
+        cy, cx = divmod(cluster, self.clusters_x)
+        x0, y0 = cx * self.size, cy * self.size
+        return (x0, y0, min(self.size, self.width - x0),
+                min(self.size, self.height - y0))
+
+    def _build(self, workers: Optional[int]) -> None:
+        """Find the entrance nodes and index every cluster."""
+        width, size, dirs = self.width, self.size, self.dirs
+        self.clusters_x = (width + size - 1) // size
+        clusters = self.clusters_x * ((self.height + size - 1) // size)
+        self.members: List[List[int]] = [[] for _ in range(clusters)]
+        members = self.members
+        # Abstract node id -> cell, and the crossing edges (length 1).
+        self.node_of: Dict[int, int] = {}
+        self.cells: List[int] = []
+        self.edges: List[List[Tuple[int, int]]] = []
+
+        def node(cell: int) -> int:
+            found = self.node_of.get(cell)
+            if found is None:
+                found = self.node_of[cell] = len(self.cells)
+                self.cells.append(cell)
+                self.edges.append([])
+                members[self.cluster_of(cell)].append(cell)
+            return found
+
+        for cell, mask in enumerate(dirs):
+            x, y = cell % width, cell // width
+            if mask & Maze.E and (x + 1) % size == 0:
+                a, b = node(cell), node(cell + 1)
+                self.edges[a].append((b, 1))
+                self.edges[b].append((a, 1))
+            if mask & Maze.S and (y + 1) % size == 0:
+                a, b = node(cell), node(cell + width)
+                self.edges[a].append((b, 1))
+                self.edges[b].append((a, 1))
+
+        jobs: List[ClusterJob] = []
+        for cluster in range(clusters):
+            x0, y0, w, h = self._bounds(cluster)
+            local = [(c // width - y0) * w + c % width - x0
+                     for c in members[cluster]]
+            jobs.append((x0, y0, w, h,
+                         bytes(_local_dirs(dirs, width, x0, y0, w, h)),
+                         local))
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or clusters == 1:
+            results = [_cluster_distances(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_cluster_distances, jobs,
+                                        chunksize=max(1, clusters
+                                                      // (workers * 4))))
+        for cluster, rows in enumerate(results):
+            ids = [self.node_of[c] for c in members[cluster]]
+            for a, row in zip(ids, rows):
+                self.edges[a].extend(
+                    (b, d) for b, d in zip(ids, row) if d > 0)
+        instrument.count("cluster_nodes", len(self.cells))
+
+    def _cluster_search(
+        self, cell: int
+    ) -> Tuple[Tuple[int, int, int, int], bytearray, "array[int]"]:
+        """Distances from ``cell`` within its cluster."""
+        x0, y0, w, h = bounds = self._bounds(self.cluster_of(cell))
+        local = _local_dirs(self.dirs, self.width, x0, y0, w, h)
+        start = (cell // self.width - y0) * w + cell % self.width - x0
+        return bounds, local, bfs(neighbor_table(w), local, start)[0]
+
+    def _to_local(self, bounds: Tuple[int, int, int, int],
+                  cell: int) -> int:
+        """Index of a flat cell inside the cluster at ``bounds``."""
+        x0, y0, w, _h = bounds
+        return (cell // self.width - y0) * w + cell % self.width - x0
+
+    def find_path(self, start: Point, goal: Point) -> Optional[List[Point]]:
+        """Shortest path from ``start`` to ``goal``, or None."""
+        width = self.width
+        for x, y in (start, goal):
+            if not (0 <= x < width and 0 <= y < self.height) or (
+                    y * width + x in self.blocked):
+                return None
+        first, last = start[1] * width + start[0], goal[1] * width + goal[0]
+        s_bounds, _s_dirs, s_dist = self._cluster_search(first)
+        g_bounds, _g_dirs, g_dist = self._cluster_search(last)
+        # Search nodes are abstract node ids; -1 is the start, -2 the goal.
+        goal_edges = {
+            self.node_of[c]: g_dist[self._to_local(g_bounds, c)]
+            for c in self.members[self.cluster_of(last)]
+            if g_dist[self._to_local(g_bounds, c)] >= 0}
+        gx, gy = goal
+
+        def estimate(cell: int) -> int:
+            return abs(cell % width - gx) + abs(cell // width - gy)
+
+        best: Dict[int, int] = {-1: 0}
+        came: Dict[int, int] = {}
+        heap: List[Tuple[int, int, int]] = []
+        if self.cluster_of(first) == self.cluster_of(last):
+            direct = s_dist[self._to_local(s_bounds, last)]
+            if direct >= 0:
+                best[-2] = direct
+                came[-2] = -1
+                heapq.heappush(heap, (direct, direct, -2))
+        for c in self.members[self.cluster_of(first)]:
+            d = s_dist[self._to_local(s_bounds, c)]
+            if d >= 0:
+                n = self.node_of[c]
+                best[n] = d
+                came[n] = -1
+                heapq.heappush(heap, (d + estimate(c), d, n))
+        while heap:
+            _f, d, n = heapq.heappop(heap)
+            if d > best.get(n, d):
+                continue
+            if n == -2:
+                break
+            arcs = self.edges[n]
+            if n in goal_edges:
+                arcs = arcs + [(-2, goal_edges[n])]
+            for m, cost in arcs:
+                nd = d + cost
+                if nd < best.get(m, nd + 1):
+                    best[m] = nd
+                    came[m] = n
+                    cell = last if m == -2 else self.cells[m]
+                    heapq.heappush(heap, (nd + estimate(cell), nd, m))
+        else:
+            return None
+        route = [-2]
+        while route[-1] != -1:
+            route.append(came[route[-1]])
+        route.reverse()
+        cells = [first] + [self.cells[n] for n in route[1:-1]] + [last]
+        return self._refine(cells)
+
+    def _refine(self, cells: List[int]) -> List[Point]:
+        """Expand consecutive abstract cells into the full path."""
+        width = self.width
+        path = [cells[0]]
+        for a, b in zip(cells, cells[1:]):
+            if self.cluster_of(a) != self.cluster_of(b):
+                path.append(b)
+                continue
+            bounds = self._bounds(self.cluster_of(a))
+            x0, y0, w, h = bounds
+            local = _local_dirs(self.dirs, width, x0, y0, w, h)
+            steps = _local_path(neighbor_table(w), local,
+                                self._to_local(bounds, a),
+                                self._to_local(bounds, b))
+            path.extend((y0 + c // w) * width + x0 + c % w
+                        for c in steps[1:])
+        return [(cell % width, cell // width) for cell in path]
+
+
+def index_for(
+    maze: Maze,
+    cluster_size: int = CLUSTER_SIZE,
+    workers: Optional[int] = None,
+) -> ClusterIndex:
+    """Return the cached index of ``maze``, rebuilding it if stale."""
+    indexes = _CACHE.setdefault(maze, {})
+    index = indexes.get(cluster_size)
+    if index is None or index.revision != maze.revision:
+        index = indexes[cluster_size] = ClusterIndex(maze, cluster_size,
+                                                     workers)
+    return index
+
+
+def find_path(
+    maze: Maze, start: Point, goal: Point, cluster_size: int = CLUSTER_SIZE
+) -> Optional[List[Point]]:
+    """Shortest path through the cached cluster index of ``maze``."""
+    return index_for(maze, cluster_size).find_path(start, goal)
@@ -0,0 +1,203 @@
+"""Lightweight phase timing and counters.
+
+Instrumentation is off by default and every entry point then returns
+immediately: ``span`` hands back a shared no-op context manager and the
+counter helpers test one module-level flag. Nothing is recorded from
+inside per-cell loops; generators report totals once they finish.
+
+Enable it with the ``MAZEGEN_PROFILE`` environment variable or the
+``--profile[=PATH]`` flag of ``a_maze_ing.py``. The variable holds the
+report path, or ``1`` for the default ``mazegen_profile.json``. Setting
+``MAZEGEN_PROFILE_CPROFILE=1`` (or ``--profile-cprofile``) additionally
+runs ``cProfile`` for the whole session. When the process exits the
+following files are written:
+
+- ``<report>``: JSON with per-span call counts and times, counters,
+  maxima and marks (seconds since instrumentation started).
+- ``<report>.folded``: collapsed stacks of the spans, one
+  ``outer;inner <microseconds>`` line per stack, as read by
+  ``flamegraph.pl``, speedscope and similar tools.
+- ``<report>.prof``: ``pstats`` data when cProfile is enabled.
+
+Example::
+
+    with instrument.span("generate"):
+        maze.generate_maze(seed=42)
+    instrument.count("bytes_written", size)
+"""
+
+import atexit
+import contextlib
+import cProfile
+import json
+import os
+import time
+from typing import Any, ContextManager, Dict, List, Optional
+
+ENV_VAR = "MAZEGEN_PROFILE"
+ENV_CPROFILE = "MAZEGEN_PROFILE_CPROFILE"
+DEFAULT_REPORT = "mazegen_profile.json"
+
+_enabled = False
+_report_path: Optional[str] = None
+_started = 0.0
+_profiler: Optional[cProfile.Profile] = None
+_atexit_registered = False
+
+# Open spans as [name, start, time spent in children].
+_stack: List[List[Any]] = []
+# Stack path -> [calls, total seconds, self seconds, max seconds].
+_spans: Dict[str, List[float]] = {}
+_counters: Dict[str, int] = {}
+_maxima: Dict[str, float] = {}
+_marks: Dict[str, float] = {}
+_NULL: ContextManager[None] = contextlib.nullcontext()
+
+
+class _Span:
+    """Context manager timing one named phase."""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> None:
+        _stack.append([self.name, time.perf_counter(), 0.0])
+
+    def __exit__(self, *exc: Any) -> None:
+        elapsed = time.perf_counter() - _stack[-1][1]
+        path = ";".join(frame[0] for frame in _stack)
+        own = elapsed - _stack.pop()[2]
+        if _stack:
+            _stack[-1][2] += elapsed
+        stats = _spans.setdefault(path, [0, 0.0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] += own
+        stats[3] = max(stats[3], elapsed)
+
+
+def enabled() -> bool:
+    """Return True when instrumentation is recording."""
+    return _enabled
+
+
+def enable(
+    report_path: Optional[str] = DEFAULT_REPORT,
+    cprofile: bool = False,
+) -> None:
+    """Start recording and write the report at exit.
+
+    Args:
+        report_path: JSON report path, or None to only collect in memory
+            (see ``report``).
+        cprofile: Also run ``cProfile`` and write ``<report>.prof``.
+    """
+    global _enabled, _report_path, _started, _profiler, _atexit_registered
+    reset()
+    _enabled = True
+    _report_path = report_path
+    _started = time.perf_counter()
+    if cprofile and _profiler is None:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    if report_path is not None and not _atexit_registered:
+        atexit.register(dump)
+        _atexit_registered = True
+
+
+def enable_from_env() -> None:
+    """Enable instrumentation when ``MAZEGEN_PROFILE`` is set."""
+    value = os.environ.get(ENV_VAR, "").strip()
+    if not value or value.lower() in {"0", "false", "no"}:
+        return
+    path = DEFAULT_REPORT if value.lower() in {"1", "true", "yes"} else value
+    cprofile = os.environ.get(ENV_CPROFILE, "").lower() in {"1", "true"}
+    enable(path, cprofile=cprofile)
+
+
+def disable() -> None:
+    """Stop recording; collected data stays available."""
+    global _enabled
+    _enabled = False
+    if _profiler is not None:
+        _profiler.disable()
+
+
+def reset() -> None:
+    """Drop everything recorded so far."""
+    _stack.clear()
+    _spans.clear()
+    _counters.clear()
+    _maxima.clear()
+    _marks.clear()
+
+
+def span(name: str) -> ContextManager[None]:
+    """Time the enclosed block as ``name``, nested under open spans."""
+    if not _enabled:
+        return _NULL
+    return _Span(name)
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Add ``amount`` to the counter ``name``."""
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def record_max(name: str, value: float) -> None:
+    """Keep the largest ``value`` seen for ``name``."""
+    if _enabled and value > _maxima.get(name, value - 1):
+        _maxima[name] = value
+
+
+def mark(name: str) -> None:
+    """Record when ``name`` first happened, relative to ``enable``."""
+    if _enabled and name not in _marks:
+        _marks[name] = time.perf_counter() - _started
+
+
+def report() -> Dict[str, Any]:
+    """Return the collected data as a JSON-ready dict."""
+    return {
+        "spans": {
+            path: {
+                "calls": int(stats[0]),
+                "total_s": stats[1],
+                "self_s": stats[2],
+                "max_s": stats[3],
+            }
+            for path, stats in _spans.items()
+        },
+        "counters": dict(_counters),
+        "maxima": dict(_maxima),
+        "marks": dict(_marks),
+    }
+
+
+def collapsed_stacks() -> str:
+    """Return span self times in collapsed-stack (folded) format."""
+    return "".join(
+        f"{path} {max(1, round(stats[2] * 1e6))}\n"
+        for path, stats in _spans.items()
+    )
+
+
+def dump(path: Optional[str] = None) -> None:
+    """Write the JSON report, folded stacks and optional pstats."""
+    path = path or _report_path
+    if path is None:
+        return
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(path + ".prof")
+    with open(path, "w") as f:
+        json.dump(report(), f, indent=2, sort_keys=True)
+        f.write("\n")
+    with open(path + ".folded", "w") as f:
+        f.write(collapsed_stacks())
+
+
+enable_from_env()
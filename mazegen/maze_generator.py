@@ -1,5 +1,42 @@
+import os
 import random
-from typing import Optional, Set, Tuple, List
+from array import array
+from collections import deque
+from typing import (
+    Callable, Deque, Dict, Optional, Sequence, Set, Tuple, List)
+
+from . import instrument, vectorized
+from .random_source import draw_below, make_rng
+from .stencil import LOGO_42, BlockedCells, Stencil
+
+_INVERT = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+# Debug switch: verify every generated maze (see ``mazegen.verify``).
+VERIFY = os.environ.get("MAZEGEN_VERIFY", "") not in ("", "0")
+
+
+def _shuffle_orders() -> List[Tuple[int, int, int, int]]:
+    """Direction orders produced by ``Random.shuffle`` on four items.
+
+    Indexed by ``j3 * 6 + j2 * 2 + j1`` where ``j3``, ``j2`` and ``j1``
+    are the successive ``randbelow(4)``, ``randbelow(3)`` and
+    ``randbelow(2)`` draws of the Fisher-Yates pass.
+    """
+    orders = []
+    for j3 in range(4):
+        for j2 in range(3):
+            for j1 in range(2):
+                order = [0, 1, 2, 3]
+                for i, j in ((3, j3), (2, j2), (1, j1)):
+                    order[i], order[j] = order[j], order[i]
+                orders.append((order[0], order[1], order[2], order[3]))
+    return orders
+
+
+_SHUFFLES = _shuffle_orders()
+
+ParentFn = Callable[
+    [int, int, Set[Tuple[int, int, int]]], Optional[Tuple[int, int]]
+]
 
 
 class Maze:
@@ -31,8 +68,10 @@ class Maze:
         self.height = height
         self.walls: List[List[int]] = [[15 for _ in range(width)]
                                        for _ in range(height)]
-        self.blocked_cells: Set[Tuple[int, int]] = set()
+        self.blocked_cells = BlockedCells(width, height)
         self.pattern_origin: Optional[Tuple[int, int]] = None
+        # Bumped by every wall change made through the Maze API.
+        self.revision = 0
 
     def in_bounds(self, x: int, y: int) -> bool:
         """Check if (x, y) is within the maze boundaries."""
@@ -40,48 +79,90 @@ class Maze:
 
     def is_blocked(self, x: int, y: int) -> bool:
         """Check if (x, y) is a blocked cell."""
-        return (x, y) in self.blocked_cells
+        return self.blocked_cells.test(x, y)
+
+    def set_wall(self, x: int, y: int, direction: int, closed: bool) -> bool:
+        """Open or close the wall on side ``direction`` of ``(x, y)``.
+
+        Both cells sharing the wall are updated. Returns True if the wall
+        changed. The outer border and blocked cells cannot be opened.
+        """
+        for dx, dy, bit, opp_bit in self.dirs:
+            if bit == direction:
+                break
+        else:
+            raise ValueError(f"unknown direction {direction}")
+        nx, ny = x + dx, y + dy
+        if not self.in_bounds(x, y):
+            raise ValueError(f"({x}, {y}) is outside the maze")
+        if not self.in_bounds(nx, ny) or self.is_blocked(nx, ny) or \
+                self.is_blocked(x, y):
+            if closed:
+                return False
+            raise ValueError(f"wall {direction} of ({x}, {y}) cannot open")
+        if bool(self.walls[y][x] & bit) == closed:
+            return False
+        self.revision += 1
+        if closed:
+            self.walls[y][x] |= bit
+            self.walls[ny][nx] |= opp_bit
+        else:
+            self._carve_passage(x, y, nx, ny, bit, opp_bit)
+        return True
 
     def reset(self) -> None:
         """Reset the maze to its initial state with all walls intact."""
-        for y in range(self.height):
-            for x in range(self.width):
-                self.walls[y][x] = 15
+        closed = [15] * self.width
+        self.revision += 1
+        for row in self.walls:
+            row[:] = closed
         self.blocked_cells.clear()
         self.pattern_origin = None
 
     def create_42_pattern(self) -> bool:
         """Create the 42 pattern in the maze."""
         self.blocked_cells.clear()
-        self.pattern_origin = None
-
-        max_four_x = max(dx for dx, _ in self.four_pattern)
-        max_four_y = max(dy for _, dy in self.four_pattern)
-        max_two_x = max(dx for dx, _ in self.two_pattern) + 5
-        max_two_y = max(dy for _, dy in self.two_pattern)
-
-        pattern_width = max(max_four_x, max_two_x) + 1
-        pattern_height = max(max_four_y, max_two_y) + 1
-
-        ox = self.width // 2 - pattern_width // 2
-        oy = self.height // 2 - pattern_height // 2
-
-        if ox < 0 or oy < 0 or ox + pattern_width > self.width or oy + \
-                pattern_height > self.height:
-            return False
-
-        self.pattern_origin = (ox, oy)
-
-        for dx, dy in self.four_pattern:
-            self.blocked_cells.add((ox + dx, oy + dy))
-
-        for dx, dy in self.two_pattern:
-            self.blocked_cells.add((ox + 5 + dx, oy + dy))
-
-        for x, y in self.blocked_cells:
-            if self.in_bounds(x, y):
-                self.walls[y][x] = 15
-        return True
+        self.pattern_origin = self.apply_stencil(LOGO_42)
+        return self.pattern_origin is not None
+
+    def _place_obstacles(self, stencil: Optional[Stencil]) -> None:
+        """Place ``stencil`` centered, or the 42 pattern when None."""
+        if stencil is None:
+            self.create_42_pattern()
+        elif self.apply_stencil(stencil) is None:
+            raise ValueError(
+                f"{stencil.width}x{stencil.height} stencil does not fit "
+                f"the {self.width}x{self.height} maze")
+
+    def apply_stencil(
+        self, stencil: Stencil, origin: Optional[Tuple[int, int]] = None
+    ) -> Optional[Tuple[int, int]]:
+        """Block the cells of ``stencil`` and close their walls.
+
+        The stencil is centered unless ``origin`` gives its top-left
+        cell. Returns the origin used, or None when a centered stencil
+        does not fit; an ``origin`` that does not fit raises ValueError.
+        Apply stencils before carving: passages into the newly blocked
+        cells are not closed from the other side.
+        """
+        if origin is None:
+            ox = self.width // 2 - stencil.width // 2
+            oy = self.height // 2 - stencil.height // 2
+            if (ox < 0 or oy < 0 or ox + stencil.width > self.width
+                    or oy + stencil.height > self.height):
+                return None
+            origin = (ox, oy)
+        ox, oy = origin
+        self.blocked_cells.paint(stencil, ox, oy)
+        for dy in range(stencil.height):
+            mask = stencil.row(dy)
+            if not any(mask):
+                continue
+            row = self.walls[oy + dy]
+            row[ox:ox + stencil.width] = bytes(
+                15 if blocked else cell
+                for blocked, cell in zip(mask, row[ox:ox + stencil.width]))
+        return origin
 
     def _carve_passage(
         self,
@@ -124,124 +205,759 @@ class Maze:
             neighbors.append((nx, ny, w_bit, opp_bit))
         return neighbors
 
-    def _first_open_cell(self) -> list[Tuple[int, int]]:
-        """Return the first non-blocked cell in row-major order."""
+    def _padded_grid(self) -> Tuple[int, bytearray, bytearray]:
+        """Return ``(stride, walls, free)`` on a grid padded by one cell.
+
+        Cell (x, y) lives at flat index ``(y + 1) * stride + x + 1``.
+        ``free`` is 1 for in-bounds cells that are not blocked, so the
+        padding behaves like a blocked ring and neighbor lookups need no
+        bounds checks.
+        """
+        width = self.width
+        stride = width + 2
+        free = bytearray(stride * (self.height + 2))
+        walls = bytearray(b"\x0f") * len(free)
+        open_row = b"\x01" * width
+        for y, row in enumerate(self.walls):
+            base = (y + 1) * stride + 1
+            free[base:base + width] = open_row
+            walls[base:base + width] = bytes(row)
+        for y, mask in self.blocked_cells.rows():
+            base = (y + 1) * stride + 1
+            free[base:base + width] = mask.translate(_INVERT)
+        return stride, walls, free
+
+    def _store_padded_walls(self, stride: int, walls: bytearray) -> None:
+        """Copy walls from a ``_padded_grid`` buffer back into the maze."""
+        width = self.width
         for y in range(self.height):
-            for x in range(self.width):
-                if not self.is_blocked(x, y):
-                    yield (x, y)
+            base = (y + 1) * stride + 1
+            self.walls[y][:] = walls[base:base + width]
+
+    def _steps(self, stride: int) -> Tuple[Tuple[int, int, int], ...]:
+        """Return ``(offset, keep, opp_keep)`` per direction of ``dirs``.
+
+        ``keep`` and ``opp_keep`` are masks that clear the carved wall in
+        the current and the neighboring cell.
+        """
+        return tuple(
+            (dy * stride + dx, 15 & ~w_bit, 15 & ~opp_bit)
+            for dx, dy, w_bit, opp_bit in self.dirs
+        )
 
     def generate_maze(
         self,
         seed: Optional[int] = None,
         algo: str = "prim",
         perfect: bool = True,
+        tile_size: Optional[int] = None,
+        workers: Optional[int] = None,
+        random_source: str = "std",
+        loops: Optional[int] = None,
+        loop_density: Optional[float] = None,
+        braid: Optional[float] = None,
+        stencil: Optional[Stencil] = None,
     ) -> None:
-        """Generate a maze using the specified algorithm."""
-        rng = random.Random(seed)
-        self.reset()
-        self.create_42_pattern()
+        """Generate a maze using the specified algorithm.
+
+        When ``tile_size`` is given the grid is generated in square tiles
+        across ``workers`` processes (see ``mazegen.tiled``).
+        ``random_source`` names the RNG provider; only ``"std"`` keeps
+        the historical seeded output (see ``mazegen.random_source``).
 
+        A non-perfect maze gets random loops (about one cell in ten
+        opens a wall) unless ``loops`` (an exact number of closed walls
+        to open), ``loop_density`` (loops per open cell) or ``braid``
+        (the fraction of dead ends to remove) is given.
+
+        ``stencil`` replaces the 42 pattern with other obstacles, centered
+        (see ``mazegen.stencil``); a stencil that does not fit raises
+        ValueError.
+        """
+        shaped = (loops, loop_density, braid) != (None, None, None)
+        if shaped and perfect:
+            raise ValueError("loops and braiding need perfect=False")
+        if loops is not None and loop_density is not None:
+            raise ValueError("give either loops or loop_density")
+        with instrument.span("generate"):
+            if tile_size is not None:
+                from .tiled import generate_tiled
+
+                generate_tiled(self, seed=seed, algo=algo,
+                               perfect=perfect or shaped,
+                               tile_size=tile_size, workers=workers,
+                               random_source=random_source,
+                               stencil=stencil)
+                rng = make_rng(random_source, seed)
+            else:
+                rng = make_rng(random_source, seed)
+                self.reset()
+                with instrument.span("pattern"):
+                    self._place_obstacles(stencil)
+                with instrument.span("carve"):
+                    self._run_algo(algo, rng)
+
+                if not perfect and not shaped:
+                    with instrument.span("loops"):
+                        self._add_loops(rng, loop_chance=0.1)
+            if loop_density is not None:
+                loops = round(loop_density * (
+                    self.width * self.height - len(self.blocked_cells)))
+            if loops:
+                with instrument.span("loops"):
+                    self._insert_loops(rng, loops)
+            if braid:
+                with instrument.span("braid"):
+                    self._braid(rng, braid)
+
+        if instrument.enabled():
+            instrument.count("cells_carved", sum(
+                len(row) - bytes(row).count(15) for row in self.walls))
+        if VERIFY:
+            from .verify import verify
+
+            verify(self).check(perfect)
+
+    def regenerate_region(
+        self,
+        x: int,
+        y: int,
+        width: int,
+        height: int,
+        seed: Optional[int] = None,
+        algo: str = "prim",
+        perfect: bool = True,
+        random_source: str = "std",
+    ) -> None:
+        """Regenerate only the ``width`` x ``height`` rectangle at (x, y).
+
+        Cells outside the rectangle keep their walls and a perfect maze
+        stays perfect; see ``mazegen.region`` for how the region is
+        reconnected.
+        """
+        from .region import regenerate_region
+
+        self.revision += 1
+        with instrument.span("regenerate_region"):
+            regenerate_region(self, x, y, width, height, seed=seed,
+                              algo=algo, perfect=perfect,
+                              random_source=random_source)
+
+    def _run_algo(self, algo: str, rng: random.Random) -> None:
+        """Carve the current grid with the named algorithm."""
         algo_map = {
             "prim": self._prim_algo,
             "dfs": self._dfs_algo,
             "hunt": self._hunt_and_kill,
+            "kruskal": self._kruskal_algo,
+            "binarytree": self._binary_tree_algo,
+            "sidewinder": self._sidewinder_algo,
         }
 
         algo_func = algo_map.get(algo, self._prim_algo)
         algo_func(rng)
 
-        if not perfect:
-            self._add_loops(rng, loop_chance=0.1)
-
     def _dfs_algo(self, rng: random.Random) -> None:
         """Generate a maze using the Depth-First Search algorithm."""
-        visited = set(self.blocked_cells)
-        start = next(self._first_open_cell(), None)
-        if not start:
+        stride, walls, free = self._padded_grid()
+        start = free.find(1)
+        if start < 0:
             return
+        seen = free.translate(_INVERT)
+        steps = self._steps(stride)
+        draws = [draw_below(rng, n) for n in range(1, 5)]
+        options = list(steps)
+
         stack = [start]
-        visited.add(start)
+        peak = 1
+        seen[start] = 1
         while stack:
-            cx, cy = stack[-1]
-            neighbors = self._neighbors(
-                cx, cy, visited=visited, require_unvisited=True)
-            if not neighbors:
+            cell = stack[-1]
+            count = 0
+            for step in steps:
+                if not seen[cell + step[0]]:
+                    options[count] = step
+                    count += 1
+            if not count:
+                if len(stack) > peak:
+                    peak = len(stack)
                 stack.pop()
                 continue
-            nx, ny, w_bit, opp_bit = rng.choice(neighbors)
-            self._carve_passage(cx, cy, nx, ny, w_bit, opp_bit)
-            visited.add((nx, ny))
-            stack.append((nx, ny))
+            offset, keep, opp_keep = options[draws[count - 1]()]
+            nxt = cell + offset
+            walls[cell] &= keep
+            walls[nxt] &= opp_keep
+            seen[nxt] = 1
+            stack.append(nxt)
+
+        self._store_padded_walls(stride, walls)
+        instrument.record_max("max_stack", peak)
 
     def _prim_algo(self, rng: random.Random) -> None:
         """Generate a maze using Prim's algorithm."""
-        visited: Set[Tuple[int, int]] = set(self.blocked_cells)
-
-        start = next(self._first_open_cell(), None)
-        if not start:
+        stride, walls, free = self._padded_grid()
+        start = free.find(1)
+        if start < 0:
             return
-
-        visited.add(start)
-        frontier: List[Tuple[int, int, int, int, int, int]] = []
-
-        def add_frontier(cx: int, cy: int) -> None:
-            """Add the neighboring cells of (cx, cy) to the frontier."""
-            for nx, ny, w_bit, opp_bit in self._neighbors(
-                    cx, cy, visited=visited, require_unvisited=True):
-                frontier.append((cx, cy, nx, ny, w_bit, opp_bit))
-
-        add_frontier(start[0], start[1])
+        seen = free.translate(_INVERT)
+        steps = self._steps(stride)
+        randrange = rng.randrange
+
+        # Frontier edges are packed as ``cell << 2 | direction``.
+        frontier: List[int] = []
+        seen[start] = 1
+        for d, step in enumerate(steps):
+            if not seen[start + step[0]]:
+                frontier.append(start << 2 | d)
+        peak = len(frontier)
 
         while frontier:
-            cx, cy, nx, ny, w_bit, opp_bit = frontier.pop(
-                rng.randrange(len(frontier)))
-            if (nx, ny) in visited:
+            edge = frontier.pop(randrange(len(frontier)))
+            cell = edge >> 2
+            offset, keep, opp_keep = steps[edge & 3]
+            nxt = cell + offset
+            if seen[nxt]:
                 continue
-            self._carve_passage(
-                cx, cy, nx, ny, w_bit, opp_bit)
-            visited.add((nx, ny))
-            add_frontier(nx, ny)
+            walls[cell] &= keep
+            walls[nxt] &= opp_keep
+            seen[nxt] = 1
+            for d, step in enumerate(steps):
+                if not seen[nxt + step[0]]:
+                    frontier.append(nxt << 2 | d)
+            if len(frontier) > peak:
+                peak = len(frontier)
+
+        self._store_padded_walls(stride, walls)
+        instrument.record_max("max_frontier", peak)
 
     def _hunt_and_kill(self, rng: random.Random) -> None:
         """Generate a maze using the Hunt-and-Kill algorithm."""
-        visited = set(self.blocked_cells)
-        start = next(self._first_open_cell(), None)
-        if not start:
+        stride, walls, free = self._padded_grid()
+        start = free.find(1)
+        if start < 0:
             return
+        seen = free.translate(_INVERT)
+        steps = self._steps(stride)
+        draws = [draw_below(rng, n) for n in range(1, 5)]
+        draw4, draw3, draw2 = draws[3], draws[2], draws[1]
+        options = list(steps)
+
+        # Every walk and hunt step shuffles the four directions; the three
+        # Fisher-Yates draws index a table of the resulting orders.
+        cell = start
+        seen[cell] = 1
+        hunt_from = start
+        while True:
+            while True:
+                order = _SHUFFLES[draw4() * 6 + draw3() * 2 + draw2()]
+                for d in order:
+                    offset, keep, opp_keep = steps[d]
+                    if not seen[cell + offset]:
+                        break
+                else:
+                    break
+                walls[cell] &= keep
+                cell += offset
+                walls[cell] &= opp_keep
+                seen[cell] = 1
+
+            # Cells before the first unvisited one never need rescanning.
+            hunt_from = seen.find(0, hunt_from)
+            target = hunt_from
+            while target >= 0:
+                order = _SHUFFLES[draw4() * 6 + draw3() * 2 + draw2()]
+                count = 0
+                for d in order:
+                    step = steps[d]
+                    if seen[target + step[0]] and free[target + step[0]]:
+                        options[count] = step
+                        count += 1
+                if count:
+                    # The walk resumes from the hunted cell, so it is
+                    # marked before carving on (joining a visited
+                    # neighbor twice would close a cycle).
+                    offset, keep, opp_keep = options[draws[count - 1]()]
+                    walls[target] &= keep
+                    walls[target + offset] &= opp_keep
+                    seen[target] = 1
+                    cell = target
+                    break
+                target = seen.find(0, target + 1)
+            if target < 0:
+                break
+
+        self._store_padded_walls(stride, walls)
+
+    def _kruskal_algo(self, rng: random.Random) -> None:
+        """Generate a maze using randomized Kruskal's algorithm.
+
+        Candidate edges are packed into one integer array as
+        ``cell * 2 + axis`` (axis 0 joins a cell to its east neighbor,
+        axis 1 to its south neighbor) and shuffled once, with one NumPy
+        permutation when available (``rng.shuffle`` otherwise; the two
+        give different mazes for a seed). Cells are joined through a
+        disjoint set with path halving and union by rank, kept in flat
+        ``array`` buffers so the main loop never allocates.
+        """
+        width, height = self.width, self.height
+        size = width * height
+        blocked = self.blocked_cells
+        masks = dict(blocked.rows())
+        free = bytes(width)
+
+        edges = array("q")
+        for y in range(height):
+            base = y * width * 2
+            if y in masks or y + 1 in masks:
+                here = masks.get(y, free)
+                below = masks.get(y + 1, free)
+                for x in range(width):
+                    if here[x]:
+                        continue
+                    if x + 1 < width and not here[x + 1]:
+                        edges.append(base + x * 2)
+                    if y + 1 < height and not below[x]:
+                        edges.append(base + x * 2 + 1)
+                continue
+            edges.extend(range(base, base + (width - 1) * 2, 2))
+            if y + 1 < height:
+                edges.extend(range(base + 1, base + width * 2, 2))
+        order: Sequence[int]
+        if vectorized.HAVE_NUMPY:
+            order = vectorized.shuffled(rng, edges)
+        else:
+            rng.shuffle(edges)
+            order = edges
+
+        parent = array("i", range(size))
+        rank = array("B", bytes(size))
+        flat = bytearray(b"\x0f") * size
+        remaining = size - len(blocked) - 1
+
+        for edge in order:
+            if remaining <= 0:
+                break
+            a = edge >> 1
+            b = a + width if edge & 1 else a + 1
+
+            ra = a
+            while parent[ra] != ra:
+                parent[ra] = parent[parent[ra]]
+                ra = parent[ra]
+            rb = b
+            while parent[rb] != rb:
+                parent[rb] = parent[parent[rb]]
+                rb = parent[rb]
+            if ra == rb:
+                continue
 
-        cx, cy = start
-        visited.add((cx, cy))
+            if rank[ra] < rank[rb]:
+                ra, rb = rb, ra
+            parent[rb] = ra
+            if rank[ra] == rank[rb]:
+                rank[ra] += 1
+
+            if edge & 1:
+                flat[a] &= ~self.S
+                flat[b] &= ~self.N
+            else:
+                flat[a] &= ~self.E
+                flat[b] &= ~self.W
+            remaining -= 1
+
+        for y in range(height):
+            self.walls[y][:] = flat[y * width:(y + 1) * width]
+
+    def _binary_tree_algo(self, rng: random.Random) -> None:
+        """Generate a maze using the Binary Tree algorithm.
+
+        Every cell opens its north or east wall. Uses the NumPy kernel
+        when available; both paths are deterministic for a seed but do
+        not produce the same maze as each other.
+        """
+        if vectorized.HAVE_NUMPY:
+            roots = vectorized.binary_tree(self, rng)
+        else:
+            roots = self._binary_tree_rows(rng)
+        self._join_roots(rng, roots, self._binary_tree_parent)
+
+    def _binary_tree_rows(
+            self, rng: random.Random) -> List[Tuple[int, int]]:
+        """Pure-Python Binary Tree pass; returns the forest roots."""
+        roots: List[Tuple[int, int]] = []
+        masks = dict(self.blocked_cells.rows())
+        free = bytes(self.width)
+        for y in range(self.height):
+            here = masks.get(y, free)
+            above = masks.get(y - 1, free)
+            for x in range(self.width):
+                if here[x]:
+                    continue
+                can_n = y > 0 and not above[x]
+                can_e = x + 1 < self.width and not here[x + 1]
+                if can_n and (not can_e or rng.getrandbits(1)):
+                    self._carve_passage(x, y, x, y - 1, self.N, self.S)
+                elif can_e:
+                    self._carve_passage(x, y, x + 1, y, self.E, self.W)
+                else:
+                    roots.append((x, y))
+        return roots
+
+    def _binary_tree_parent(
+        self, x: int, y: int, joined: Set[Tuple[int, int, int]]
+    ) -> Optional[Tuple[int, int]]:
+        """Return the Binary Tree parent of (x, y), ignoring joins."""
+        cell = self.walls[y][x]
+        if not cell & self.N and (x, y, self.N) not in joined:
+            return (x, y - 1)
+        if not cell & self.E and (x, y, self.E) not in joined:
+            return (x + 1, y)
+        return None
+
+    def _sidewinder_algo(self, rng: random.Random) -> None:
+        """Generate a maze using the Sidewinder algorithm.
+
+        Rows are carved as runs of east passages, each run opening one
+        random north passage. Uses the NumPy kernel when available.
+        """
+        if vectorized.HAVE_NUMPY:
+            roots = vectorized.sidewinder(self, rng)
+        else:
+            roots = self._sidewinder_rows(rng)
+        self._join_roots(rng, roots, self._sidewinder_parent)
+
+    def _sidewinder_rows(
+            self, rng: random.Random) -> List[Tuple[int, int]]:
+        """Pure-Python Sidewinder pass; returns the forest roots."""
+        roots: List[Tuple[int, int]] = []
+        masks = dict(self.blocked_cells.rows())
+        free = bytes(self.width)
+        for y in range(self.height):
+            here = masks.get(y, free)
+            above = masks.get(y - 1, free)
+            run: List[int] = []
+            for x in range(self.width):
+                if here[x]:
+                    continue
+                run.append(x)
+                can_e = x + 1 < self.width and not here[x + 1]
+                if can_e and (y == 0 or not rng.getrandbits(1)):
+                    self._carve_passage(x, y, x + 1, y, self.E, self.W)
+                    continue
+                choices = [cx for cx in run if y > 0 and not above[cx]]
+                if choices:
+                    cx = rng.choice(choices)
+                    self._carve_passage(cx, y, cx, y - 1, self.N, self.S)
+                else:
+                    roots.append((x, y))
+                run = []
+        return roots
+
+    def _sidewinder_parent(
+        self, x: int, y: int, joined: Set[Tuple[int, int, int]]
+    ) -> Optional[Tuple[int, int]]:
+        """Return the Sidewinder parent of (x, y), ignoring joins.
+
+        Cells point east along their run; the last cell of a run points
+        at the cell above the run's north passage.
+        """
+        row = self.walls[y]
+        if not row[x] & self.E and (x, y, self.E) not in joined:
+            return (x + 1, y)
         while True:
-            while nbrs := self._neighbors(
-                    cx, cy, visited=visited, require_unvisited=True, rng=rng):
-                nx, ny, w, opp = nbrs[0]
-                self._carve_passage(cx, cy, nx, ny, w, opp)
-                cx, cy = nx, ny
-                visited.add((cx, cy))
-
-            found = False
-            for y in range(self.height):
-                for x in range(self.width):
-                    if (x, y) not in visited and not self.is_blocked(x, y):
-                        if vn := self._neighbors(
-                                x, y, visited=visited,
-                                require_unvisited=False, rng=rng):
-                            nx, ny, w, opp = rng.choice(vn)
-                            self._carve_passage(x, y, nx, ny, w, opp)
-                            cx, cy = nx, ny
-                            visited.add((cx, cy))
-                            found = True
-                            break
-                if found:
+            if not row[x] & self.N and (x, y, self.N) not in joined:
+                return (x, y - 1)
+            if x == 0 or row[x] & self.W or (x, y, self.W) in joined:
+                return None
+            x -= 1
+
+    def _join_roots(
+        self,
+        rng: random.Random,
+        roots: List[Tuple[int, int]],
+        parent_of: ParentFn,
+    ) -> None:
+        """Join the trees of a carved forest into a spanning tree.
+
+        Blocked cells can leave cells with no parent, so row-local
+        generators return a forest. Each tree is linked to a different
+        tree through one closed wall, first by trying the walls of its
+        root and then by searching the component. Tree membership is
+        found by following ``parent_of`` chains, so only the few cells
+        around orphan trees are inspected.
+        """
+        if len(roots) < 2:
+            return
+
+        joined: Set[Tuple[int, int, int]] = set()
+        owner: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        classes: Dict[Tuple[int, int], Tuple[int, int]] = {
+            r: r for r in roots
+        }
+
+        def tree_root(cell: Tuple[int, int]) -> Tuple[int, int]:
+            trail: List[Tuple[int, int]] = []
+            while cell not in owner:
+                nxt = parent_of(cell[0], cell[1], joined)
+                if nxt is None:
+                    owner[cell] = cell
                     break
-            if not found:
-                return
+                trail.append(cell)
+                cell = nxt
+            root = owner[cell]
+            for c in trail:
+                owner[c] = root
+            return root
+
+        def find(r: Tuple[int, int]) -> Tuple[int, int]:
+            while classes[r] != r:
+                classes[r] = classes[classes[r]]
+                r = classes[r]
+            return r
+
+        def link(x: int, y: int, dx: int, dy: int, bit: int,
+                 opp_bit: int) -> bool:
+            nx, ny = x + dx, y + dy
+            if not self.in_bounds(nx, ny) or self.is_blocked(nx, ny):
+                return False
+            if not self.walls[y][x] & bit:
+                return False
+            a = find(tree_root((x, y)))
+            b = find(tree_root((nx, ny)))
+            if a == b:
+                return False
+            self._carve_passage(x, y, nx, ny, bit, opp_bit)
+            joined.add((x, y, bit))
+            joined.add((nx, ny, opp_bit))
+            classes[b] = a
+            return True
+
+        primary = min(roots, key=lambda c: (c[1], -c[0]))
+        for rx, ry in roots:
+            if (rx, ry) == primary:
+                continue
+            directions = list(self.dirs)
+            rng.shuffle(directions)
+            for dx, dy, bit, opp_bit in directions:
+                if link(rx, ry, dx, dy, bit, opp_bit):
+                    break
+
+        progress = True
+        while progress:
+            progress = False
+            searched: Set[Tuple[int, int]] = set()
+            for r in roots:
+                cls = find(r)
+                if cls == find(primary) or cls in searched:
+                    continue
+                searched.add(cls)
+                if self._link_component(r, link):
+                    progress = True
+
+    def _link_component(
+        self,
+        start: Tuple[int, int],
+        link: Callable[[int, int, int, int, int, int], bool],
+    ) -> bool:
+        """Search the open component of ``start`` for one valid link."""
+        seen = {start}
+        queue: Deque[Tuple[int, int]] = deque([start])
+        while queue:
+            x, y = queue.popleft()
+            for dx, dy, bit, opp_bit in self.dirs:
+                if link(x, y, dx, dy, bit, opp_bit):
+                    return True
+                nx, ny = x + dx, y + dy
+                if (
+                    not self.walls[y][x] & bit
+                    and self.in_bounds(nx, ny)
+                    and (nx, ny) not in seen
+                ):
+                    seen.add((nx, ny))
+                    queue.append((nx, ny))
+        return False
+
+    def _component_labels(self) -> Tuple["array[int]", int]:
+        """Label the cells of every open component in row-major order.
+
+        Returns a flat label array (``-1`` for blocked cells) and the
+        number of components.
+        """
+        width, height = self.width, self.height
+        labels = array("i", [-1]) * (width * height)
+        count = 0
+        for start in range(width * height):
+            sy, sx = divmod(start, width)
+            if labels[start] != -1 or self.is_blocked(sx, sy):
+                continue
+            labels[start] = count
+            stack = [start]
+            while stack:
+                i = stack.pop()
+                cy, cx = divmod(i, width)
+                cell = self.walls[cy][cx]
+                for dx, dy, bit, _ in self.dirs:
+                    if cell & bit or not self.in_bounds(cx + dx, cy + dy):
+                        continue
+                    j = i + dy * width + dx
+                    if labels[j] == -1:
+                        labels[j] = count
+                        stack.append(j)
+            count += 1
+        return labels, count
+
+    def _join_components(
+            self, rng: random.Random) -> Tuple["array[int]", int]:
+        """Link adjacent open components through one passage each.
+
+        Generators that start from a single cell leave regions cut off by
+        blocked cells uncarved. This runs Kruskal over the components so
+        every physically connected region becomes one tree, and returns
+        the relabelled components as ``_component_labels`` does.
+        """
+        labels, count = self._component_labels()
+        width = self.width
+        candidates: List[Tuple[int, int, int, int, int, int]] = []
+        for y in range(self.height):
+            for x in range(width):
+                a = labels[y * width + x]
+                if a == -1:
+                    continue
+                if x + 1 < width and labels[y * width + x + 1] not in (
+                        -1, a):
+                    candidates.append((x, y, x + 1, y, self.E, self.W))
+                if y + 1 < self.height and labels[
+                        (y + 1) * width + x] not in (-1, a):
+                    candidates.append((x, y, x, y + 1, self.S, self.N))
+        if not candidates:
+            return labels, count
+
+        rng.shuffle(candidates)
+        parent = array("i", range(count))
+
+        def find(c: int) -> int:
+            while parent[c] != c:
+                parent[c] = parent[parent[c]]
+                c = parent[c]
+            return c
+
+        for cx, cy, nx, ny, w_bit, opp_bit in candidates:
+            a = find(labels[cy * width + cx])
+            b = find(labels[ny * width + nx])
+            if a != b:
+                parent[b] = a
+                self._carve_passage(cx, cy, nx, ny, w_bit, opp_bit)
+
+        compact: Dict[int, int] = {}
+        for i, label in enumerate(labels):
+            if label != -1:
+                labels[i] = compact.setdefault(find(label), len(compact))
+        return labels, len(compact)
+
+    def _interior_walls(self) -> List[Tuple[int, int, int, int, int, int]]:
+        """Every closed wall between two open cells."""
+        walls = []
+        masks = dict(self.blocked_cells.rows())
+        free = bytes(self.width)
+        for y, row in enumerate(self.walls):
+            here = masks.get(y, free)
+            below = masks.get(y + 1, free)
+            for x, cell in enumerate(row):
+                if here[x]:
+                    continue
+                if (cell & self.E and x + 1 < self.width
+                        and not here[x + 1]):
+                    walls.append((x, y, x + 1, y, self.E, self.W))
+                if (cell & self.S and y + 1 < self.height
+                        and not below[x]):
+                    walls.append((x, y, x, y + 1, self.S, self.N))
+        return walls
+
+    def _insert_loops(self, rng: random.Random, count: int) -> None:
+        """Open exactly ``count`` closed interior walls, chosen uniformly.
+
+        Walls are drawn by index among all interior walls and redrawn
+        when open, so the cost follows ``count`` while closed walls are
+        plentiful. Past half of them the closed walls are listed once and
+        sampled instead. In a perfect maze every opened wall adds one
+        loop.
+        """
+        width, height = self.width, self.height
+        across = (width - 1) * height
+        total = across + width * (height - 1)
+        blocked = len(self.blocked_cells)
+        # Closed walls between open cells left by a spanning forest, at
+        # least; each blocked cell rules out at most four walls.
+        closed = total - 4 * blocked - (width * height - blocked - 1)
+        if count > closed // 2:
+            candidates = self._interior_walls()
+            if count > len(candidates):
+                raise ValueError(
+                    f"only {len(candidates)} walls can be opened")
+            chosen = rng.sample(candidates, count)
+        else:
+            seen: Set[int] = set()
+            chosen = []
+            while len(chosen) < count:
+                # ``below`` streams stop at 256, so draw from the rng.
+                index = rng.randrange(total)
+                if index in seen:
+                    continue
+                seen.add(index)
+                if index < across:
+                    y, x = divmod(index, width - 1)
+                    wall = (x, y, x + 1, y, self.E, self.W)
+                else:
+                    y, x = divmod(index - across, width)
+                    wall = (x, y, x, y + 1, self.S, self.N)
+                x, y, nx, ny, bit, _opp = wall
+                if (self.walls[y][x] & bit and not self.is_blocked(x, y)
+                        and not self.is_blocked(nx, ny)):
+                    chosen.append(wall)
+        for x, y, nx, ny, bit, opp_bit in chosen:
+            self._carve_passage(x, y, nx, ny, bit, opp_bit)
+        instrument.count("loops_added", len(chosen))
+
+    def _braid(self, rng: random.Random, fraction: float) -> None:
+        """Remove ``fraction`` of the dead ends in one queue pass.
+
+        Dead ends are queued in random order. Each one still a dead end
+        when its turn comes opens a wall, preferably towards another dead
+        end so one wall removes two.
+        """
+        degree = bytes(4 - bin(mask & 15).count("1") for mask in range(256))
+        queue: List[Tuple[int, int]] = []
+        for y, row in enumerate(self.walls):
+            degrees = bytes(row).translate(degree)
+            x = degrees.find(1)
+            while x >= 0:
+                if not self.is_blocked(x, y):
+                    queue.append((x, y))
+                x = degrees.find(1, x + 1)
+        rng.shuffle(queue)
+        target = round(fraction * len(queue))
+        removed = 0
+        for x, y in queue:
+            if removed >= target:
+                break
+            if degree[self.walls[y][x]] != 1:
+                continue
+            closed = [(nx, ny, bit, opp_bit)
+                      for nx, ny, bit, opp_bit in self._neighbors(x, y)
+                      if self.walls[y][x] & bit]
+            if not closed:
+                continue
+            ends = [c for c in closed if degree[self.walls[c[1]][c[0]]] == 1]
+            nx, ny, bit, opp_bit = rng.choice(ends or closed)
+            self._carve_passage(x, y, nx, ny, bit, opp_bit)
+            removed += 2 if ends else 1
+        instrument.count("dead_ends_removed", removed)
 
     def _add_loops(
             self,
             rng: random.Random, loop_chance: float = 0.1) -> None:
         """Randomly add loops to the maze."""
+        added = 0
         for y in range(self.height):
             for x in range(self.width):
                 if self.is_blocked(x, y):
@@ -255,3 +971,5 @@ class Maze:
                 self._carve_passage(
                     x, y, nx, ny, w_bit, opp_bit,
                 )
+                added += 1
+        instrument.count("loops_added", added)
@@ -1,5 +1,5 @@
 import curses
-from typing import Optional, Tuple, Set
+from typing import AbstractSet, Optional, Tuple
 
 from .maze_generator import Maze
 from .path_finder import bfs_find_path
@@ -75,6 +75,6 @@ class MazeRenderer:
             render_maze(maze, path=path, start=start, end=end)
 
 
-def _get_42_cells(maze: Maze) -> Set[Tuple[int, int]]:
+def _get_42_cells(maze: Maze) -> AbstractSet[Tuple[int, int]]:
     """Get all cells that are part of the 42 pattern."""
     return maze.blocked_cells
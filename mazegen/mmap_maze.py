@@ -0,0 +1,203 @@
+"""File-backed ``Maze`` for grids larger than memory.
+
+``MmapMaze`` keeps its walls in a file mapped with ``mmap``: ``walls[y]``
+is a memoryview of row ``y`` in the mapping, so the operating system
+pages rows in and out and only the rows being touched need to be in RAM.
+The file holds ``HEADER`` (magic ``AMZM``, version, width, height and
+the 42 pattern origin, -1 if none, padded to 32 bytes) followed by one
+wall-mask byte per cell, row-major. The blocked cells are the 42 pattern
+at the stored origin; other stencils cannot be stored.
+
+Page-friendly use depends on the algorithm:
+
+- ``binarytree`` and ``sidewinder`` carve row blocks from top to bottom
+  and touch each page about once, so they run out of core: working
+  memory follows the width (NumPy keeps ``vectorized.ROW_BLOCK`` rows of
+  temporaries), never the height. Generation asks the kernel for
+  sequential read-ahead where ``madvise`` exists.
+- ``tile_size`` generation writes tile rows back one after the other but
+  keeps the generated tiles in memory until they are stitched.
+- ``dfs``, ``prim``, ``hunt`` and ``kruskal`` build working buffers over
+  the whole grid (two to eight bytes per cell) before storing the walls
+  row by row, so the file saves the grid itself but not that memory.
+- ``write_output_file`` writes rows in order, but it solves the maze
+  first. ``bfs_find_path`` reads rows on demand and keeps a 4-byte parent
+  index per cell plus a Python set of the blocked cells. The NumPy search
+  reads ``cells`` without copying the grid, but its passage, distance
+  and parent arrays take at least 8 bytes per cell.
+- ``verify`` and ``analyze`` build open-direction and open-cell buffers
+  over the whole grid (a few bytes per cell, more on the NumPy path).
+- ``validate`` checks an output file one row at a time, so its memory
+  follows the width only.
+
+So a file larger than RAM can be generated with the streaming
+algorithms and validated, but solving, writing or verifying it needs
+working memory in proportion to the number of cells.
+
+A mapped maze pickles as its path. Generate one from the shell with::
+
+    python -m mazegen.mmap_maze big.amzm --size 50000x50000 \\
+        --algo sidewinder --seed 42
+"""
+
+import argparse
+import contextlib
+import mmap
+import os
+import struct
+from typing import Any, List, Optional, Tuple
+
+from .maze_generator import Maze
+from .stencil import LOGO_42, BlockedCells, Stencil
+
+MAGIC = b"AMZM"
+VERSION = 1
+HEADER = struct.Struct("<4sIIIii8x")
+STREAMING_ALGOS = ("binarytree", "sidewinder")
+
+
+class MmapMaze(Maze):
+    """``Maze`` whose wall grid lives in a memory-mapped file."""
+
+    def __init__(self, path: str, writable: bool = True) -> None:
+        # Maze.__init__ is skipped: it would allocate the grid in memory.
+        self.path = path
+        self.writable = writable
+        with open(path, "r+b" if writable else "rb") as f:
+            self._map = mmap.mmap(
+                f.fileno(), 0,
+                access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, version, width, height, ox, oy = HEADER.unpack_from(
+            self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a mapped maze file")
+        if len(self._map) != HEADER.size + width * height:
+            self._map.close()
+            raise ValueError(f"{path} is truncated")
+        self.width = width
+        self.height = height
+        self.revision = 0
+        self.cells = memoryview(self._map)[HEADER.size:]
+        if not writable:
+            self.cells = self.cells.toreadonly()
+        rows: List[Any] = [self.cells[y * width:(y + 1) * width]
+                           for y in range(height)]
+        self.walls = rows
+        self._rows = rows
+        self.pattern_origin = None if ox < 0 else (ox, oy)
+        self.blocked_cells = BlockedCells(width, height)
+        if self.pattern_origin:
+            self.blocked_cells.paint(LOGO_42, *self.pattern_origin)
+
+    @classmethod
+    def create(cls, path: str, width: int, height: int) -> "MmapMaze":
+        """Create a file for a ``width`` x ``height`` maze, walls closed."""
+        if width <= 0 or height <= 0:
+            raise ValueError("width and height must be positive")
+        closed = b"\x0f" * width
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, width, height, -1, -1))
+            for _ in range(height):
+                f.write(closed)
+        return cls(path)
+
+    def reset(self) -> None:
+        """Close every wall and clear the pattern."""
+        closed = b"\x0f" * self.width
+        self.revision += 1
+        for row in self.walls:
+            row[:] = closed
+        self.blocked_cells.clear()
+        self.pattern_origin = None
+
+    def generate_maze(
+        self,
+        seed: Optional[int] = None,
+        algo: str = "prim",
+        perfect: bool = True,
+        tile_size: Optional[int] = None,
+        workers: Optional[int] = None,
+        random_source: str = "std",
+        loops: Optional[int] = None,
+        loop_density: Optional[float] = None,
+        braid: Optional[float] = None,
+        stencil: Optional[Stencil] = None,
+    ) -> None:
+        """Generate into the file, then flush it; see ``Maze``."""
+        if stencil is not None:
+            raise ValueError("mapped maze files only store the 42 pattern")
+        if algo in STREAMING_ALGOS and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self._map.madvise(mmap.MADV_SEQUENTIAL)
+        super().generate_maze(seed=seed, algo=algo, perfect=perfect,
+                              tile_size=tile_size, workers=workers,
+                              random_source=random_source, loops=loops,
+                              loop_density=loop_density, braid=braid)
+        self.flush()
+
+    def flush(self) -> None:
+        """Write the header and push dirty pages to the file."""
+        if not self.writable:
+            return
+        ox, oy = self.pattern_origin or (-1, -1)
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, self.width,
+                         self.height, ox, oy)
+        self._map.flush()
+
+    def close(self) -> None:
+        """Flush and unmap; the maze must not be used afterwards."""
+        if self._map.closed:
+            return
+        self.flush()
+        for view in [*self._rows, self.cells]:
+            with contextlib.suppress(BufferError):
+                view.release()
+        self.walls = []
+        self._map.close()
+
+    def __enter__(self) -> "MmapMaze":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __reduce__(self) -> Tuple[Any, Tuple[str, bool]]:
+        return MmapMaze, (self.path, self.writable)
+
+
+def _size(text: str) -> Tuple[int, int]:
+    """Parse ``WIDTHxHEIGHT``."""
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Generate a mapped maze file, optionally writing the output file."""
+    parser = argparse.ArgumentParser(
+        description="Generate a maze into a memory-mapped file.")
+    parser.add_argument("path")
+    parser.add_argument("--size", type=_size, required=True,
+                        help="maze size as WIDTHxHEIGHT")
+    parser.add_argument("--algo", default="sidewinder")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--imperfect", action="store_true")
+    parser.add_argument("--output", default=None,
+                        help="also write the hex output file (solved "
+                             "from the top-left to the bottom-right cell)")
+    args = parser.parse_args(argv)
+    width, height = args.size
+    if os.path.exists(args.path):
+        parser.error(f"{args.path} already exists")
+    with MmapMaze.create(args.path, width, height) as maze:
+        maze.generate_maze(seed=args.seed, algo=args.algo,
+                           perfect=not args.imperfect)
+        if args.output:
+            from .output_writer import write_output_file
+
+            write_output_file(args.output, maze, (0, 0),
+                              (width - 1, height - 1))
+    print(f"{args.path}: {width}x{height} maze")
+
+
+if __name__ == "__main__":
+    main()
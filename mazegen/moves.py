@@ -0,0 +1,130 @@
+"""Move string encoders and decoders.
+
+A solution is written as one ``N``/``E``/``S``/``W`` letter per step.
+For very long solutions two compact encodings are available:
+
+- ``rle``: run-length, each letter followed by its repeat count when the
+  count is above one (``EEEES`` becomes ``E4S``).
+- ``packed``: two bits per move (N=0, E=1, S=2, W=3, first move in the
+  low bits), four moves per byte, written as ``<moves>:<base64>``.
+
+``plain`` stays the default. Every encoding round-trips exactly through
+``decode_moves``, which also recognises the encoding on its own. The
+plain and packed conversions run through C-level ``map``/``translate``
+calls rather than a Python loop per step; run-length coding does one
+step of Python work per run.
+"""
+
+import base64
+import itertools
+import operator
+import re
+from typing import Dict, Optional, Sequence, Tuple
+
+MOVE_ENCODINGS = ("plain", "rle", "packed")
+
+_LETTERS = "NESW"
+_NOT_MOVES = str.maketrans("", "", _LETTERS)
+_NOT_RLE = str.maketrans("", "", _LETTERS + "0123456789")
+_RUNS = re.compile(r"N+|E+|S+|W+")
+_RUN = re.compile(r"([NESW])(\d*)")
+_PACK: Dict[Tuple[str, ...], int] = {
+    combo: sum(_LETTERS.index(c) << (2 * i) for i, c in enumerate(combo))
+    for combo in itertools.product(_LETTERS, repeat=4)
+}
+_UNPACK = ["".join(_LETTERS[(byte >> (2 * i)) & 3] for i in range(4))
+           for byte in range(256)]
+
+
+def _check_plain(moves: str) -> None:
+    """Reject strings with characters other than N, E, S and W."""
+    if moves.translate(_NOT_MOVES):
+        raise ValueError("moves must only contain N, E, S and W")
+
+
+def flat_path_to_moves(path: Sequence[int], width: int) -> str:
+    """Convert a path of flat cell indices (``y * width + x``) to moves."""
+    if width == 1:
+        # Steps of one cell are vertical here; the general table's keys
+        # would collide (``-width == -1``).
+        letters = {-1: "N", 1: "S"}
+    else:
+        letters = {-width: "N", 1: "E", width: "S", -1: "W"}
+    steps = map(operator.sub, path[1:], path[:-1])
+    try:
+        return "".join(map(letters.__getitem__, steps))
+    except KeyError:
+        raise ValueError("path cells must be adjacent") from None
+
+
+def rle_encode(moves: str) -> str:
+    """Run-length encode a move string (``EEEES`` -> ``E4S``)."""
+    _check_plain(moves)
+    return "".join([run if len(run) == 1 else run[0] + str(len(run))
+                    for run in _RUNS.findall(moves)])
+
+
+def rle_decode(text: str) -> str:
+    """Expand a run-length encoded move string."""
+    if text.translate(_NOT_RLE) or text[:1].isdigit():
+        raise ValueError("invalid run-length move string")
+    runs = _RUN.findall(text)
+    if any(count and int(count) < 1 for _letter, count in runs):
+        raise ValueError("run-length counts must be at least 1")
+    return "".join([letter * int(count) if count else letter
+                    for letter, count in runs])
+
+
+def pack_moves(moves: str) -> str:
+    """Pack a move string two bits per move as ``<moves>:<base64>``."""
+    _check_plain(moves)
+    padded = moves + "N" * (-len(moves) % 4)
+    packed = bytes(map(_PACK.__getitem__, zip(*[iter(padded)] * 4)))
+    return f"{len(moves)}:{base64.b64encode(packed).decode('ascii')}"
+
+
+def unpack_moves(text: str) -> str:
+    """Reverse ``pack_moves``."""
+    count, sep, payload = text.partition(":")
+    if not sep or not count.isdigit():
+        raise ValueError("invalid packed move string")
+    packed = base64.b64decode(payload, validate=True)
+    moves = "".join(map(_UNPACK.__getitem__, packed))
+    if len(moves) < int(count):
+        raise ValueError("packed move string is truncated")
+    return moves[:int(count)]
+
+
+def encode_moves(moves: str, encoding: str = "plain") -> str:
+    """Encode a plain move string with ``encoding``."""
+    if encoding == "plain":
+        return moves
+    if encoding == "rle":
+        return rle_encode(moves)
+    if encoding == "packed":
+        return pack_moves(moves)
+    raise ValueError(
+        f"Unknown move encoding '{encoding}' "
+        f"(available: {', '.join(MOVE_ENCODINGS)})")
+
+
+def detect_encoding(text: str) -> str:
+    """Guess the encoding of a move line."""
+    if ":" in text:
+        return "packed"
+    if any(c.isdigit() for c in text):
+        return "rle"
+    return "plain"
+
+
+def decode_moves(text: str, encoding: Optional[str] = None) -> str:
+    """Decode a move line; the encoding is detected when not given."""
+    encoding = encoding or detect_encoding(text)
+    if encoding == "plain":
+        _check_plain(text)
+        return text
+    if encoding == "rle":
+        return rle_decode(text)
+    if encoding == "packed":
+        return unpack_moves(text)
+    raise ValueError(f"Unknown move encoding '{encoding}'")
@@ -1,40 +1,287 @@
-"""Maze output writer for hexadecimal encoding."""
+"""Maze output writer for hexadecimal encoding.
 
-from typing import List, Tuple
+Output files may be compressed with gzip, bz2 or lzma. The writer picks
+the codec from ``compression`` or, by default, from the file extension
+(``.gz``, ``.bz2``, ``.xz``/``.lzma``); the reader recognises compressed
+files by their magic bytes whatever their name. Rows are encoded and
+compressed one at a time, so memory use does not grow with the file.
+With ``threaded=True`` the compressor runs on a background thread (the
+codecs release the GIL) while the main thread keeps encoding rows.
+"""
 
+import bz2
+import gzip
+import itertools
+import lzma
+import os
+import queue
+import threading
+from typing import (
+    IO, Any, Callable, Dict, Iterator, List, Optional, Tuple)
+
+from . import instrument
 from .maze_generator import Maze
-from .path_finder import bfs_find_path, path_to_moves
+from .moves import decode_moves, encode_moves, flat_path_to_moves
+from .path_finder import bfs_flat_path
+
+COMPRESSIONS = ("none", "gzip", "bz2", "lzma")
+_EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "lzma", ".lzma": "lzma"}
+_MAGIC = ((b"\x1f\x8b", "gzip"), (b"BZh", "bz2"),
+          (b"\xfd7zXZ\x00", "lzma"))
+_OPENERS: Dict[str, Callable[..., IO[Any]]] = {
+    "gzip": gzip.open, "bz2": bz2.open, "lzma": lzma.open}
+_HEX = bytes.maketrans(bytes(range(16)), b"0123456789ABCDEF")
+_UNHEX = bytes.maketrans(b"0123456789ABCDEFabcdef",
+                         bytes(range(16)) + bytes(range(10, 16)))
+_HEX_DIGITS = b"0123456789ABCDEFabcdef"
+_CHUNK = 1 << 16
 
 
 def maze_to_hex_rows(maze: Maze) -> List[str]:
     """Convert maze walls to hex rows."""
-    rows: List[str] = []
-    for y in range(maze.height):
-        row = "".join(format(cell, "X") for cell in maze.walls[y])
-        rows.append(row)
-    return rows
+    with instrument.span("hex_encode"):
+        return list(_hex_rows(maze))
 
 
-def write_output_file(
-    output_file: str,
+def _hex_rows(maze: Maze) -> Iterator[str]:
+    """Yield each row as one hex digit per cell."""
+    for row in maze.walls:
+        yield bytes(row).translate(_HEX).decode("ascii")
+
+
+def _hex_blocks(maze: Maze) -> Iterator[str]:
+    """Yield the hex rows, newlines included, about ``_CHUNK`` at a time.
+
+    Each block is encoded inside a ``hex_encode`` span, so the encoding
+    cost shows up separately from the file writes.
+    """
+    walls = maze.walls
+    step = max(1, _CHUNK // (maze.width + 1))
+    for top in range(0, maze.height, step):
+        with instrument.span("hex_encode"):
+            block = "".join([
+                bytes(walls[y]).translate(_HEX).decode("ascii") + "\n"
+                for y in range(top, min(top + step, maze.height))])
+        yield block
+
+
+def _trailer_lines(
+    entry: Tuple[int, int],
+    exit_pos: Tuple[int, int],
+    moves: str,
+    move_encoding: str,
+) -> Iterator[str]:
+    """Yield the blank line, entry, exit and moves lines."""
+    yield "\n"
+    yield f"{entry[0]},{entry[1]}\n"
+    yield f"{exit_pos[0]},{exit_pos[1]}\n"
+    yield encode_moves(moves, move_encoding) + "\n"
+
+
+def solve_moves(
     maze: Maze,
     entry: Tuple[int, int],
     exit_pos: Tuple[int, int],
 ) -> str:
-    """Write maze to output file and return the shortest path moves."""
-    path = bfs_find_path(maze, entry, exit_pos)
+    """Return the shortest ENTRY to EXIT moves, or raise ValueError."""
+    path = bfs_flat_path(maze, entry, exit_pos)
     if not path:
         raise ValueError("No valid path between ENTRY and EXIT")
+    return flat_path_to_moves(path, maze.width)
+
+
+def iter_output_lines(
+    maze: Maze,
+    entry: Tuple[int, int],
+    exit_pos: Tuple[int, int],
+    moves: str,
+    move_encoding: str = "plain",
+) -> Iterator[str]:
+    """Yield the output file line by line, newline included."""
+    for row in _hex_rows(maze):
+        yield row + "\n"
+    yield from _trailer_lines(entry, exit_pos, moves, move_encoding)
+
+
+def format_output(
+    maze: Maze,
+    entry: Tuple[int, int],
+    exit_pos: Tuple[int, int],
+    moves: str,
+    move_encoding: str = "plain",
+) -> str:
+    """Return the complete output file text.
+
+    ``move_encoding`` selects how the solution line is written (see
+    ``mazegen.moves``); ``plain`` keeps the one-letter-per-step format.
+    """
+    return "".join(
+        iter_output_lines(maze, entry, exit_pos, moves, move_encoding))
+
 
-    moves = path_to_moves(path)
-    lines = maze_to_hex_rows(maze)
-    lines.append("")
-    lines.append(f"{entry[0]},{entry[1]}")
-    lines.append(f"{exit_pos[0]},{exit_pos[1]}")
-    lines.append(moves)
+def compression_for(path: str, compression: Optional[str] = None) -> str:
+    """Resolve ``compression`` (None or ``auto`` = by file extension)."""
+    if compression is None or compression == "auto":
+        return _EXTENSIONS.get(os.path.splitext(path)[1].lower(), "none")
+    if compression not in COMPRESSIONS:
+        raise ValueError(
+            f"Unknown compression '{compression}' "
+            f"(available: auto, {', '.join(COMPRESSIONS)})")
+    return compression
 
-    with open(output_file, "w") as f:
-        f.write("\n".join(lines))
-        f.write("\n")
+
+def open_output(
+    path: str, mode: str = "r", compression: Optional[str] = None
+) -> IO[Any]:
+    """Open a maze file, compressed or not, in text mode.
+
+    When reading, the codec is taken from the file's magic bytes; when
+    writing, from ``compression`` or the file extension.
+    """
+    if "r" in mode:
+        with open(path, "rb") as f:
+            head = f.read(6)
+        codec = next(
+            (name for magic, name in _MAGIC if head.startswith(magic)),
+            "none")
+    else:
+        codec = compression_for(path, compression)
+    text_mode = mode.replace("b", "").replace("t", "") + "t"
+    if codec == "none":
+        return open(path, text_mode)
+    return _OPENERS[codec](path, text_mode)
+
+
+class _BackgroundWriter:
+    """File-like object handing text chunks to a writer thread."""
+
+    def __init__(self, target: IO[Any], depth: int = 8) -> None:
+        self._target = target
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(depth)
+        self._parts: List[str] = []
+        self._size = 0
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            if self._error is None:
+                try:
+                    self._target.write(chunk)
+                except BaseException as e:  # re-raised by close()
+                    self._error = e
+
+    def write(self, text: str) -> None:
+        if self._error is not None:
+            raise self._error
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= _CHUNK:
+            self._queue.put("".join(self._parts))
+            self._parts, self._size = [], 0
+
+    def close(self) -> None:
+        if self._parts:
+            self._queue.put("".join(self._parts))
+            self._parts = []
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+def write_output_file(
+    output_file: str,
+    maze: Maze,
+    entry: Tuple[int, int],
+    exit_pos: Tuple[int, int],
+    move_encoding: str = "plain",
+    compression: Optional[str] = None,
+    threaded: bool = False,
+) -> str:
+    """Write maze to output file and return the shortest path moves.
+
+    ``compression`` is ``auto`` (the default, chosen by extension),
+    ``none``, ``gzip``, ``bz2`` or ``lzma``. ``threaded`` moves the
+    compression and file writes to a background thread.
+    """
+    moves = solve_moves(maze, entry, exit_pos)
+    written = 0
+    with instrument.span("write"), \
+            open_output(output_file, "w", compression) as f:
+        out: Any = _BackgroundWriter(f) if threaded else f
+        try:
+            for text in itertools.chain(
+                    _hex_blocks(maze),
+                    _trailer_lines(entry, exit_pos, moves, move_encoding)):
+                out.write(text)
+                written += len(text)
+        finally:
+            if threaded:
+                out.close()
+    instrument.count("bytes_written", written)
 
     return moves
+
+
+def read_output_file(
+    path: str,
+) -> Tuple[Maze, Tuple[int, int], Tuple[int, int], str]:
+    """Load an output file as (maze, entry, exit, moves).
+
+    Cells whose walls are all closed are treated as blocked, which is
+    how the 42 pattern appears in the file. The moves are decoded from
+    whichever move encoding the file uses, and compressed files are
+    decompressed on the fly.
+    """
+    rows: List[List[int]] = []
+    tail: List[str] = []
+    with open_output(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                break
+            try:
+                rows.append(list(decode_hex_row(line)))
+            except ValueError as e:
+                raise ValueError(f"Row {len(rows)}: {e}") from None
+        else:
+            raise ValueError("Missing blank line after the maze rows")
+        for line in f:
+            tail.append(line.strip())
+            if len(tail) == 3:
+                break
+    if not rows or any(len(row) != len(rows[0]) for row in rows):
+        raise ValueError("Maze rows must be non-empty and equally long")
+    if len(tail) < 2:
+        raise ValueError("Missing ENTRY/EXIT lines")
+    entry = parse_point(tail[0])
+    exit_pos = parse_point(tail[1])
+    moves = decode_moves(tail[2]) if len(tail) > 2 else ""
+
+    maze = Maze(len(rows[0]), len(rows))
+    for y, cells in enumerate(rows):
+        maze.walls[y] = cells
+        maze.blocked_cells.update(
+            (x, y) for x, cell in enumerate(cells) if cell == 15)
+    return maze, entry, exit_pos, moves
+
+
+def decode_hex_row(line: str) -> bytes:
+    """Decode one hex row into one wall-mask byte per cell."""
+    raw = line.encode("ascii", "replace")
+    if raw.translate(None, _HEX_DIGITS):
+        raise ValueError("invalid hex digit")
+    return raw.translate(_UNHEX)
+
+
+def parse_point(text: str) -> Tuple[int, int]:
+    """Parse an ``x,y`` line."""
+    parts = text.split(",")
+    if len(parts) != 2:
+        raise ValueError(f"Invalid coordinates '{text}'")
+    return int(parts[0]), int(parts[1])
@@ -3,27 +3,51 @@
 from dataclasses import dataclass
 from typing import Optional, Tuple, Dict, Any
 
+from .moves import MOVE_ENCODINGS
+from .output_writer import COMPRESSIONS
+from .random_source import random_sources
+
 
 @dataclass
 class MazeConfig:
     """Configuration for maze generation."""
     width: int
     height: int
-    entry: Tuple[int, int]
-    exit: Tuple[int, int]
+    entry: Optional[Tuple[int, int]]
+    exit: Optional[Tuple[int, int]]
     output_file: str
     perfect: bool
     seed: Optional[int] = None
     algo: str = "dfs"
+    tile_size: Optional[int] = None
+    random_source: str = "std"
+    move_encoding: str = "plain"
+    compression: str = "auto"
+    compression_thread: bool = False
+    auto_border: bool = False
+    loops: Optional[int] = None
+    loop_density: Optional[float] = None
+    braid: Optional[float] = None
+    stencil: Optional[str] = None
 
 
-def _parse_bool(value: str) -> bool:
+def _parse_bool(value: str, key: str = "PERFECT") -> bool:
     value_lower = value.strip().lower()
     if value_lower in {"true", "1", "yes", "y"}:
         return True
     if value_lower in {"false", "0", "no", "n"}:
         return False
-    raise ValueError("PERFECT must be True or False")
+    raise ValueError(f"{key} must be True or False")
+
+
+def _parse_position(value: str) -> Any:
+    """Parse ``x,y`` into a tuple; ``auto`` is kept as a string."""
+    if value.lower() == "auto":
+        return "auto"
+    coords = tuple(map(int, value.split(",")))
+    if len(coords) != 2:
+        raise ValueError("Must have exactly 2 coordinates")
+    return coords
 
 
 def _validate_config(config: Dict[str, Any]) -> MazeConfig:
@@ -36,14 +60,18 @@ def _validate_config(config: Dict[str, Any]) -> MazeConfig:
 
     if width is None or height is None:
         raise ValueError("WIDTH and HEIGHT are required")
-    if not isinstance(width, int) or not isinstance(height, int):
+    # ``bool`` is an ``int`` subclass; JSON ``true`` is not a size.
+    if (not isinstance(width, int) or not isinstance(height, int)
+            or isinstance(width, bool) or isinstance(height, bool)):
         raise ValueError("WIDTH and HEIGHT must be integers")
     if width <= 0 or height <= 0:
         raise ValueError("WIDTH and HEIGHT must be positive")
 
-    def _validate_point(name: str, p: Any) -> Tuple[int, int]:
+    def _validate_point(name: str, p: Any) -> Optional[Tuple[int, int]]:
         if p is None:
             raise ValueError(f"{name} is required")
+        if isinstance(p, str) and p.lower() == "auto":
+            return None
         if not isinstance(p, tuple) or len(p) != 2:
             raise ValueError(f"{name} must be in x,y format")
         x, y = p
@@ -51,14 +79,17 @@ def _validate_config(config: Dict[str, Any]) -> MazeConfig:
             raise ValueError(f"{name} coordinates must be integers")
         return x, y
 
-    ex, ey = _validate_point("ENTRY", entry)
-    xx, xy = _validate_point("EXIT", exit_pos)
+    # ``auto`` positions are None here and placed after generation.
+    entry = _validate_point("ENTRY", entry)
+    exit_pos = _validate_point("EXIT", exit_pos)
 
-    if (ex, ey) == (xx, xy):
+    if entry is not None and entry == exit_pos:
         raise ValueError("ENTRY and EXIT must be different")
-    if not (0 <= ex < width and 0 <= ey < height):
+    if entry is not None and not (
+            0 <= entry[0] < width and 0 <= entry[1] < height):
         raise ValueError("ENTRY is out of bounds")
-    if not (0 <= xx < width and 0 <= xy < height):
+    if exit_pos is not None and not (
+            0 <= exit_pos[0] < width and 0 <= exit_pos[1] < height):
         raise ValueError("EXIT is out of bounds")
 
     if output_file is None:
@@ -76,22 +107,107 @@ def _validate_config(config: Dict[str, Any]) -> MazeConfig:
     if not isinstance(algo, str):
         raise ValueError("ALGO must be a string")
     algo_l = algo.lower()
-    if algo_l not in {"dfs", "prim", "hunt"}:
-        raise ValueError("ALGO must be 'dfs', 'prim', or 'hunt'")
+    if algo_l not in {
+            "dfs", "prim", "hunt", "kruskal", "binarytree", "sidewinder"}:
+        raise ValueError(
+            "ALGO must be 'dfs', 'prim', 'hunt', 'kruskal', "
+            "'binarytree', or 'sidewinder'"
+        )
     algo = algo_l
 
     seed = config.get("seed")
-    if seed is not None and not isinstance(seed, int):
+    if seed is not None and (
+            not isinstance(seed, int) or isinstance(seed, bool)):
         raise ValueError("SEED must be an integer")
+
+    tile_size = config.get("tile_size")
+    if tile_size is not None:
+        if (not isinstance(tile_size, int) or isinstance(tile_size, bool)
+                or tile_size <= 0):
+            raise ValueError("TILE_SIZE must be a positive integer")
+
+    random_source = config.get("random_source", "std")
+    if not isinstance(random_source, str):
+        raise ValueError("RANDOM_SOURCE must be a string")
+    random_source = random_source.lower()
+    if random_source not in random_sources():
+        raise ValueError(
+            "RANDOM_SOURCE must be one of: " + ", ".join(random_sources())
+        )
+
+    move_encoding = config.get("move_encoding", "plain")
+    if not isinstance(move_encoding, str):
+        raise ValueError("MOVE_ENCODING must be a string")
+    move_encoding = move_encoding.lower()
+    if move_encoding not in MOVE_ENCODINGS:
+        raise ValueError(
+            "MOVE_ENCODING must be one of: " + ", ".join(MOVE_ENCODINGS)
+        )
+
+    compression = config.get("compression", "auto")
+    if not isinstance(compression, str):
+        raise ValueError("COMPRESSION must be a string")
+    compression = compression.lower()
+    if compression != "auto" and compression not in COMPRESSIONS:
+        raise ValueError(
+            "COMPRESSION must be one of: auto, " + ", ".join(COMPRESSIONS)
+        )
+
+    compression_thread = config.get("compression_thread", False)
+    if not isinstance(compression_thread, bool):
+        raise ValueError("COMPRESSION_THREAD must be True or False")
+
+    auto_border = config.get("auto_border", False)
+    if not isinstance(auto_border, bool):
+        raise ValueError("AUTO_BORDER must be True or False")
+
+    loops = config.get("loops")
+    if loops is not None:
+        if (not isinstance(loops, int) or isinstance(loops, bool)
+                or loops < 0):
+            raise ValueError("LOOPS must be a non-negative integer")
+
+    def _validate_fraction(name: str, value: Any) -> Optional[float]:
+        if value is None:
+            return None
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise ValueError(f"{name} must be a number")
+        if not 0 <= value <= 1:
+            raise ValueError(f"{name} must be between 0 and 1")
+        return float(value)
+
+    loop_density = _validate_fraction("LOOP_DENSITY",
+                                      config.get("loop_density"))
+    braid = _validate_fraction("BRAID", config.get("braid"))
+    if loops is not None and loop_density is not None:
+        raise ValueError("LOOPS and LOOP_DENSITY cannot both be set")
+    if perfect and (loops, loop_density, braid) != (None, None, None):
+        raise ValueError(
+            "LOOPS, LOOP_DENSITY and BRAID need PERFECT=False")
+
+    stencil = config.get("stencil")
+    if stencil is not None and (
+            not isinstance(stencil, str) or not stencil.strip()):
+        raise ValueError("STENCIL must be a non-empty filename")
     return MazeConfig(
         width=width,
         height=height,
-        entry=(ex, ey),
-        exit=(xx, xy),
+        entry=entry,
+        exit=exit_pos,
         output_file=output_file,
         perfect=perfect,
         seed=seed,
         algo=algo,
+        tile_size=tile_size,
+        random_source=random_source,
+        move_encoding=move_encoding,
+        compression=compression,
+        compression_thread=compression_thread,
+        auto_border=auto_border,
+        loops=loops,
+        loop_density=loop_density,
+        braid=braid,
+        stencil=stencil,
     )
 
 
@@ -110,6 +226,12 @@ def parse_file(filepath: str) -> MazeConfig:
     EXIT=29,19
     SEED=42
     ALGO=dfs
+    TILE_SIZE=256
+    LOOPS=40
+
+    ``ENTRY`` and ``EXIT`` may be ``auto`` (see ``mazegen.placement``).
+    ``STENCIL`` names a PBM or text bitmap that replaces the 42 pattern
+    (see ``mazegen.stencil``).
 
     Args:
         filepath: Path to configuration file
@@ -159,16 +281,8 @@ def parse_file(filepath: str) -> MazeConfig:
                     set_once("width", int(value), line_num)
                 elif key == "HEIGHT":
                     set_once("height", int(value), line_num)
-                elif key == "ENTRY":
-                    coords = tuple(map(int, value.split(",")))
-                    if len(coords) != 2:
-                        raise ValueError("Must have exactly 2 coordinates")
-                    set_once("entry", coords, line_num)
-                elif key == "EXIT":
-                    coords = tuple(map(int, value.split(",")))
-                    if len(coords) != 2:
-                        raise ValueError("Must have exactly 2 coordinates")
-                    set_once("exit", coords, line_num)
+                elif key in ("ENTRY", "EXIT"):
+                    set_once(key.lower(), _parse_position(value), line_num)
                 elif key == "OUTPUT_FILE":
                     set_once("output_file", value, line_num)
                 elif key == "PERFECT":
@@ -177,6 +291,26 @@ def parse_file(filepath: str) -> MazeConfig:
                     set_once("seed", int(value), line_num)
                 elif key == "ALGO":
                     set_once("algo", value.lower(), line_num)
+                elif key == "TILE_SIZE":
+                    set_once("tile_size", int(value), line_num)
+                elif key == "RANDOM_SOURCE":
+                    set_once("random_source", value.lower(), line_num)
+                elif key == "MOVE_ENCODING":
+                    set_once("move_encoding", value.lower(), line_num)
+                elif key == "COMPRESSION":
+                    set_once("compression", value.lower(), line_num)
+                elif key == "AUTO_BORDER":
+                    set_once("auto_border", _parse_bool(value, key),
+                             line_num)
+                elif key == "LOOPS":
+                    set_once("loops", int(value), line_num)
+                elif key in ("LOOP_DENSITY", "BRAID"):
+                    set_once(key.lower(), float(value), line_num)
+                elif key == "STENCIL":
+                    set_once("stencil", value, line_num)
+                elif key == "COMPRESSION_THREAD":
+                    set_once("compression_thread",
+                             _parse_bool(value, key), line_num)
                 else:
                     raise ValueError(f"Unknown key '{key}'")
             except ValueError as e:
@@ -1,10 +1,19 @@
-"""Breadth-First Search pathfinder and move sequence generator."""
+"""Breadth-First Search pathfinder and move sequence generator.
 
-from collections import deque
-from typing import Deque, List, Tuple, Optional
+With NumPy installed, grids of at least ``VECTORIZE_CELLS`` cells are
+searched level by level with ``vectorized.bfs_levels``, which returns
+the same paths as the queue-based search.
+"""
 
+import operator
+from array import array
+from typing import List, Tuple, Optional
+
+from . import instrument, vectorized
 from .maze_generator import Maze
 
+VECTORIZE_CELLS = 1 << 16
+
 
 def _is_wall_between(maze: Maze, x: int, y: int, dx: int, dy: int) -> bool:
     """Return True if there is a wall between (x, y) and (x+dx, y+dy)."""
@@ -30,9 +39,64 @@ def bfs_find_path(
     maze: Maze,
     start: Tuple[int, int],
     end: Tuple[int, int],
+    vectorize: Optional[bool] = None,
 ) -> Optional[List[Tuple[int, int]]]:
     """Find the shortest path avoiding blocked cells and walls."""
+    flat = bfs_flat_path(maze, start, end, vectorize)
+    if flat is None:
+        return None
+    width = maze.width
+    return [(cell % width, cell // width) for cell in flat]
 
+
+def bfs_flat_path(
+    maze: Maze,
+    start: Tuple[int, int],
+    end: Tuple[int, int],
+    vectorize: Optional[bool] = None,
+) -> Optional[List[int]]:
+    """Like ``bfs_find_path`` but return flat ``y * width + x`` indices.
+
+    Each cell stores the cell it was discovered from, so the search keeps
+    one integer per cell instead of a path per queue entry. Neighbors are
+    explored in N, E, S, W order and the first discovery wins, which gives
+    exactly the path the list-based search returned.
+
+    ``vectorize`` forces (True) or disables (False) the NumPy search; by
+    default it is used for large grids when NumPy is available.
+    """
+    if vectorize is None:
+        vectorize = (vectorized.HAVE_NUMPY
+                     and maze.width * maze.height >= VECTORIZE_CELLS)
+    if vectorize and not vectorized.HAVE_NUMPY:
+        raise ValueError("the vectorized search needs NumPy")
+    with instrument.span("bfs"):
+        if vectorize:
+            return _bfs_levels_path(maze, start, end)
+        return _bfs_flat_path(maze, start, end)
+
+
+def _bfs_levels_path(
+    maze: Maze,
+    start: Tuple[int, int],
+    end: Tuple[int, int],
+) -> Optional[List[int]]:
+    for x, y in (start, end):
+        if not maze.in_bounds(x, y) or maze.is_blocked(x, y):
+            return None
+    first = start[1] * maze.width + start[0]
+    goal = end[1] * maze.width + end[0]
+    dist, parent_dir = vectorized.bfs_levels(maze, first, goal)
+    if instrument.enabled():
+        instrument.count("bfs_nodes_visited", int((dist >= 0).sum()))
+    return vectorized.path_from_parents(parent_dir, first, goal, maze.width)
+
+
+def _bfs_flat_path(
+    maze: Maze,
+    start: Tuple[int, int],
+    end: Tuple[int, int],
+) -> Optional[List[int]]:
     xs, ys = start
     xe, ye = end
 
@@ -41,34 +105,41 @@ def bfs_find_path(
     if not maze.in_bounds(xs, ys) or maze.is_blocked(xs, ys):
         return None
 
-    d: Deque[Tuple[int, int, List[Tuple[int, int]]]] = deque()
-    d.append((xs, ys, [start]))
-    visited = {start}
-
-    directions = [
-        (0, -1),
-        (1, 0),
-        (0, 1),
-        (-1, 0),
-    ]
-
-    while d:
-        x, y, path = d.popleft()
-        if (x, y) == end:
-            return path
-
-        for dx, dy in directions:
-            nx, ny = x + dx, y + dy
-            if (
-                maze.in_bounds(nx, ny)
-                and not maze.is_blocked(nx, ny)
-                and (nx, ny) not in visited
-                and not _is_wall_between(maze, x, y, dx, dy)
-            ):
-                visited.add((nx, ny))
-                d.append((nx, ny, path + [(nx, ny)]))
+    width, height = maze.width, maze.height
+    walls = maze.walls
+    blocked = {y * width + x for x, y in maze.blocked_cells}
+    first = ys * width + xs
+    goal = ye * width + xe
+    parent = array("i", [-1]) * (width * height)
+    parent[first] = first
+    queue = [first]
+    last_row = (height - 1) * width
+
+    for cell in queue:
+        if cell == goal:
+            break
+        y, x = divmod(cell, width)
+        mask = walls[y][x]
+        steps = (
+            (cell >= width and not mask & maze.N, cell - width),
+            (x + 1 < width and not mask & maze.E, cell + 1),
+            (cell < last_row and not mask & maze.S, cell + width),
+            (x > 0 and not mask & maze.W, cell - 1),
+        )
+        for is_open, nxt in steps:
+            if is_open and parent[nxt] < 0 and nxt not in blocked:
+                parent[nxt] = cell
+                queue.append(nxt)
+    else:
+        instrument.count("bfs_nodes_visited", len(queue))
+        return None
 
-    return None
+    instrument.count("bfs_nodes_visited", len(queue))
+    path = [goal]
+    while path[-1] != first:
+        path.append(parent[path[-1]])
+    path.reverse()
+    return path
 
 
 def path_to_moves(path: List[Tuple[int, int]]) -> str:
@@ -76,19 +147,15 @@ def path_to_moves(path: List[Tuple[int, int]]) -> str:
     if not path or len(path) < 2:
         return ""
 
-    moves = []
     dir_map = {
         (0, -1): "N",
         (1, 0): "E",
         (0, 1): "S",
         (-1, 0): "W",
     }
-
-    for i in range(len(path) - 1):
-        x1, y1 = path[i]
-        x2, y2 = path[i + 1]
-        move = dir_map.get((x2 - x1, y2 - y1))
-        if move:
-            moves.append(move)
-
-    return "".join(moves)
+    xs = [x for x, _ in path]
+    ys = [y for _, y in path]
+    deltas = zip(map(operator.sub, xs[1:], xs[:-1]),
+                 map(operator.sub, ys[1:], ys[:-1]))
+    # Non-adjacent steps have no letter and are skipped.
+    return "".join(filter(None, map(dir_map.get, deltas)))
@@ -0,0 +1,112 @@
+"""Automatic ENTRY/EXIT placement at the farthest pair of cells.
+
+``ENTRY=auto`` and ``EXIT=auto`` place the endpoints without a quadratic
+all-pairs search: a breadth-first search from any open cell ends on one
+end of a longest shortest path, and a second search from there finds
+the other end (the double sweep). With ``AUTO_BORDER`` only cells on the
+outer edge of the grid are candidates. When only one of the two is
+``auto`` it is placed as far as possible from the other one, which is
+checked first: it must be inside the grid and not on a blocked cell.
+The first sweep starts in the largest connected part of the maze, as
+obstacles can cut off a few cells that no generator carves.
+
+In a perfect maze the double sweep is exact, also restricted to border
+cells. With loops it returns a pair at least as far apart as any cell
+pair found from the starting cell, which is close to the diameter in
+practice.
+"""
+
+from typing import List, Optional, Tuple
+
+from .analysis import bfs, direction_buffer, neighbor_table
+from .maze_generator import Maze
+
+Point = Tuple[int, int]
+_UNCARVED = bytes([1] + [0] * 255)
+
+
+class _Sweeper:
+    """Breadth-first searches over one maze's open cells."""
+
+    def __init__(self, maze: Maze, border_only: bool) -> None:
+        self.width, self.height = maze.width, maze.height
+        self.dirs = direction_buffer(maze.walls, maze.blocked_cells,
+                                     self.width, self.height)
+        self.nbrs = neighbor_table(self.width)
+        self.border_only = border_only
+
+    def candidate(self, cell: int) -> bool:
+        """True if ``cell`` may be an endpoint."""
+        if not self.border_only:
+            return True
+        x, y = cell % self.width, cell // self.width
+        return (x in (0, self.width - 1)) or (y in (0, self.height - 1))
+
+    def farthest(self, start: int) -> int:
+        """Return the last candidate cell reached from ``start``."""
+        _dist, order = bfs(self.nbrs, self.dirs, start)
+        for cell in reversed(order):
+            if cell != start and self.candidate(cell):
+                return cell
+        raise ValueError("no reachable cell to place ENTRY/EXIT on")
+
+    def largest_component(self) -> List[int]:
+        """Return the cells of the largest connected set of passages."""
+        seen = bytearray(self.dirs.translate(_UNCARVED))
+        largest: List[int] = []
+        start = seen.find(0)
+        while start >= 0:
+            _dist, order = bfs(self.nbrs, self.dirs, start)
+            for cell in order:
+                seen[cell] = 1
+            if len(order) > len(largest):
+                largest = order
+            start = seen.find(0, start + 1)
+        return largest
+
+    def point(self, cell: int) -> Point:
+        """Convert a flat index to ``(x, y)``."""
+        return cell % self.width, cell // self.width
+
+
+def farthest_pair(
+    maze: Maze, border_only: bool = False
+) -> Tuple[Point, Point]:
+    """Return the endpoints of the maze's longest shortest path."""
+    sweeper = _Sweeper(maze, border_only)
+    component = sweeper.largest_component()
+    if not component:
+        raise ValueError("no reachable cell to place ENTRY/EXIT on")
+    first = sweeper.farthest(component[0])
+    return sweeper.point(first), sweeper.point(sweeper.farthest(first))
+
+
+def farthest_from(
+    maze: Maze, origin: Point, border_only: bool = False
+) -> Point:
+    """Return the candidate cell farthest from ``origin``."""
+    sweeper = _Sweeper(maze, border_only)
+    return sweeper.point(sweeper.farthest(origin[1] * maze.width + origin[0]))
+
+
+def place_entry_exit(
+    maze: Maze,
+    entry: Optional[Point],
+    exit_pos: Optional[Point],
+    border_only: bool = False,
+) -> Tuple[Point, Point]:
+    """Resolve ``auto`` (``None``) entry and exit positions for ``maze``."""
+    if entry is not None and exit_pos is not None:
+        return entry, exit_pos
+    for name, point in (("ENTRY", entry), ("EXIT", exit_pos)):
+        if point is None:
+            continue
+        if not maze.in_bounds(*point):
+            raise ValueError(f"{name} out of bounds")
+        if maze.is_blocked(*point):
+            raise ValueError(f"{name} is on a blocked cell")
+    if entry is not None:
+        return entry, farthest_from(maze, entry, border_only)
+    if exit_pos is not None:
+        return farthest_from(maze, exit_pos, border_only), exit_pos
+    return farthest_pair(maze, border_only)
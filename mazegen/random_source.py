@@ -0,0 +1,185 @@
+"""Pluggable random-number sources for maze generation.
+
+Generators only talk to a ``random.Random`` instance. Most draws are
+small ("which of these four directions"), and on CPython the cost of
+such a draw is the Python-level ``randrange`` call rather than the
+Mersenne Twister itself. Buffered sources therefore expose one extra
+method, ``below(n)``, returning a zero-argument callable that yields
+uniform values in ``range(n)``. It draws 4096 random bits at a time,
+maps and rejection-filters the whole block with ``bytes.translate`` and
+hands values out through a C-level iterator. The generation kernels
+obtain their small draws through ``draw_below``, which falls back to
+``rng.randrange(n)`` for sources without ``below``.
+
+Available sources:
+
+- ``std``: plain ``random.Random(seed)``. This is the default.
+- ``block``: ``random.Random(seed)`` plus ``below`` streams fed by
+  ``randbytes(512)``. Every other draw (``randrange`` of large ranges,
+  ``shuffle``, ``random``) is the standard Mersenne Twister call.
+- ``numpy``: a NumPy ``Generator`` (PCG64) feeds the ``below`` streams
+  and also backs ``getrandbits``, ``random`` and ``randbytes``, so no
+  draw touches the Mersenne Twister. Needs NumPy.
+
+Determinism contract:
+
+- ``std`` reproduces the seeded output of every algorithm exactly as it
+  was before this module existed, including ``PERFECT=False`` loops and
+  tiled generation. The one exception is ``hunt``, whose cycle fix
+  changed its seeded mazes.
+- ``block`` only differs from ``std`` where ``below`` is used, so it
+  reproduces the ``std`` output of ``prim``, ``kruskal``, ``binarytree``
+  and ``sidewinder``. ``dfs`` and ``hunt`` (and tiled runs using them)
+  give different but deterministic mazes.
+- ``numpy`` is deterministic for a seed, but every algorithm gives
+  different mazes than with ``std``, and output may change between
+  NumPy releases. Its large-range draws (``shuffle``, Prim's frontier)
+  are slower than the Mersenne Twister's.
+- All sources are deterministic for a given seed on the same platform.
+  Changing ``random_source`` is like changing the seed.
+
+New sources can be added with ``register_random_source``.
+"""
+
+import hashlib
+import itertools
+import random
+from functools import partial
+from typing import (
+    Any, Callable, Dict, Iterator, List, Optional, Tuple, Union)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised without numpy
+    np = None  # type: ignore[assignment]
+
+Seed = Optional[Union[int, str, bytes]]
+BLOCK_BYTES = 512
+
+
+class BlockRandom(random.Random):
+    """``random.Random`` with block-buffered small draws."""
+
+    def _refill(self) -> bytes:
+        """Return a fresh block of random bytes."""
+        return self.randbytes(BLOCK_BYTES)
+
+    def below(self, n: int) -> Callable[[], int]:
+        """Return a zero-argument callable drawing from ``range(n)``.
+
+        Each block is masked down to the bit width of ``n`` and the
+        values that fall outside the range are deleted, both in a
+        single ``bytes.translate`` call, so every draw is a C-level
+        ``next`` on a byte iterator.
+        """
+        if not 0 < n <= 256:
+            raise ValueError("below() supports 1 <= n <= 256")
+        if n == 1:
+            return itertools.repeat(0).__next__
+        mask = (1 << (n - 1).bit_length()) - 1
+        table = bytes(b & mask for b in range(256))
+        reject = bytes(b for b in range(256) if b & mask >= n)
+
+        def blocks() -> Iterator[bytes]:
+            while True:
+                yield self._refill().translate(table, reject)
+
+        return itertools.chain.from_iterable(blocks()).__next__
+
+
+class NumpyRandom(BlockRandom):
+    """Buffered source backed entirely by a NumPy ``Generator``."""
+
+    def seed(self, a: Any = None, version: int = 2) -> None:
+        """Seed the NumPy generator from ``a``."""
+        super().seed(a, version)
+        if isinstance(a, str):
+            a = a.encode()
+        if isinstance(a, (bytes, bytearray)):
+            a = int.from_bytes(hashlib.sha512(a).digest(), "big")
+        self._gen = np.random.default_rng(a)
+        self._words: List[int] = []
+        self._wpos = 0
+
+    def getstate(self) -> Tuple[Any, ...]:
+        """Return the NumPy generator state and the word buffer."""
+        return (self._gen.bit_generator.state, list(self._words), self._wpos)
+
+    def setstate(self, state: Tuple[Any, ...]) -> None:
+        """Restore a state returned by ``getstate``."""
+        self._gen.bit_generator.state, words, self._wpos = state
+        self._words = list(words)
+
+    def getrandbits(self, k: int) -> int:
+        """Return an int with ``k`` random bits drawn from NumPy.
+
+        Requests of up to 64 bits take the top bits of one buffered
+        64-bit word; this is what ``randrange``, ``choice`` and
+        ``shuffle`` use.
+        """
+        if k > 64:
+            raw = int.from_bytes(self._gen.bytes((k + 7) // 8), "little")
+            return raw & ((1 << k) - 1)
+        if k < 0:
+            raise ValueError("number of bits must be non-negative")
+        pos = self._wpos
+        if pos >= len(self._words):
+            self._words = self._gen.integers(
+                0, 1 << 64, size=BLOCK_BYTES // 8, dtype=np.uint64,
+                endpoint=False).tolist()
+            pos = 0
+        self._wpos = pos + 1
+        return self._words[pos] >> (64 - k)
+
+    def random(self) -> float:
+        """Return a float in [0.0, 1.0) from 53 buffered bits."""
+        return self.getrandbits(53) * (1.0 / (1 << 53))
+
+    def randbytes(self, n: int) -> bytes:
+        """Return ``n`` random bytes drawn from NumPy."""
+        return bytes(self._gen.bytes(n))
+
+
+_SOURCES: Dict[str, Callable[[Seed], random.Random]] = {
+    "std": random.Random,
+    "block": BlockRandom,
+}
+if np is not None:
+    _SOURCES["numpy"] = NumpyRandom
+
+
+def register_random_source(
+    name: str, factory: Callable[[Seed], random.Random]
+) -> None:
+    """Register ``factory(seed)`` as a random source called ``name``."""
+    _SOURCES[name.lower()] = factory
+
+
+def random_sources() -> Tuple[str, ...]:
+    """Return the names of the available random sources."""
+    return tuple(_SOURCES)
+
+
+def draw_below(rng: random.Random, n: int) -> Callable[[], int]:
+    """Return a zero-argument callable drawing from ``range(n)``.
+
+    Buffered sources hand out their ``below`` streams. Any other
+    ``random.Random`` gets ``rng.randrange(n)``, so its stream, and the
+    mazes built from it, stay exactly as they were.
+    """
+    below = getattr(rng, "below", None)
+    if below is not None:
+        return below(n)  # type: ignore[no-any-return]
+    return partial(rng.randrange, n)
+
+
+def make_rng(source: str = "std", seed: Seed = None) -> random.Random:
+    """Create the random source ``source`` seeded with ``seed``."""
+    try:
+        factory = _SOURCES[source.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Unknown random source '{source}' "
+            f"(available: {', '.join(_SOURCES)})"
+        ) from None
+    return factory(seed)
@@ -0,0 +1,244 @@
+"""Regeneration of a rectangular region of an existing maze.
+
+``Maze.regenerate_region`` carves a new maze inside a rectangle and
+leaves every cell outside it untouched. Work is proportional to the
+region's area (plus its perimeter), never to the whole grid.
+
+The region is generated like a tile of ``mazegen.tiled``: a small
+independent ``Maze`` with the region's blocked cells, carved with the
+chosen algorithm, then copied in. How it is reconnected depends on
+``perfect``:
+
+- Perfect maze, outside still connected: if removing the region leaves
+  the rest of the maze in one piece, every connected piece of the new
+  region gets exactly one passage to the outside. Whether the outside
+  stays connected is known locally: in a tree, the outside splits into
+  ``passages + 1 - old region components`` parts.
+- Perfect maze, outside split: the old region joined several outside
+  parts that only meet through it, and which boundary cells belong to
+  which part is not known without walking the whole maze. The boundary
+  passages are then kept, together with the old passages that join the
+  passages of each old component of the region; the rest of the region
+  comes from the new tree, never joining two old components, so the
+  maze stays a tree.
+- Otherwise the new region keeps all the old boundary passages and gets
+  loops like ``generate_maze(perfect=False)``.
+
+The perfect case assumes the maze is perfect before the call.
+"""
+
+import random
+from typing import Dict, List, Optional, Set, Tuple
+
+from . import instrument
+from .maze_generator import Maze
+from .random_source import make_rng
+
+# (x, y, bit, opp_bit) of a passage from a region cell to the outside.
+Port = Tuple[int, int, int, int]
+
+
+def _tile(
+    maze: Maze, x0: int, y0: int, width: int, height: int
+) -> Maze:
+    """Return a standalone copy of a rectangle of ``maze``.
+
+    Blocked cells are read from the region's rows of the row bitsets, so
+    the copy costs O(region), not O(blocked cells in the maze).
+    """
+    tile = Maze(width, height)
+    for row in range(height):
+        tile.walls[row][:] = maze.walls[y0 + row][x0:x0 + width]
+        bits = maze.blocked_cells.row(y0 + row)
+        if bits is None:
+            continue
+        x = bits.find(1, x0, x0 + width)
+        while x >= 0:
+            tile.blocked_cells.add((x - x0, row))
+            x = bits.find(1, x + 1, x0 + width)
+    return tile
+
+
+def _boundary(
+    maze: Maze, x0: int, y0: int, width: int, height: int
+) -> List[Port]:
+    """Every wall between the region and an open cell outside it."""
+    walls: List[Port] = []
+    for x in range(x0, x0 + width):
+        walls.append((x, y0, Maze.N, Maze.S))
+        walls.append((x, y0 + height - 1, Maze.S, Maze.N))
+    for y in range(y0, y0 + height):
+        walls.append((x0, y, Maze.W, Maze.E))
+        walls.append((x0 + width - 1, y, Maze.E, Maze.W))
+    steps = {bit: (dx, dy) for dx, dy, bit, _ in Maze.dirs}
+    return [
+        (x, y, bit, opp) for x, y, bit, opp in walls
+        if maze.in_bounds(x + steps[bit][0], y + steps[bit][1])
+        and not maze.is_blocked(x, y)
+        and not maze.is_blocked(x + steps[bit][0], y + steps[bit][1])
+    ]
+
+
+def _set_wall(maze: Maze, port: Port, closed: bool) -> None:
+    """Close or open a boundary wall on both sides."""
+    x, y, bit, opp = port
+    dx, dy = next((dx, dy) for dx, dy, b, _ in Maze.dirs if b == bit)
+    if closed:
+        maze.walls[y][x] |= bit
+        maze.walls[y + dy][x + dx] |= opp
+    else:
+        maze._carve_passage(x, y, x + dx, y + dy, bit, opp)
+
+
+def _carve(
+    tile: Maze, algo: str, rng: random.Random, perfect: bool
+) -> List[int]:
+    """Carve a fresh ``tile``; return the labels of its pieces."""
+    tile._run_algo(algo, rng)
+    labels, _count = tile._join_components(rng)
+    if not perfect:
+        tile._add_loops(rng, loop_chance=0.1)
+    return labels.tolist()
+
+
+def _copy(maze: Maze, x0: int, y0: int, tile: Maze) -> None:
+    """Copy ``tile``'s walls into ``maze`` at ``(x0, y0)``."""
+    for row in range(tile.height):
+        maze.walls[y0 + row][x0:x0 + tile.width] = bytes(tile.walls[row])
+
+
+def _edges(tile: Maze, passages: bool = True) -> List[Tuple[int, int]]:
+    """Flat ``(a, b)`` pairs of open passages (or of all cell pairs)."""
+    width = tile.width
+    edges = []
+    for y, row in enumerate(tile.walls):
+        for x, cell in enumerate(row):
+            if (x, y) in tile.blocked_cells:
+                continue
+            i = y * width + x
+            if x + 1 < width and (not cell & Maze.E if passages
+                                  else (x + 1, y) not in tile.blocked_cells):
+                edges.append((i, i + 1))
+            if y + 1 < tile.height and (
+                    not cell & Maze.S if passages
+                    else (x, y + 1) not in tile.blocked_cells):
+                edges.append((i, i + width))
+    return edges
+
+
+def _skeleton(
+    edges: List[Tuple[int, int]], terminals: Set[int]
+) -> List[Tuple[int, int]]:
+    """Prune a forest down to the paths joining its ``terminals``."""
+    adjacent: Dict[int, List[int]] = {}
+    for a, b in edges:
+        adjacent.setdefault(a, []).append(b)
+        adjacent.setdefault(b, []).append(a)
+    degree = {cell: len(others) for cell, others in adjacent.items()}
+    leaves = [cell for cell, d in degree.items()
+              if d == 1 and cell not in terminals]
+    removed: Set[int] = set()
+    while leaves:
+        cell = leaves.pop()
+        removed.add(cell)
+        for other in adjacent[cell]:
+            if other not in removed:
+                degree[other] -= 1
+                if degree[other] == 1 and other not in terminals:
+                    leaves.append(other)
+    return [(a, b) for a, b in edges
+            if a not in removed and b not in removed]
+
+
+def _keep_ports(
+    old: Maze, new: Maze, ports: Dict[int, int], rng: random.Random
+) -> None:
+    """Rebuild ``new`` so the old boundary passages stay separated.
+
+    ``ports`` maps region cells with a boundary passage to their old
+    component. The old passages joining the ports of each component
+    are kept; the new tree's passages, then any other wall, are opened
+    whenever they join two pieces that are not tied to different old
+    components. Every old component thus keeps exactly its ports.
+    """
+    carved = _edges(new)
+    rng.shuffle(carved)
+    rest = _edges(new, passages=False)
+    rng.shuffle(rest)
+    parent = list(range(new.width * new.height))
+    color = [-1] * len(parent)
+    for cell, label in ports.items():
+        color[cell] = label
+
+    def find(c: int) -> int:
+        while parent[c] != c:
+            parent[c] = parent[parent[c]]
+            c = parent[c]
+        return c
+
+    new.reset()
+    new.blocked_cells.update(old.blocked_cells)
+    for a, b in _skeleton(_edges(old), set(ports)) + carved + rest:
+        ra, rb = find(a), find(b)
+        if ra == rb or -1 not in (color[ra], color[rb]) and (
+                color[ra] != color[rb]):
+            continue
+        parent[rb] = ra
+        if color[ra] == -1:
+            color[ra] = color[rb]
+        ay, ax = divmod(a, new.width)
+        if b == a + new.width:
+            new._carve_passage(ax, ay, ax, ay + 1, Maze.S, Maze.N)
+        else:
+            new._carve_passage(ax, ay, ax + 1, ay, Maze.E, Maze.W)
+
+
+def regenerate_region(
+    maze: Maze,
+    x0: int,
+    y0: int,
+    width: int,
+    height: int,
+    seed: Optional[int] = None,
+    algo: str = "prim",
+    perfect: bool = True,
+    random_source: str = "std",
+) -> None:
+    """Regenerate the ``width`` x ``height`` rectangle at ``(x0, y0)``.
+
+    See the module docstring for how the region is reconnected.
+    """
+    if (width <= 0 or height <= 0 or x0 < 0 or y0 < 0
+            or x0 + width > maze.width or y0 + height > maze.height):
+        raise ValueError(
+            f"region {width}x{height} at ({x0}, {y0}) is outside the "
+            f"{maze.width}x{maze.height} maze")
+    rng = make_rng(random_source, seed)
+    tile = _tile(maze, x0, y0, width, height)
+    boundary = _boundary(maze, x0, y0, width, height)
+    ports = [port for port in boundary
+             if not maze.walls[port[1]][port[0]] & port[2]]
+    old_labels, old_count = tile._component_labels()
+    # Parts the outside falls into once the region is cut out (in a tree).
+    split = perfect and len(ports) + 1 - old_count > 1
+    instrument.count("region_cells", width * height)
+
+    new = Maze(width, height)
+    new.blocked_cells.update(tile.blocked_cells)
+    labels = _carve(new, algo, rng, perfect)
+    if split:
+        cells = [(y - y0) * width + x - x0 for x, y, _bit, _opp in ports]
+        _keep_ports(tile, new, {c: old_labels[c] for c in cells}, rng)
+    _copy(maze, x0, y0, new)
+    if not perfect or split:
+        for port in ports:
+            _set_wall(maze, port, closed=False)
+        return
+    for port in ports:
+        _set_wall(maze, port, closed=True)
+    exits: Dict[int, List[Port]] = {}
+    for port in boundary:
+        x, y = port[0], port[1]
+        exits.setdefault(labels[(y - y0) * width + x - x0], []).append(port)
+    for label in sorted(exits):
+        _set_wall(maze, rng.choice(exits[label]), closed=False)
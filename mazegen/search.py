@@ -0,0 +1,222 @@
+"""Parallel search for seeds whose mazes meet target criteria.
+
+Example: the first three 50x50 DFS mazes with a solution of at least
+600 steps and at most 250 dead ends::
+
+    python -m mazegen.search --size 50x50 --algo dfs \\
+        --where "solution_length>=600" --where "dead_ends<=250" --matches 3
+
+Candidate seeds ``start, start + 1, ...`` are split into chunks that run
+in a process pool. Chunks are consumed in seed order and the search stops
+as soon as ``matches`` seeds are found, so the result is always the
+first matching seeds in that order, whatever the number of workers.
+
+Criteria are ``"<metric><op><value>"`` strings over the ``MazeStats``
+fields (``op`` is one of ``< <= > >= == !=``) or any picklable callable
+taking a ``MazeStats`` and returning a bool.
+"""
+
+import argparse
+import itertools
+import json
+import operator
+import os
+import re
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from typing import (
+    Any, Callable, Deque, List, Optional, Sequence, Tuple, Union)
+
+from .analysis import MazeStats, analyze
+from .maze_generator import Maze
+
+Predicate = Callable[[MazeStats], bool]
+
+_OPS = {
+    "<=": operator.le, ">=": operator.ge, "==": operator.eq,
+    "!=": operator.ne, "<": operator.lt, ">": operator.gt,
+}
+_CRITERION = re.compile(r"^\s*(\w+)\s*(<=|>=|==|!=|<|>)\s*(-?[\d.]+)\s*$")
+_METRICS = {f.name for f in fields(MazeStats)} - {"corridor_lengths"}
+
+
+@dataclass(frozen=True)
+class Criterion:
+    """A ``metric op value`` comparison on ``MazeStats``."""
+
+    metric: str
+    op: str
+    value: float
+
+    @classmethod
+    def parse(cls, text: str) -> "Criterion":
+        """Parse ``"solution_length>=600"`` style criteria."""
+        match = _CRITERION.match(text)
+        if match is None:
+            raise ValueError(f"Invalid criterion '{text}'")
+        metric, op, value = match.groups()
+        if metric not in _METRICS:
+            raise ValueError(
+                f"Unknown metric '{metric}' "
+                f"(available: {', '.join(sorted(_METRICS))})")
+        return cls(metric, op, float(value))
+
+    def __call__(self, stats: MazeStats) -> bool:
+        """Return True when ``stats`` satisfies the comparison."""
+        actual = getattr(stats, self.metric)
+        return actual is not None and bool(_OPS[self.op](actual, self.value))
+
+
+@dataclass
+class SeedMatch:
+    """A seed that met every criterion, with its metrics."""
+
+    seed: int
+    stats: MazeStats
+
+
+@dataclass(frozen=True)
+class _Job:
+    """Everything a worker needs to evaluate one chunk of seeds."""
+
+    width: int
+    height: int
+    algo: str
+    perfect: bool
+    entry: Tuple[int, int]
+    exit_pos: Tuple[int, int]
+    random_source: str
+    predicates: Tuple[Predicate, ...]
+
+
+def _evaluate(job: _Job, seeds: range) -> List[SeedMatch]:
+    """Generate every seed of a chunk and keep those that match."""
+    maze = Maze(job.width, job.height)
+    found: List[SeedMatch] = []
+    for seed in seeds:
+        maze.generate_maze(seed=seed, algo=job.algo, perfect=job.perfect,
+                           random_source=job.random_source)
+        stats = analyze(maze, job.entry, job.exit_pos)
+        if all(predicate(stats) for predicate in job.predicates):
+            found.append(SeedMatch(seed, stats))
+    return found
+
+
+def search_seeds(
+    width: int,
+    height: int,
+    criteria: Sequence[Union[str, Predicate]],
+    algo: str = "prim",
+    perfect: bool = True,
+    entry: Tuple[int, int] = (0, 0),
+    exit_pos: Optional[Tuple[int, int]] = None,
+    matches: int = 1,
+    start: int = 0,
+    limit: int = 10000,
+    workers: Optional[int] = None,
+    chunk_size: int = 16,
+    random_source: str = "std",
+) -> List[SeedMatch]:
+    """Return the first ``matches`` seeds in ``[start, start + limit)``.
+
+    Args:
+        width: Maze width.
+        height: Maze height.
+        criteria: Criterion strings or picklable predicates; a seed
+            matches when all of them hold.
+        algo: Generation algorithm.
+        perfect: Generate perfect mazes.
+        entry: Solution start.
+        exit_pos: Solution end; defaults to the bottom-right cell.
+        matches: Stop after this many matching seeds.
+        start: First seed to try.
+        limit: Number of seeds to try at most.
+        workers: Worker processes; defaults to the CPU count.
+        chunk_size: Seeds per worker task.
+        random_source: RNG provider passed to ``generate_maze``.
+    """
+    job = _Job(
+        width, height, algo, perfect, entry,
+        exit_pos if exit_pos is not None else (width - 1, height - 1),
+        random_source,
+        tuple(Criterion.parse(c) if isinstance(c, str) else c
+              for c in criteria),
+    )
+    chunks = [range(first, min(first + chunk_size, start + limit))
+              for first in range(start, start + limit, chunk_size)]
+    found: List[SeedMatch] = []
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for seeds in chunks:
+            found.extend(_evaluate(job, seeds))
+            if len(found) >= matches:
+                break
+        return found[:matches]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep a few chunks queued per worker, but always collect them in
+        # seed order so the matches never depend on scheduling.
+        queued = iter(chunks)
+        pending: Deque["Future[List[SeedMatch]]"] = deque(
+            pool.submit(_evaluate, job, seeds)
+            for seeds in itertools.islice(queued, workers * 2))
+        while pending and len(found) < matches:
+            found.extend(pending.popleft().result())
+            following = next(queued, None)
+            if following is not None:
+                pending.append(pool.submit(_evaluate, job, following))
+        for future in pending:
+            future.cancel()
+    return found[:matches]
+
+
+def _size(text: str) -> Tuple[int, int]:
+    """Parse ``WIDTHxHEIGHT``."""
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height)
+
+
+def _point(text: str) -> Tuple[int, int]:
+    """Parse ``x,y``."""
+    x, _, y = text.partition(",")
+    return int(x), int(y)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point; prints one JSON line per match."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=_size, required=True,
+                        help="maze size as WIDTHxHEIGHT")
+    parser.add_argument("--algo", default="prim")
+    parser.add_argument("--imperfect", action="store_true",
+                        help="generate mazes with loops")
+    parser.add_argument("--where", action="append", default=[],
+                        help="criterion such as solution_length>=600")
+    parser.add_argument("--entry", type=_point, default=(0, 0))
+    parser.add_argument("--exit", type=_point, default=None)
+    parser.add_argument("--matches", type=int, default=1)
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--limit", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--random-source", default="std")
+    args = parser.parse_args(argv)
+
+    width, height = args.size
+    try:
+        results = search_seeds(
+            width, height, args.where, algo=args.algo,
+            perfect=not args.imperfect, entry=args.entry,
+            exit_pos=args.exit, matches=args.matches, start=args.start,
+            limit=args.limit, workers=args.workers,
+            random_source=args.random_source)
+    except ValueError as e:
+        parser.error(str(e))
+    for match in results:
+        record: Any = {"seed": match.seed, **asdict(match.stats)}
+        print(json.dumps(record))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""Local asyncio maze-generation service.
+
+Start it with ``python -m mazegen.service --port 8765`` (or
+``--unix /tmp/mazegen.sock``). Only the standard library is used.
+
+Endpoints:
+
+- ``POST /generate``: body is a JSON object with ``MazeConfig`` fields
+  (case-insensitive, ``entry``/``exit`` as ``[x, y]``; ``output_file``
+  is optional). Responds with the output file text (``format=hex``, the
+  default) or the binary layout below.
+- ``POST /solve``: same body; responds with
+  ``{"moves": "NESW...", "length": n, "entry": [x, y], "exit": [x, y]}``
+  (``entry``/``exit`` may be ``"auto"`` in the request).
+- ``GET /metrics``: queue depth, request counters and latency
+  percentiles over the last ``LATENCY_WINDOW`` requests.
+
+Requests for more than ``max_cells`` cells (``MAX_CELLS`` by default,
+``--max-cells`` on the command line) get ``400``.
+
+The format is chosen with ``?format=binary`` or a ``"format"`` body
+field. The binary layout is ``BINARY_HEADER`` (magic ``AMZ1``, width,
+height, entry x/y, exit x/y as little-endian uint32), then one wall-mask
+byte per cell in row-major order, then the moves as ASCII (in the
+request's ``move_encoding``).
+
+Generation runs in a process pool, so the event loop only parses
+requests and streams responses (chunked, ``CHUNK_SIZE`` at a time,
+waiting for the client to drain). Identical requests that arrive while
+one is being computed share its result. When ``max_pending`` distinct
+jobs are already queued or running, new ones get ``503`` with
+``Retry-After``.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import http
+import json
+import multiprocessing
+import struct
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from .maze_generator import Maze
+from .moves import encode_moves
+from .output_writer import format_output, solve_moves
+from .parser import MazeConfig, parse_dict
+from .placement import place_entry_exit
+
+CHUNK_SIZE = 64 * 1024
+MAX_BODY = 1 << 20
+MAX_CELLS = 1 << 22
+LATENCY_WINDOW = 1024
+FORMATS = ("hex", "binary")
+BINARY_MAGIC = b"AMZ1"
+BINARY_HEADER = struct.Struct("<4sIIIIII")
+
+JobKey = Tuple[str, str, str]
+
+
+class RequestError(Exception):
+    """An error answered with an HTTP status and a JSON message."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def config_from_json(raw: Any, max_cells: int = MAX_CELLS) -> MazeConfig:
+    """Validate a JSON request body into a ``MazeConfig``."""
+    if not isinstance(raw, dict):
+        raise ValueError("request body must be a JSON object")
+    fields: Dict[str, Any] = {}
+    for key, value in raw.items():
+        key = str(key).lower()
+        if key in ("entry", "exit") and isinstance(value, list):
+            value = tuple(value)
+        fields[key] = value
+    if "stencil" in fields:
+        # A path would let clients read files on the server.
+        raise ValueError("STENCIL is not supported by the service")
+    fields.setdefault("output_file", "-")
+    config = parse_dict(fields)
+    if config.width * config.height > max_cells:
+        raise ValueError(f"mazes are limited to {max_cells} cells")
+    return config
+
+
+def run_job(kind: str, fmt: str, config: MazeConfig) -> bytes:
+    """Generate (and solve) one maze; runs inside a pool worker."""
+    maze = Maze(config.width, config.height)
+    # Requests are already spread over the pool, so tiles stay in-process.
+    maze.generate_maze(seed=config.seed, algo=config.algo,
+                       perfect=config.perfect,
+                       tile_size=config.tile_size, workers=1,
+                       random_source=config.random_source,
+                       loops=config.loops, loop_density=config.loop_density,
+                       braid=config.braid)
+    entry, exit_pos = place_entry_exit(maze, config.entry, config.exit,
+                                       config.auto_border)
+    moves = solve_moves(maze, entry, exit_pos)
+    if kind == "solve":
+        return json.dumps({"moves": moves, "length": len(moves),
+                           "entry": entry, "exit": exit_pos}).encode()
+    if fmt == "binary":
+        header = BINARY_HEADER.pack(
+            BINARY_MAGIC, maze.width, maze.height, *entry, *exit_pos)
+        return (header + b"".join(map(bytes, maze.walls))
+                + encode_moves(moves, config.move_encoding).encode())
+    return format_output(maze, entry, exit_pos, moves,
+                         config.move_encoding).encode()
+
+
+def _percentile(ordered: List[float], pct: float) -> Optional[float]:
+    """Return the nearest-rank percentile of sorted values, in ms."""
+    if not ordered:
+        return None
+    rank = max(0, min(len(ordered) - 1,
+                      round(pct / 100 * len(ordered)) - 1))
+    return round(ordered[rank] * 1000, 3)
+
+
+class MazeService:
+    """Request coalescing and backpressure in front of a worker pool."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pending: int = 64,
+        executor: Optional[Executor] = None,
+        max_cells: int = MAX_CELLS,
+    ) -> None:
+        self.max_pending = max_pending
+        self.max_cells = max_cells
+        self._owns_executor = executor is None
+        if executor is None:
+            # Forked workers would inherit open client sockets and keep
+            # those connections alive after the service closes them.
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context(
+                "forkserver" if "forkserver" in methods else "spawn")
+            executor = ProcessPoolExecutor(max_workers=workers,
+                                           mp_context=context)
+        self._executor = executor
+        self._in_flight: Dict[JobKey, "asyncio.Future[bytes]"] = {}
+        self._waiting = 0
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._counts = {
+            "requests": 0, "coalesced": 0, "rejected": 0, "errors": 0}
+
+    def close(self) -> None:
+        """Shut down the worker pool if this service created it."""
+        if self._owns_executor:
+            self._executor.shutdown(cancel_futures=True)
+
+    async def submit(self, kind: str, fmt: str, config: MazeConfig) -> bytes:
+        """Run a job, sharing the result with identical in-flight jobs."""
+        key = (kind, fmt, json.dumps(asdict(config), sort_keys=True))
+        future = self._in_flight.get(key)
+        if future is not None:
+            self._counts["coalesced"] += 1
+        else:
+            if len(self._in_flight) >= self.max_pending:
+                self._counts["rejected"] += 1
+                raise RequestError(503, "server busy, retry later")
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._executor, run_job, kind, fmt, config)
+            self._in_flight[key] = future
+
+            def _done(done: "asyncio.Future[bytes]") -> None:
+                self._in_flight.pop(key, None)
+                if not done.cancelled():
+                    done.exception()  # Retrieved even if every client left.
+
+            future.add_done_callback(_done)
+        self._waiting += 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            self._waiting -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return queue depth, counters and latency percentiles."""
+        ordered = sorted(self._latencies)
+        return {
+            "queue_depth": len(self._in_flight),
+            "waiting_clients": self._waiting,
+            "max_pending": self.max_pending,
+            **self._counts,
+            "latency_ms": {
+                "p50": _percentile(ordered, 50),
+                "p90": _percentile(ordered, 90),
+                "p99": _percentile(ordered, 99),
+                "samples": len(ordered),
+            },
+        }
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve one HTTP request on a connection, then close it."""
+        started = time.perf_counter()
+        try:
+            method, path, query, body = await _read_request(reader)
+            if path == "/metrics" and method == "GET":
+                await _send(writer, 200, "application/json",
+                            json.dumps(self.metrics()).encode())
+                return
+            if path not in ("/generate", "/solve"):
+                raise RequestError(404, f"unknown endpoint {path}")
+            if method != "POST":
+                raise RequestError(405, f"{path} expects POST")
+            self._counts["requests"] += 1
+            payload = json.loads(body or b"{}")
+            fmt = str(query.get("format") or (
+                payload.pop("format", "hex") if isinstance(payload, dict)
+                else "hex")).lower()
+            if fmt not in FORMATS:
+                raise ValueError("format must be 'hex' or 'binary'")
+            config = config_from_json(payload, self.max_cells)
+            kind = path.lstrip("/")
+            data = await self.submit(kind, fmt, config)
+            if kind == "solve":
+                content_type = "application/json"
+            elif fmt == "binary":
+                content_type = "application/octet-stream"
+            else:
+                content_type = "text/plain; charset=ascii"
+            await _send(writer, 200, content_type, data)
+            self._latencies.append(time.perf_counter() - started)
+        except RequestError as e:
+            if e.status != 503:
+                self._counts["errors"] += 1
+            await _send_error(writer, e.status, e.message)
+        except ValueError as e:
+            self._counts["errors"] += 1
+            await _send_error(writer, 400, str(e))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+
+async def _read_request(
+    reader: asyncio.StreamReader,
+) -> Tuple[str, str, Dict[str, str], bytes]:
+    """Read one request; return method, path, query and body."""
+    parts = (await reader.readline()).decode("latin-1").split()
+    if len(parts) != 3:
+        raise RequestError(400, "malformed request line")
+    method, target, _version = parts
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY:
+        raise RequestError(413, "request body too large")
+    body = await reader.readexactly(length) if length > 0 else b""
+    url = urlsplit(target)
+    return method.upper(), url.path, dict(parse_qsl(url.query)), body
+
+
+async def _send(
+    writer: asyncio.StreamWriter,
+    status: int,
+    content_type: str,
+    data: bytes,
+) -> None:
+    """Stream ``data`` with chunked transfer encoding."""
+    head = [
+        f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}",
+        f"Content-Type: {content_type}",
+        "Transfer-Encoding: chunked",
+        "Connection: close",
+    ]
+    if status == 503:
+        head.append("Retry-After: 1")
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+    view = memoryview(data)
+    for start in range(0, len(view), CHUNK_SIZE):
+        chunk = view[start:start + CHUNK_SIZE]
+        writer.write(b"%X\r\n" % len(chunk))
+        writer.write(chunk)
+        writer.write(b"\r\n")
+        await writer.drain()
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+async def _send_error(
+    writer: asyncio.StreamWriter, status: int, message: str
+) -> None:
+    """Send a JSON error body, ignoring clients that already left."""
+    with contextlib.suppress(ConnectionError):
+        await _send(writer, status, "application/json",
+                    json.dumps({"error": message}).encode())
+
+
+async def serve(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    unix_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    max_pending: int = 64,
+    max_cells: int = MAX_CELLS,
+) -> None:
+    """Run the service until cancelled."""
+    service = MazeService(workers=workers, max_pending=max_pending,
+                          max_cells=max_cells)
+    if unix_path is not None:
+        server = await asyncio.start_unix_server(service.handle, unix_path)
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH",
+                        help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--max-cells", type=int, default=MAX_CELLS,
+                        help="largest WIDTH * HEIGHT a request may ask for")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers,
+                          args.max_pending, args.max_cells))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Zero-copy sharing of a maze between processes.
+
+``SharedMaze(maze)`` copies a maze once into a
+``multiprocessing.shared_memory`` segment laid out as:
+
+- ``HEADER``: magic ``AMZS``, width, height, pattern origin (-1, -1 if
+  none) and the number of blocked cells;
+- one wall-mask byte per cell, row-major;
+- the blocked cells as ``x, y`` uint32 pairs.
+
+``attach(name)`` maps the segment in any process as a ``SharedMazeView``:
+a read-only ``Maze`` whose rows are memoryview slices of the segment, so
+the grid is never copied. Both objects pickle as just the segment name,
+which makes them cheap to pass to pool workers::
+
+    with SharedMaze(maze) as shared:
+        with ProcessPoolExecutor() as pool:
+            stats = pool.submit(analyze, shared).result()
+
+The owner unlinks the segment on ``close()``, when leaving the ``with``
+block, or when it is garbage collected. Views unmap it when closed or
+collected. Views are meant for processes started by the owner's process
+(such as pool workers); before Python 3.13 the resource tracker of an
+unrelated process would unlink the segment when that process exits.
+"""
+
+import contextlib
+import struct
+import sys
+import weakref
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, List, Optional, Tuple
+
+from .maze_generator import Maze
+from .stencil import BlockedCells
+
+MAGIC = b"AMZS"
+HEADER = struct.Struct("<4sIIiiI")
+
+
+def _buffer(shm: SharedMemory) -> memoryview:
+    """Return the segment's buffer (``None`` only once it is closed)."""
+    if shm.buf is None:
+        raise ValueError(f"shared maze {shm.name} is closed")
+    return shm.buf
+
+
+def _release(shm: SharedMemory, views: List[Any], unlink: bool) -> None:
+    """Release ``views`` of the segment, then unmap (and unlink) it."""
+    for view in views:
+        with contextlib.suppress(BufferError):
+            view.release()
+    if unlink:
+        with contextlib.suppress(FileNotFoundError):
+            shm.unlink()
+    # Buffers still exported elsewhere (e.g. to NumPy) keep the mapping
+    # alive until they are gone.
+    with contextlib.suppress(BufferError):
+        shm.close()
+
+
+class SharedMaze:
+    """Owner of a maze published to shared memory."""
+
+    def __init__(self, maze: Maze, name: Optional[str] = None) -> None:
+        width, height = maze.width, maze.height
+        blocked = sorted(maze.blocked_cells)
+        coords = array("I", [c for cell in blocked for c in cell])
+        cells = width * height
+        size = HEADER.size + cells + len(coords) * coords.itemsize
+        self._shm = SharedMemory(name=name, create=True, size=size)
+        self.name = self._shm.name
+        self._finalizer = weakref.finalize(
+            self, _release, self._shm, [], True)
+
+        buf = _buffer(self._shm)
+        origin = maze.pattern_origin or (-1, -1)
+        HEADER.pack_into(buf, 0, MAGIC, width, height, *origin, len(blocked))
+        for y, row in enumerate(maze.walls):
+            start = HEADER.size + y * width
+            buf[start:start + width] = bytes(row)
+        buf[HEADER.size + cells:size] = coords.tobytes()
+
+    def view(self) -> "SharedMazeView":
+        """Attach to the segment from this process."""
+        return attach(self.name)
+
+    def close(self) -> None:
+        """Unmap and unlink the segment; views keep their own mapping."""
+        self._finalizer()
+
+    def __enter__(self) -> "SharedMaze":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __reduce__(self) -> Tuple[Any, Tuple[str]]:
+        # Workers receive a view, never a second owner.
+        return attach, (self.name,)
+
+
+class SharedMazeView(Maze):
+    """Read-only ``Maze`` backed by a shared memory segment.
+
+    ``walls[y]`` is a read-only memoryview of row ``y`` and ``cells`` one
+    of the whole grid; writing to them raises ``TypeError``, so the view
+    cannot be regenerated. They are released with the view, so copy
+    anything that must outlive it.
+    """
+
+    def __init__(self, shm: SharedMemory) -> None:
+        # Maze.__init__ is skipped: it would allocate a fresh grid.
+        buf = _buffer(shm)
+        magic, width, height, ox, oy, count = HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            shm.close()
+            raise ValueError(f"{shm.name} does not hold a shared maze")
+        self.name = shm.name
+        self.width = width
+        self.height = height
+        self.pattern_origin = None if ox < 0 else (ox, oy)
+        self.revision = 0
+        end = HEADER.size + width * height
+        self.cells = buf[HEADER.size:end].toreadonly()
+        rows: List[Any] = [self.cells[y * width:(y + 1) * width]
+                           for y in range(height)]
+        self.walls = rows
+        coords = array("I", buf[end:end + count * 8].tobytes())
+        self.blocked_cells = BlockedCells(
+            width, height, zip(coords[::2], coords[1::2]))
+        self._shm = shm
+        self._finalizer = weakref.finalize(
+            self, _release, shm, [*rows, self.cells], False)
+
+    def close(self) -> None:
+        """Unmap the segment; the view must not be used afterwards."""
+        self.walls = []
+        self._finalizer()
+
+    def __enter__(self) -> "SharedMazeView":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __reduce__(self) -> Tuple[Any, Tuple[str]]:
+        return attach, (self.name,)
+
+
+def attach(name: str) -> SharedMazeView:
+    """Map the shared maze called ``name`` as a read-only view."""
+    if sys.version_info >= (3, 13):
+        shm = SharedMemory(name=name, track=False)
+    else:
+        shm = SharedMemory(name=name)
+    return SharedMazeView(shm)
@@ -0,0 +1,353 @@
+"""Obstacle stencils and the bitset behind ``Maze.blocked_cells``.
+
+A ``Stencil`` is a bitmap of blocked cells, one bit per cell, rows packed
+most significant bit first (the layout of binary PBM files, so those load
+without conversion). Stencils come from text (``#`` blocked, ``.`` open),
+from PBM files (``P1`` or ``P4``, black is blocked) or from a list of
+cells, and can be scaled before ``Maze.apply_stencil`` places them. The
+default “42” logo is ``LOGO_42``.
+
+``BlockedCells`` is the set type of ``Maze.blocked_cells``: it behaves
+like a set of ``(x, y)`` tuples but stores one packed bitset per row,
+allocating only the rows that hold a blocked cell. A membership test is
+one bit test, painting a stencil is a few integer operations per row,
+and hot loops read whole rows at once with ``row`` or ``row_masks``
+(one 0/1 byte per cell), so a large or repeated mask costs no more per
+cell than the logo.
+
+Stencils are usually loaded from a file::
+
+    maze.generate_maze(seed=1, stencil=Stencil.load("logo.pbm"))
+"""
+
+from collections.abc import MutableSet
+from typing import (
+    AbstractSet, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple,
+    Union,
+)
+
+Cell = Tuple[int, int]
+
+_TO_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+_FROM_DIGITS = bytes.maketrans(b"01", b"\x00\x01")
+_BLOCKED_CHARS = "#Xx1@*"
+_OPEN_CHARS = ". 0-_"
+
+
+def _pack(bits: bytes, stride: int) -> bytes:
+    """Pack 0/1 bytes into ``stride`` bytes, most significant bit first."""
+    digits = bits.translate(_TO_DIGITS) + b"0" * (stride * 8 - len(bits))
+    return int(digits or b"0", 2).to_bytes(stride, "big")
+
+
+def _unpack(packed: Union[bytes, bytearray], width: int) -> bytes:
+    """Unpack the first ``width`` bits of ``packed`` into 0/1 bytes."""
+    value = int.from_bytes(packed, "big")
+    digits = format(value, f"0{len(packed) * 8}b").encode("ascii")
+    return digits[:width].translate(_FROM_DIGITS)
+
+
+class Stencil:
+    """Immutable bitmap of blocked cells."""
+
+    def __init__(self, width: int, height: int,
+                 rows: Sequence[bytes]) -> None:
+        """Build from ``height`` packed rows of ``(width + 7) // 8`` bytes."""
+        if width <= 0 or height <= 0:
+            raise ValueError("stencil width and height must be positive")
+        self.width = width
+        self.height = height
+        self.stride = (width + 7) // 8
+        if len(rows) != height or any(len(r) != self.stride for r in rows):
+            raise ValueError("stencil rows do not match its size")
+        # Padding bits past ``width`` are cleared so rows compare equal.
+        tail = (0xFF << (self.stride * 8 - width)) & 0xFF
+        self.rows = tuple(bytes(r[:-1]) + bytes([r[-1] & tail])
+                          for r in rows)
+        self.count = sum(int.from_bytes(r, "big").bit_count()
+                         for r in self.rows)
+
+    @classmethod
+    def from_bits(cls, rows: Sequence[bytes]) -> "Stencil":
+        """Build from rows of one 0/1 byte per cell."""
+        width = max((len(r) for r in rows), default=0)
+        stride = (width + 7) // 8
+        return cls(width, len(rows), [_pack(bytes(r), stride) for r in rows])
+
+    @classmethod
+    def from_cells(cls, cells: Iterable[Cell], width: Optional[int] = None,
+                   height: Optional[int] = None) -> "Stencil":
+        """Build from blocked ``(x, y)`` cells; the size defaults to fit."""
+        cells = list(cells)
+        if width is None:
+            width = max((x for x, _ in cells), default=0) + 1
+        if height is None:
+            height = max((y for _, y in cells), default=0) + 1
+        rows = [bytearray(width) for _ in range(height)]
+        for x, y in cells:
+            if not (0 <= x < width and 0 <= y < height):
+                raise ValueError(f"cell ({x}, {y}) is outside the stencil")
+            rows[y][x] = 1
+        return cls.from_bits([bytes(row) for row in rows])
+
+    @classmethod
+    def from_text(cls, text: str) -> "Stencil":
+        """Parse rows of ``#`` (blocked) and ``.`` (open) characters.
+
+        ``X``, ``1``, ``@`` and ``*`` also block, spaces, ``0``, ``-``
+        and ``_`` are open, and short rows are padded with open cells.
+        """
+        lines = text.splitlines()
+        while lines and not lines[-1].strip():
+            lines.pop()
+        rows = []
+        for number, line in enumerate(lines, 1):
+            for char in line:
+                if char not in _BLOCKED_CHARS and char not in _OPEN_CHARS:
+                    raise ValueError(
+                        f"Line {number}: unexpected stencil character "
+                        f"{char!r}")
+            rows.append(bytes(char in _BLOCKED_CHARS for char in line))
+        if not rows:
+            raise ValueError("stencil is empty")
+        return cls.from_bits(rows)
+
+    @classmethod
+    def from_pbm(cls, data: bytes) -> "Stencil":
+        """Parse a plain (``P1``) or binary (``P4``) PBM image."""
+        magic = data[:2]
+        if magic not in (b"P1", b"P4"):
+            raise ValueError("not a P1 or P4 PBM image")
+        pos = 2
+        size: List[int] = []
+        while len(size) < 2:
+            while pos < len(data) and data[pos:pos + 1].isspace():
+                pos += 1
+            if data[pos:pos + 1] == b"#":
+                pos = data.find(b"\n", pos)
+                if pos < 0:
+                    break
+                continue
+            end = pos
+            while data[end:end + 1].isdigit():
+                end += 1
+            if end == pos:
+                break
+            size.append(int(data[pos:end]))
+            pos = end
+        if len(size) < 2:
+            raise ValueError("PBM header is incomplete")
+        width, height = size
+        if magic == b"P4":
+            stride = (width + 7) // 8
+            body = data[pos + 1:pos + 1 + stride * height]
+            if len(body) != stride * height:
+                raise ValueError("PBM image is truncated")
+            return cls(width, height, [body[y * stride:(y + 1) * stride]
+                                       for y in range(height)])
+        lines = data[pos:].split(b"\n")
+        pixels = b"".join(
+            b"".join(line.split(b"#")[0].split()) for line in lines)
+        if len(pixels) < width * height or pixels.strip(b"01"):
+            raise ValueError("PBM image is truncated or malformed")
+        bits = pixels[:width * height].translate(_FROM_DIGITS)
+        return cls.from_bits([bits[y * width:(y + 1) * width]
+                              for y in range(height)])
+
+    @classmethod
+    def load(cls, path: str) -> "Stencil":
+        """Load a PBM image, or a text stencil if the file is not one."""
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:2] in (b"P1", b"P4"):
+            return cls.from_pbm(data)
+        return cls.from_text(data.decode("utf-8"))
+
+    def to_pbm(self) -> bytes:
+        """Encode as a binary (``P4``) PBM image."""
+        header = f"P4\n{self.width} {self.height}\n".encode("ascii")
+        return header + b"".join(self.rows)
+
+    def row(self, y: int) -> bytes:
+        """Row ``y`` as one 0/1 byte per cell."""
+        return _unpack(self.rows[y], self.width)
+
+    def cells(self) -> Iterator[Cell]:
+        """Blocked cells in row-major order."""
+        for y in range(self.height):
+            bits = self.row(y)
+            x = bits.find(1)
+            while x >= 0:
+                yield x, y
+                x = bits.find(1, x + 1)
+
+    def resized(self, width: int, height: int) -> "Stencil":
+        """Scale to ``width`` x ``height`` with nearest-neighbor sampling."""
+        if width <= 0 or height <= 0:
+            raise ValueError("stencil width and height must be positive")
+        columns = [x * self.width // width for x in range(width)]
+        stride = (width + 7) // 8
+        packed: Dict[int, bytes] = {}
+        rows = []
+        for y in range(height):
+            source = y * self.height // height
+            if source not in packed:
+                bits = self.row(source)
+                packed[source] = _pack(
+                    bytes(map(bits.__getitem__, columns)), stride)
+            rows.append(packed[source])
+        return Stencil(width, height, rows)
+
+    def scaled(self, factor: int) -> "Stencil":
+        """Scale up by an integer ``factor``."""
+        if factor <= 0:
+            raise ValueError("scale factor must be positive")
+        return self.resized(self.width * factor, self.height * factor)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Stencil):
+            return NotImplemented
+        return (self.width, self.height, self.rows) == (
+            other.width, other.height, other.rows)
+
+    def __hash__(self) -> int:
+        return hash((self.width, self.height, self.rows))
+
+    def __repr__(self) -> str:
+        return (f"Stencil({self.width}x{self.height}, "
+                f"{self.count} blocked)")
+
+
+class BlockedCells(MutableSet[Cell]):
+    """Set of blocked ``(x, y)`` cells kept as packed row bitsets."""
+
+    def __init__(self, width: int, height: int,
+                 cells: Iterable[Cell] = ()) -> None:
+        self.width = width
+        self.height = height
+        self.stride = (width + 7) // 8
+        self._rows: Dict[int, bytearray] = {}
+        self._count = 0
+        self.update(cells)
+
+    @classmethod
+    def _from_iterable(  # type: ignore[override]
+        cls, cells: Iterable[Cell]
+    ) -> AbstractSet[Cell]:
+        # Set operators (``a | b``, ``a - b``) return plain sets.
+        return set(cells)
+
+    def test(self, x: int, y: int) -> bool:
+        """True when ``(x, y)`` is blocked; one bit test."""
+        row = self._rows.get(y)
+        return (row is not None and 0 <= x < self.width
+                and bool(row[x >> 3] & 0x80 >> (x & 7)))
+
+    def __contains__(self, cell: object) -> bool:
+        if not isinstance(cell, tuple) or len(cell) != 2:
+            return False
+        return self.test(*cell)
+
+    def __iter__(self) -> Iterator[Cell]:
+        for y in sorted(self._rows):
+            bits = _unpack(self._rows[y], self.width)
+            x = bits.find(1)
+            while x >= 0:
+                yield x, y
+                x = bits.find(1, x + 1)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __repr__(self) -> str:
+        return (f"BlockedCells({self.width}x{self.height}, "
+                f"{self._count} blocked)")
+
+    def add(self, cell: Cell) -> None:
+        """Block ``cell``; it must be inside the grid."""
+        x, y = cell
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError(f"blocked cell ({x}, {y}) is outside the maze")
+        row = self._rows.get(y)
+        if row is None:
+            row = self._rows[y] = bytearray(self.stride)
+        bit = 0x80 >> (x & 7)
+        if not row[x >> 3] & bit:
+            row[x >> 3] |= bit
+            self._count += 1
+
+    def discard(self, cell: Cell) -> None:
+        """Unblock ``cell`` if it is blocked."""
+        x, y = cell
+        if not self.test(x, y):
+            return
+        row = self._rows[y]
+        row[x >> 3] &= ~(0x80 >> (x & 7)) & 0xFF
+        self._count -= 1
+        if not any(row):
+            del self._rows[y]
+
+    def update(self, cells: Iterable[Cell]) -> None:
+        """Block every cell of ``cells``."""
+        for cell in cells:
+            self.add(cell)
+
+    def clear(self) -> None:
+        """Unblock every cell."""
+        self._rows.clear()
+        self._count = 0
+
+    def paint(self, stencil: Stencil, x0: int, y0: int) -> None:
+        """Block every cell of ``stencil`` placed at ``(x0, y0)``."""
+        if (x0 < 0 or y0 < 0 or x0 + stencil.width > self.width
+                or y0 + stencil.height > self.height):
+            raise ValueError(
+                f"{stencil.width}x{stencil.height} stencil at "
+                f"({x0}, {y0}) does not fit a {self.width}x{self.height} "
+                f"maze")
+        shift = (self.stride - stencil.stride) * 8 - x0
+        for dy, packed in enumerate(stencil.rows):
+            bits = int.from_bytes(packed, "big")
+            if not bits:
+                continue
+            # Dropped low bits are padding: the stencil fits the width.
+            bits = bits << shift if shift >= 0 else bits >> -shift
+            row = self._rows.get(y0 + dy)
+            old = int.from_bytes(row, "big") if row is not None else 0
+            new = old | bits
+            self._count += new.bit_count() - old.bit_count()
+            self._rows[y0 + dy] = bytearray(new.to_bytes(self.stride, "big"))
+
+    def row(self, y: int) -> Optional[bytes]:
+        """Row ``y`` as one 0/1 byte per cell, or None if it is free."""
+        row = self._rows.get(y)
+        return None if row is None else _unpack(row, self.width)
+
+    def rows(self) -> Iterator[Tuple[int, bytes]]:
+        """``(y, row)`` for every row holding a blocked cell, in order."""
+        for y in sorted(self._rows):
+            yield y, _unpack(self._rows[y], self.width)
+
+
+def row_masks(blocked: AbstractSet[Cell], width: int) -> Dict[int, bytes]:
+    """Map each row holding a blocked cell to its 0/1 byte-per-cell mask.
+
+    Reads ``BlockedCells`` a row at a time; other sets are scanned once.
+    """
+    if isinstance(blocked, BlockedCells):
+        return dict(blocked.rows())
+    masks: Dict[int, bytearray] = {}
+    for x, y in blocked:
+        if 0 <= x < width:
+            masks.setdefault(y, bytearray(width))[x] = 1
+    return {y: bytes(mask) for y, mask in masks.items()}
+
+
+LOGO_42 = Stencil.from_text(
+    "........\n"
+    ".#...###\n"
+    ".#.....#\n"
+    ".###.###\n"
+    "...#.#..\n"
+    "...#.###\n"
+)
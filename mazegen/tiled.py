@@ -0,0 +1,193 @@
+"""Tiled, multi-process generation for very large mazes.
+
+The grid is split into ``tile_size`` x ``tile_size`` tiles (the last row
+and column of tiles may be smaller). Every tile is generated as an
+independent maze in a worker process, seeded from the master seed and
+the tile position, so the result depends only on the seed and the tile
+size, never on the number of workers or the scheduling order.
+
+Inside a tile every physically connected region becomes one tree. The
+tiles are then stitched by running Kruskal over those regions: seam
+walls are shuffled with the master RNG and a wall is opened only when it
+joins two regions that are not connected yet. Each spanning-tree edge of
+the region graph therefore gets exactly one passage and a perfect maze
+stays perfect. Blocked cells of the “42” pattern are handed to the tiles
+they fall in and seam walls next to them are never opened, so the
+pattern is respected when it crosses a tile boundary.
+"""
+
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from . import instrument
+from .maze_generator import Maze
+from .random_source import make_rng
+from .stencil import Stencil
+
+TileJob = Tuple[
+    int, int, int, int, List[Tuple[int, int]], str, bool, str, str]
+TileResult = Tuple[bytes, int, List[int], List[int], List[int], List[int]]
+
+
+def _generate_tile(job: TileJob) -> TileResult:
+    """Generate one tile and return its walls and edge region labels.
+
+    Returns ``(walls, regions, top, bottom, left, right)`` where
+    ``walls`` holds one byte per cell in row-major order and the four
+    lists give the region label of each cell along the tile edges
+    (``-1`` for blocked cells).
+    """
+    _, _, width, height, blocked, algo, perfect, seed, source = job
+    tile = Maze(width, height)
+    tile.blocked_cells.update(blocked)
+    rng = make_rng(source, seed)
+    tile._run_algo(algo, rng)
+    labels, regions = tile._join_components(rng)
+    if not perfect:
+        tile._add_loops(rng, loop_chance=0.1)
+
+    walls = b"".join(bytes(row) for row in tile.walls)
+    return (
+        walls,
+        regions,
+        labels[:width].tolist(),
+        labels[(height - 1) * width:].tolist(),
+        labels[::width].tolist(),
+        labels[width - 1::width].tolist(),
+    )
+
+
+def generate_tiled(
+    maze: Maze,
+    seed: Optional[int] = None,
+    algo: str = "prim",
+    perfect: bool = True,
+    tile_size: int = 256,
+    workers: Optional[int] = None,
+    random_source: str = "std",
+    stencil: Optional[Stencil] = None,
+) -> None:
+    """Generate ``maze`` tile by tile across a pool of processes.
+
+    Args:
+        maze: Maze to fill; it is reset and receives the 42 pattern.
+        seed: Master seed. Tiles derive their own seeds from it.
+        algo: Algorithm used inside every tile.
+        perfect: Keep a single path between any two cells. When False
+            each tile adds loops as ``generate_maze`` does.
+        tile_size: Side of a tile in cells.
+        workers: Number of worker processes; defaults to the CPU count.
+            With a single worker everything runs in-process.
+        random_source: RNG provider for the tiles and the stitching.
+        stencil: Obstacles placed instead of the 42 pattern.
+    """
+    if tile_size <= 0:
+        raise ValueError("tile_size must be positive")
+
+    master = make_rng(random_source, seed)
+    base = master.getrandbits(64)
+    maze.reset()
+    maze._place_obstacles(stencil)
+
+    tiles_x = (maze.width + tile_size - 1) // tile_size
+    tiles_y = (maze.height + tile_size - 1) // tile_size
+    blocked_by_tile: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+    for x, y in maze.blocked_cells:
+        tile_key = (x // tile_size, y // tile_size)
+        blocked_by_tile.setdefault(tile_key, []).append(
+            (x % tile_size, y % tile_size))
+
+    jobs: List[TileJob] = []
+    for ty in range(tiles_y):
+        for tx in range(tiles_x):
+            x0, y0 = tx * tile_size, ty * tile_size
+            jobs.append((
+                x0,
+                y0,
+                min(tile_size, maze.width - x0),
+                min(tile_size, maze.height - y0),
+                sorted(blocked_by_tile.get((tx, ty), [])),
+                algo,
+                perfect,
+                f"{base}:{tx}:{ty}",
+                random_source,
+            ))
+
+    workers = workers or os.cpu_count() or 1
+    instrument.count("tiles", len(jobs))
+    with instrument.span("tiles"):
+        if workers == 1 or len(jobs) == 1:
+            results = [_generate_tile(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_generate_tile, jobs))
+
+    offsets: List[int] = []
+    total = 0
+    for job, result in zip(jobs, results):
+        x0, y0, width, height = job[:4]
+        walls = result[0]
+        for row in range(height):
+            maze.walls[y0 + row][x0:x0 + width] = walls[
+                row * width:(row + 1) * width]
+        offsets.append(total)
+        total += result[1]
+
+    with instrument.span("stitch"):
+        _stitch(maze, master, jobs, results, offsets, tiles_x, tiles_y,
+                total)
+
+
+def _stitch(
+    maze: Maze,
+    rng: random.Random,
+    jobs: List[TileJob],
+    results: List[TileResult],
+    offsets: List[int],
+    tiles_x: int,
+    tiles_y: int,
+    regions: int,
+) -> None:
+    """Open one seam passage per edge of a spanning tree over regions."""
+    seams: List[Tuple[int, int, int, int, int]] = []
+    for ty in range(tiles_y):
+        for tx in range(tiles_x):
+            i = ty * tiles_x + tx
+            x0, y0, width, height = jobs[i][:4]
+            if tx + 1 < tiles_x:
+                j = i + 1
+                right, left = results[i][5], results[j][4]
+                for row in range(height):
+                    a, b = right[row], left[row]
+                    if a != -1 and b != -1:
+                        seams.append((x0 + width - 1, y0 + row, 0,
+                                      offsets[i] + a, offsets[j] + b))
+            if ty + 1 < tiles_y:
+                j = i + tiles_x
+                bottom, top = results[i][3], results[j][2]
+                for col in range(width):
+                    a, b = bottom[col], top[col]
+                    if a != -1 and b != -1:
+                        seams.append((x0 + col, y0 + height - 1, 1,
+                                      offsets[i] + a, offsets[j] + b))
+
+    rng.shuffle(seams)
+    parent = list(range(regions))
+
+    def find(c: int) -> int:
+        while parent[c] != c:
+            parent[c] = parent[parent[c]]
+            c = parent[c]
+        return c
+
+    for x, y, axis, a, b in seams:
+        ra, rb = find(a), find(b)
+        if ra == rb:
+            continue
+        parent[rb] = ra
+        if axis:
+            maze._carve_passage(x, y, x, y + 1, maze.S, maze.N)
+        else:
+            maze._carve_passage(x, y, x + 1, y, maze.E, maze.W)
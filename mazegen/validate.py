@@ -0,0 +1,393 @@
+"""Streaming validation of maze output files.
+
+The validator reads one hex row at a time and keeps only the previous
+row, so files far larger than memory can be checked. It reports:
+
+- ``width``: a row whose length differs from the first row;
+- ``hex``: a row with characters other than hex digits;
+- ``mismatch``: two neighboring cells that disagree about their wall;
+- ``border``: an open wall on the outer edge of the grid;
+- ``trailer``: a missing or malformed blank line, entry, exit or path
+  line, or a path that does not end on the exit;
+- ``empty``: no maze rows at all.
+
+Row comparisons run on whole rows with ``bytes.translate``; the per-cell
+scan only happens for rows that actually disagree. Walls along the path
+are not checked, as that would need the whole grid in memory.
+
+``validate_many`` checks many files in a process pool and is what the
+command line uses::
+
+    python -m mazegen.validate outputs/ "runs/**/*.txt.gz" --fail-fast
+"""
+
+import argparse
+import glob
+import itertools
+import lzma
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Deque, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .maze_generator import Maze
+from .moves import decode_moves
+from .output_writer import decode_hex_row, open_output, parse_point
+
+MAX_ISSUES = 100
+READ_ERRORS = (OSError, EOFError, UnicodeDecodeError, lzma.LZMAError)
+
+
+def _bit_table(bit: int) -> bytes:
+    """Translate table mapping a wall mask to 1 if ``bit`` is set."""
+    return bytes(1 if mask & bit else 0 for mask in range(256))
+
+
+# Per-direction wall bits, also used by ``mazegen.verify``.
+NORTH_BITS = _bit_table(Maze.N)
+EAST_BITS = _bit_table(Maze.E)
+SOUTH_BITS = _bit_table(Maze.S)
+WEST_BITS = _bit_table(Maze.W)
+
+
+@dataclass(frozen=True)
+class Issue:
+    """One problem found in a file (``line`` is 1-based)."""
+
+    kind: str
+    line: int
+    message: str
+    cell: Optional[Tuple[int, int]] = None
+
+    def __str__(self) -> str:
+        return f"line {self.line}: {self.kind}: {self.message}"
+
+
+@dataclass
+class ValidationResult:
+    """Outcome of validating one file.
+
+    ``issues`` keeps at most ``max_issues`` entries so memory stays
+    bounded on badly broken files; ``issue_count`` counts all of them.
+    """
+
+    width: int = 0
+    height: int = 0
+    issues: List[Issue] = field(default_factory=list)
+    issue_count: int = 0
+    max_issues: int = MAX_ISSUES
+
+    @property
+    def ok(self) -> bool:
+        """True when no issue was found."""
+        return self.issue_count == 0
+
+    def add(self, kind: str, line: int, message: str,
+            cell: Optional[Tuple[int, int]] = None) -> None:
+        """Record an issue, keeping only the first ``max_issues``."""
+        self.issue_count += 1
+        if len(self.issues) < self.max_issues:
+            self.issues.append(Issue(kind, line, message, cell))
+
+
+def _differences(a: bytes, b: bytes) -> List[int]:
+    """Return the indices where two equally long byte strings differ."""
+    return [i for i, (x, y) in enumerate(zip(a, b)) if x != y]
+
+
+def _check_border(
+    result: ValidationResult, row: bytes, table: bytes, y: int, side: str
+) -> None:
+    """Report open cells of a border row (``table`` selects the wall)."""
+    bits = row.translate(table)
+    if 0 in bits:
+        for x in _differences(bits, b"\1" * len(bits)):
+            result.add("border", y + 1, f"{side} wall of ({x},{y}) is open",
+                       (x, y))
+
+
+def _check_row(
+    result: ValidationResult, row: bytes, prev: Optional[bytes], y: int
+) -> None:
+    """Check one decoded row against itself and the row above."""
+    width = len(row)
+    if not row[0] & Maze.W:
+        result.add("border", y + 1, f"west wall of (0,{y}) is open", (0, y))
+    if not row[-1] & Maze.E:
+        result.add("border", y + 1,
+                   f"east wall of ({width - 1},{y}) is open", (width - 1, y))
+    east = row[:-1].translate(EAST_BITS)
+    west = row[1:].translate(WEST_BITS)
+    if east != west:
+        for x in _differences(east, west):
+            result.add("mismatch", y + 1,
+                       f"({x},{y}) east and ({x + 1},{y}) west disagree",
+                       (x, y))
+    if prev is None:
+        if y == 0:
+            _check_border(result, row, NORTH_BITS, y, "north")
+        return
+    south = prev.translate(SOUTH_BITS)
+    north = row.translate(NORTH_BITS)
+    if south != north:
+        for x in _differences(south, north):
+            result.add("mismatch", y + 1,
+                       f"({x},{y - 1}) south and ({x},{y}) north disagree",
+                       (x, y - 1))
+
+
+def _check_trailer(
+    result: ValidationResult, lines: List[Tuple[int, str]], last: int
+) -> None:
+    """Check the entry, exit and path lines after the blank line."""
+    names = ("entry", "exit", "path")
+    if len(lines) < 3:
+        result.add("trailer", last + 1,
+                   f"missing {names[len(lines)]} line")
+        return
+    points: List[Tuple[int, int]] = []
+    for (number, text), name in zip(lines[:2], names):
+        try:
+            x, y = parse_point(text)
+        except ValueError:
+            result.add("trailer", number, f"invalid {name} '{text}'")
+            continue
+        if not (0 <= x < result.width and 0 <= y < result.height):
+            result.add("trailer", number, f"{name} ({x},{y}) is outside")
+        points.append((x, y))
+    number, text = lines[2]
+    try:
+        moves = decode_moves(text)
+    except ValueError as e:
+        result.add("trailer", number, f"invalid path: {e}")
+        return
+    if len(points) == 2:
+        (ex, ey), (xx, xy) = points
+        end = (ex + moves.count("E") - moves.count("W"),
+               ey + moves.count("S") - moves.count("N"))
+        if end != (xx, xy):
+            result.add("trailer", number,
+                       f"path ends at {end[0]},{end[1]}, not on the exit")
+
+
+def validate_lines(
+    lines: Iterable[str], max_issues: int = MAX_ISSUES
+) -> ValidationResult:
+    """Validate an output file given as an iterable of lines."""
+    result = ValidationResult(max_issues=max_issues)
+    prev: Optional[bytes] = None
+    number = 0
+    it = iter(lines)
+    blank = False
+    for number, line in enumerate(it, 1):
+        text = line.strip()
+        if not text:
+            blank = True
+            break
+        y = result.height
+        result.height += 1
+        if y == 0:
+            result.width = len(text)
+        try:
+            row = decode_hex_row(text)
+        except ValueError:
+            result.add("hex", number, f"row {y} has invalid hex digits")
+            prev = None
+            continue
+        if len(row) != result.width:
+            result.add("width", number,
+                       f"row {y} has {len(row)} cells, "
+                       f"expected {result.width}")
+            prev = None
+            continue
+        _check_row(result, row, prev, y)
+        prev = row
+
+    if result.height == 0:
+        result.add("empty", max(number, 1), "no maze rows")
+        return result
+    if prev is not None:
+        _check_border(result, prev, SOUTH_BITS, result.height - 1, "south")
+    if not blank:
+        result.add("trailer", number + 1, "missing blank line after rows")
+        return result
+    trailer: List[Tuple[int, str]] = []
+    for number, line in enumerate(it, number + 1):
+        trailer.append((number, line.strip()))
+        if len(trailer) == 3:
+            break
+    _check_trailer(result, trailer, number)
+    return result
+
+
+def validate_file(
+    path: str, max_issues: int = MAX_ISSUES
+) -> ValidationResult:
+    """Validate an output file, compressed or not."""
+    with open_output(path) as f:
+        return validate_lines(f, max_issues)
+
+
+@dataclass
+class FileReport:
+    """Outcome for one file of a bulk run (``error`` if unreadable)."""
+
+    path: str
+    size: int
+    result: Optional[ValidationResult] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        """True when the file was read and had no issue."""
+        return self.result is not None and self.result.ok
+
+
+def _validate_chunk(
+    paths: Sequence[str], max_issues: int
+) -> List[FileReport]:
+    """Validate a chunk of files; runs inside a pool worker."""
+    reports: List[FileReport] = []
+    for path in paths:
+        try:
+            size = os.path.getsize(path)
+            reports.append(
+                FileReport(path, size, validate_file(path, max_issues)))
+        except READ_ERRORS as e:
+            reports.append(FileReport(path, 0, error=str(e)))
+    return reports
+
+
+def expand_paths(targets: Iterable[str]) -> List[str]:
+    """Expand directories (recursively) and glob patterns into files."""
+    files: List[str] = []
+    for target in targets:
+        if os.path.isdir(target):
+            for root, dirs, names in os.walk(target):
+                dirs.sort()
+                files.extend(os.path.join(root, name)
+                             for name in sorted(names))
+        elif os.path.exists(target):
+            files.append(target)
+        else:
+            files.extend(path for path in sorted(
+                glob.glob(target, recursive=True)) if os.path.isfile(path))
+    return files
+
+
+def validate_many(
+    paths: Sequence[str],
+    workers: Optional[int] = None,
+    max_issues: int = MAX_ISSUES,
+    chunk_size: int = 16,
+    fail_fast: bool = False,
+) -> Iterator[FileReport]:
+    """Yield one ``FileReport`` per path, in the order given.
+
+    Chunks of ``chunk_size`` files are validated in a process pool of
+    ``workers`` processes (the CPU count by default; 1 runs in-process).
+    With ``fail_fast`` nothing is yielded after the first failing file
+    and queued chunks are cancelled.
+    """
+    chunks = [paths[i:i + chunk_size]
+              for i in range(0, len(paths), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in chunks:
+            for report in _validate_chunk(chunk, max_issues):
+                yield report
+                if fail_fast and not report.ok:
+                    return
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Same windowed, in-order consumption as the seed search.
+        queued = iter(chunks)
+        pending: Deque["Future[List[FileReport]]"] = deque(
+            pool.submit(_validate_chunk, chunk, max_issues)
+            for chunk in itertools.islice(queued, workers * 2))
+        try:
+            while pending:
+                reports = pending.popleft().result()
+                following = next(queued, None)
+                if following is not None:
+                    pending.append(
+                        pool.submit(_validate_chunk, following, max_issues))
+                for report in reports:
+                    yield report
+                    if fail_fast and not report.ok:
+                        return
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _print_report(report: FileReport, quiet: bool) -> None:
+    """Print one file's outcome."""
+    result = report.result
+    if result is None:
+        print(f"{report.path}: cannot read: {report.error}")
+        return
+    if result.ok:
+        if not quiet:
+            print(f"{report.path}: OK ({result.width}x{result.height})")
+        return
+    for issue in result.issues:
+        print(f"{report.path}:{issue}")
+    hidden = result.issue_count - len(result.issues)
+    if hidden:
+        print(f"{report.path}: ... and {hidden} more issues")
+    print(f"{report.path}: FAILED ({result.issue_count} issues)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point; returns the exit status.
+
+    The status is 0 when every file passed, 1 when some file has issues
+    and 2 when a file could not be read or nothing matched.
+    """
+    parser = argparse.ArgumentParser(
+        description="Validate maze output files.")
+    parser.add_argument("paths", nargs="+", metavar="PATH",
+                        help="files, directories or glob patterns")
+    parser.add_argument("--max-issues", type=int, default=MAX_ISSUES,
+                        help="issues to print per file at most")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--fail-fast", action="store_true",
+                        help="stop at the first failing file")
+    parser.add_argument("--quiet", action="store_true",
+                        help="only print failing files and the summary")
+    args = parser.parse_args(argv)
+
+    paths = expand_paths(args.paths)
+    if not paths:
+        print("no files to validate")
+        return 2
+    started = time.perf_counter()
+    checked = failed = unreadable = size = 0
+    for report in validate_many(paths, args.workers, args.max_issues,
+                                fail_fast=args.fail_fast):
+        _print_report(report, args.quiet)
+        checked += 1
+        size += report.size
+        if report.result is None:
+            unreadable += 1
+        elif not report.ok:
+            failed += 1
+    if len(paths) > 1:
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(f"{checked} of {len(paths)} files checked: "
+              f"{checked - failed - unreadable} passed, {failed} failed, "
+              f"{unreadable} unreadable in {elapsed:.2f}s "
+              f"({checked / elapsed:.1f} files/s, "
+              f"{size / elapsed / 1e6:.1f} MB/s)")
+    if unreadable:
+        return 2
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
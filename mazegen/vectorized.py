@@ -0,0 +1,281 @@
+"""NumPy kernels for the row-local maze generators.
+
+Binary Tree and Sidewinder only look at a cell, its row and the row
+above, so every wall decision for a block of rows is computed with a
+handful of array operations and written back row by row. The wall
+grid is processed in fixed blocks of ``ROW_BLOCK`` rows, which keeps
+temporary memory flat and makes the output independent of the grid
+height. NumPy is optional: ``HAVE_NUMPY`` tells callers whether these
+kernels can run, and the maze falls back to pure Python otherwise.
+
+``shuffled`` permutes a large integer array (Kruskal's edge list) in
+one call instead of one Python-level draw per element.
+
+``bfs_levels`` is a level-synchronous breadth-first search: each
+iteration expands the whole frontier with array operations, so the
+interpreter cost is per level rather than per cell.
+"""
+
+from array import array
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
+import random
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised without numpy
+    np = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from .maze_generator import Maze
+
+HAVE_NUMPY = np is not None
+ROW_BLOCK = 512
+SMALL_FRONTIER = 64
+
+
+def _blocked_mask(maze: "Maze", y0: int, y1: int) -> Any:
+    """Return a boolean mask of blocked cells for rows ``y0 .. y1 - 1``.
+
+    Rows outside the maze are reported as unblocked.
+    """
+    mask = np.zeros((y1 - y0, maze.width), dtype=bool)
+    for y in range(max(y0, 0), min(y1, maze.height)):
+        row = maze.blocked_cells.row(y)
+        if row is not None:
+            mask[y - y0] = np.frombuffer(row, dtype=np.uint8)
+    return mask
+
+
+def _availability(
+    maze: "Maze", y0: int, y1: int
+) -> Tuple[Any, Any, Any]:
+    """Return (blocked, can_go_north, can_go_east) for rows y0 .. y1 - 1."""
+    blocked = _blocked_mask(maze, y0 - 1, y1)
+    here = blocked[1:]
+    avail_n = ~here & ~blocked[:-1]
+    if y0 == 0:
+        avail_n[0] = False
+    avail_e = np.zeros_like(here)
+    avail_e[:, :-1] = ~here[:, :-1] & ~here[:, 1:]
+    return here, avail_n, avail_e
+
+
+def _coins(gen: Any, shape: Tuple[int, int]) -> Any:
+    """Draw one random bit per cell."""
+    return gen.integers(0, 2, size=shape, dtype=np.uint8).astype(bool)
+
+
+def _walls_from_moves(go_n: Any, go_e: Any) -> Any:
+    """Build wall bytes for a block from its north/east carve decisions.
+
+    The south walls of the last row still depend on the next block and
+    are opened by the caller.
+    """
+    n = go_n.view(np.uint8)
+    e = go_e.view(np.uint8)
+    walls = np.full(go_n.shape, 15, dtype=np.uint8)
+    walls -= n
+    walls -= e << 1
+    walls[:-1] -= n[1:] << 2
+    walls[:, 1:] -= e[:, :-1] << 3
+    return walls
+
+
+def _emit_blocks(
+    maze: "Maze",
+    rng: random.Random,
+    carve_block: Any,
+) -> List[Tuple[int, int]]:
+    """Run ``carve_block`` over every row block and store the walls.
+
+    ``carve_block(gen, y0, y1)`` returns ``(go_n, go_e, roots)`` for the
+    rows ``y0 .. y1 - 1``, where ``roots`` are cells left without a
+    parent in the carved forest.
+    """
+    gen = np.random.default_rng(rng.getrandbits(64))
+    roots: List[Tuple[int, int]] = []
+    carry = None
+    for y0 in range(0, maze.height, ROW_BLOCK):
+        y1 = min(y0 + ROW_BLOCK, maze.height)
+        go_n, go_e, block_roots = carve_block(gen, y0, y1)
+        roots.extend(block_roots)
+        walls = _walls_from_moves(go_n, go_e)
+        if carry is not None:
+            carry -= go_n[0].view(np.uint8) << 2
+            maze.walls[y0 - 1][:] = carry.tobytes()
+        for i in range(y1 - y0 - 1):
+            maze.walls[y0 + i][:] = walls[i].tobytes()
+        carry = walls[-1]
+    if carry is not None:
+        maze.walls[maze.height - 1][:] = carry.tobytes()
+    return roots
+
+
+def _cells(mask: Any, y0: int) -> List[Tuple[int, int]]:
+    """Return the (x, y) coordinates set in ``mask`` offset by ``y0``."""
+    ys, xs = np.nonzero(mask)
+    return list(zip(xs.tolist(), (ys + y0).tolist()))
+
+
+def binary_tree(maze: "Maze", rng: random.Random) -> List[Tuple[int, int]]:
+    """Carve a Binary Tree forest and return the roots of its trees."""
+
+    def carve_block(
+        gen: Any, y0: int, y1: int
+    ) -> Tuple[Any, Any, List[Tuple[int, int]]]:
+        here, avail_n, avail_e = _availability(maze, y0, y1)
+        coin = _coins(gen, here.shape)
+        go_n = avail_n & (coin | ~avail_e)
+        go_e = avail_e & ~go_n
+        return go_n, go_e, _cells(~here & ~avail_n & ~avail_e, y0)
+
+    return _emit_blocks(maze, rng, carve_block)
+
+
+def sidewinder(maze: "Maze", rng: random.Random) -> List[Tuple[int, int]]:
+    """Carve a Sidewinder forest and return the roots of its trees.
+
+    Each row is split into runs by random coin flips. Runs are grouped
+    with a cumulative sum over run starts, and one north-open cell per
+    run is drawn by ranking the run's candidates. Runs without any
+    candidate become tree roots, identified by their last cell.
+    """
+
+    def carve_block(
+        gen: Any, y0: int, y1: int
+    ) -> Tuple[Any, Any, List[Tuple[int, int]]]:
+        here, avail_n, avail_e = _availability(maze, y0, y1)
+        close = _coins(gen, here.shape)
+        if y0 == 0:
+            close[0] = False
+        go_e = avail_e & ~close
+
+        start = np.ones(here.shape, dtype=bool)
+        start[:, 1:] = ~go_e[:, :-1]
+        run = np.cumsum(start.ravel()) - 1
+        runs = int(run[-1]) + 1
+
+        cand = avail_n.ravel()
+        count = np.bincount(run[cand], minlength=runs)
+        draw = gen.integers(0, 1 << 32, size=runs, dtype=np.uint64)
+        pick = (draw * count.astype(np.uint64)) >> np.uint64(32)
+        first = np.cumsum(count) - count
+        rank = np.cumsum(cand) - 1 - first[run]
+        go_n = (cand & (rank == pick[run].astype(np.int64))).reshape(
+            here.shape)
+
+        ends = ~here & ~go_e & (count[run] == 0).reshape(here.shape)
+        return go_n, go_e, _cells(ends, y0)
+
+    return _emit_blocks(maze, rng, carve_block)
+
+
+def shuffled(rng: random.Random, values: "array[int]") -> List[int]:
+    """Return ``values`` (64-bit integers) in a random order.
+
+    The permutation comes from a NumPy generator seeded by ``rng``, so
+    it is reproducible for a seed but differs from ``rng.shuffle``.
+    """
+    gen = np.random.default_rng(rng.getrandbits(64))
+    order: List[int] = gen.permutation(
+        np.frombuffer(values, dtype=np.int64)).tolist()
+    return order
+
+
+def _passages(maze: "Maze") -> Any:
+    """Return a (cells, 4) mask of open N, E, S, W passages per cell.
+
+    A passage is open when the cell's own wall bit is clear and both
+    cells are inside the grid and not blocked.
+    """
+    width, height = maze.width, maze.height
+    # Mapped and shared mazes expose their grid as one flat buffer.
+    cells = getattr(maze, "cells", None)
+    if cells is not None:
+        grid = np.frombuffer(cells, dtype=np.uint8).reshape(height, width)
+    else:
+        grid = np.array(maze.walls, dtype=np.uint8).reshape(height, width)
+    free = ~_blocked_mask(maze, 0, height)
+    open_ = np.zeros((4, height, width), dtype=bool)
+    open_[0, 1:] = (grid[1:] & maze.N == 0) & free[1:] & free[:-1]
+    open_[1, :, :-1] = (grid[:, :-1] & maze.E == 0) & free[:, :-1] \
+        & free[:, 1:]
+    open_[2, :-1] = (grid[:-1] & maze.S == 0) & free[:-1] & free[1:]
+    open_[3, :, 1:] = (grid[:, 1:] & maze.W == 0) & free[:, 1:] \
+        & free[:, :-1]
+    return np.ascontiguousarray(open_.reshape(4, -1).T)
+
+
+def bfs_levels(
+    maze: "Maze", start: int, goal: Optional[int] = None
+) -> Tuple[Any, Any]:
+    """Breadth-first search from flat cell ``start``, one level at a time.
+
+    Returns ``(dist, parent_dir)`` as flat arrays: the step count from
+    ``start`` (-1 if unreached) and the direction index (0-3 for N, E, S,
+    W, -1 for none) of the step that entered each cell. The search stops
+    after the level containing ``goal`` when one is given.
+
+    Frontiers are kept in the order the queue-based search would hold
+    them: candidates are listed frontier cell by frontier cell in N, E,
+    S, W order and each new cell keeps its first candidate, so parents
+    match ``path_finder.bfs_flat_path`` exactly. Frontiers smaller than
+    ``SMALL_FRONTIER`` (long corridors) are expanded in a plain loop over
+    the same buffers, where per-call array overhead would dominate.
+    """
+    width = maze.width
+    size = width * maze.height
+    passages = _passages(maze)
+    masks = (passages @ np.array([1, 2, 4, 8], dtype=np.uint8)).tobytes()
+    dist_buf = array("i", [-1]) * size
+    dir_buf = array("b", [-1]) * size
+    dist = np.frombuffer(dist_buf, dtype=np.int32)
+    parent_dir = np.frombuffer(dir_buf, dtype=np.int8)
+    offsets = np.array([-width, 1, width, -1])
+    steps = tuple(zip((1, 2, 4, 8), (-width, 1, width, -1), range(4)))
+    frontier: Any = [start]
+    dist_buf[start] = 0
+    level = 0
+    while len(frontier) and (goal is None or dist_buf[goal] < 0):
+        level += 1
+        if len(frontier) < SMALL_FRONTIER:
+            found = []
+            for cell in (frontier.tolist() if isinstance(frontier, np.ndarray)
+                         else frontier):
+                mask = masks[cell]
+                for bit, offset, k in steps:
+                    if mask & bit and dist_buf[cell + offset] < 0:
+                        dist_buf[cell + offset] = level
+                        dir_buf[cell + offset] = k
+                        found.append(cell + offset)
+            frontier = found
+            continue
+        frontier = np.asarray(frontier)
+        is_open = passages[frontier]
+        cells = (frontier[:, None] + offsets)[is_open]
+        dirs = np.nonzero(is_open)[1]
+        new = dist[cells] < 0
+        cells, dirs = cells[new], dirs[new]
+        _, first = np.unique(cells, return_index=True)
+        first.sort()
+        frontier = cells[first]
+        dist[frontier] = level
+        parent_dir[frontier] = dirs[first]
+    return dist, parent_dir
+
+
+def path_from_parents(
+    parent_dir: Any, start: int, goal: int, width: int
+) -> Optional[List[int]]:
+    """Walk ``bfs_levels`` parent directions back from ``goal``."""
+    if goal != start and parent_dir[goal] < 0:
+        return None
+    back = (-width, 1, width, -1)
+    steps = parent_dir.tolist()
+    path = [goal]
+    cell = goal
+    while cell != start:
+        cell -= back[steps[cell]]
+        path.append(cell)
+    path.reverse()
+    return path
@@ -0,0 +1,188 @@
+"""Structural verification of generated mazes.
+
+``verify`` checks a maze in linear time:
+
+- every wall is recorded the same way in both cells that share it;
+- the outer border is closed;
+- the 42 pattern cells keep all four walls and no passage leads into
+  them;
+- the open cells form one connected component, and a perfect maze is a
+  spanning tree over them (``edges == cells - 1``, no cycles). Cells the
+  obstacles cut off from the largest open region (a pattern touching
+  the border can enclose a few) cannot be reached by any maze and are
+  left out of the connectivity check.
+
+Wall consistency is checked a row at a time with ``bytes.translate``;
+edges and components reuse the direction buffer and search of
+``mazegen.analysis``, so large grids take the NumPy path there.
+
+Set ``MAZEGEN_VERIFY=1`` to verify every ``Maze.generate_maze`` result;
+a failed check raises ``MazeVerificationError``.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from .analysis import (bfs, count_components, direction_buffer,
+                       neighbor_table)
+from .maze_generator import Maze
+from .validate import EAST_BITS, NORTH_BITS, SOUTH_BITS, WEST_BITS
+
+
+class MazeVerificationError(AssertionError):
+    """Raised when a generated maze fails verification."""
+
+
+@dataclass
+class Verification:
+    """Counts and defects found by ``verify``."""
+
+    cells: int
+    edges: int
+    components: int
+    # Components made only of cells the obstacles cut off.
+    enclosed: int = 0
+    mismatched_walls: int = 0
+    border_openings: List[Tuple[int, int]] = field(default_factory=list)
+    pattern_openings: List[Tuple[int, int]] = field(default_factory=list)
+
+    @property
+    def cycles(self) -> int:
+        """Independent cycles (cycle rank of the passage graph)."""
+        return self.edges - self.cells + self.components
+
+    @property
+    def connected(self) -> bool:
+        """True when every open cell is reachable from every other."""
+        return self.components <= 1
+
+    @property
+    def connected_regions(self) -> bool:
+        """True when the cells outside enclosed regions are connected."""
+        return self.components - self.enclosed <= 1
+
+    @property
+    def perfect(self) -> bool:
+        """True when the passages form a spanning tree."""
+        return self.connected and self.cycles == 0
+
+    def problems(self, perfect: bool = False) -> List[str]:
+        """Describe every failed check (``perfect`` adds the tree check)."""
+        found = []
+        if self.mismatched_walls:
+            found.append(f"{self.mismatched_walls} walls differ between "
+                         f"neighboring cells")
+        if self.border_openings:
+            found.append(f"border open at {self.border_openings[:5]}")
+        if self.pattern_openings:
+            found.append(f"pattern open at {self.pattern_openings[:5]}")
+        if not self.connected_regions:
+            found.append(f"{self.components} disconnected components")
+        if perfect and self.cycles:
+            found.append(f"{self.cycles} cycles in a perfect maze")
+        return found
+
+    def check(self, perfect: bool = False) -> None:
+        """Raise ``MazeVerificationError`` if any check failed."""
+        found = self.problems(perfect)
+        if found:
+            raise MazeVerificationError("; ".join(found))
+
+
+def _wall_defects(maze: Maze, result: Verification) -> None:
+    """Count wall mismatches and collect border openings."""
+    width, height = maze.width, maze.height
+    prev: Optional[bytes] = None
+    for y, cells in enumerate(maze.walls):
+        row = bytes(cells)
+        if not row[0] & Maze.W:
+            result.border_openings.append((0, y))
+        if not row[-1] & Maze.E:
+            result.border_openings.append((width - 1, y))
+        east = row[:-1].translate(EAST_BITS)
+        west = row[1:].translate(WEST_BITS)
+        if east != west:
+            result.mismatched_walls += (
+                int.from_bytes(east, "big")
+                ^ int.from_bytes(west, "big")).bit_count()
+        if prev is not None:
+            south = prev.translate(SOUTH_BITS)
+            north = row.translate(NORTH_BITS)
+            if south != north:
+                result.mismatched_walls += (
+                    int.from_bytes(south, "big")
+                    ^ int.from_bytes(north, "big")).bit_count()
+        for border_y, table in ((0, NORTH_BITS), (height - 1, SOUTH_BITS)):
+            if y == border_y:
+                bits = row.translate(table)
+                x = bits.find(0)
+                while x >= 0:
+                    result.border_openings.append((x, y))
+                    x = bits.find(0, x + 1)
+        prev = row
+
+
+def _pattern_defects(maze: Maze, result: Verification) -> None:
+    """Collect pattern cells that are not fully walled off."""
+    walls = maze.walls
+    for x, y in sorted(maze.blocked_cells):
+        if walls[y][x] != 15:
+            result.pattern_openings.append((x, y))
+            continue
+        for dx, dy, _bit, opp_bit in maze.dirs:
+            nx, ny = x + dx, y + dy
+            if (0 <= nx < maze.width and 0 <= ny < maze.height
+                    and not walls[ny][nx] & opp_bit):
+                result.pattern_openings.append((x, y))
+                break
+
+
+def _enclosed_cells(
+    nbrs: List[Tuple[int, ...]], open_dirs: bytearray, free: bytearray
+) -> bytearray:
+    """Mark the open cells outside the largest wall-free region."""
+    enclosed = bytearray(free)
+    largest: List[int] = []
+    start = enclosed.find(1)
+    while start >= 0:
+        _dist, order = bfs(nbrs, open_dirs, start)
+        for cell in order:
+            enclosed[cell] = 2
+        if len(order) > len(largest):
+            largest = order
+        start = enclosed.find(1, start + 1)
+    for cell in largest:
+        enclosed[cell] = 0
+    return enclosed.replace(b"\2", b"\1")
+
+
+def verify(maze: Maze, vectorized: Optional[bool] = None) -> Verification:
+    """Verify ``maze``; see the module docstring for the checks.
+
+    ``vectorized`` forces or disables the NumPy path for the passage
+    graph, as in ``mazegen.analysis.analyze``.
+    """
+    width, height = maze.width, maze.height
+    size = width * height
+    dirs = direction_buffer(maze.walls, maze.blocked_cells, width, height,
+                            vectorized)
+    free = bytearray(b"\1") * size
+    for x, y in maze.blocked_cells:
+        if 0 <= x < width and 0 <= y < height:
+            free[y * width + x] = 0
+    popcount = bytes(bin(mask).count("1") for mask in range(256))
+    nbrs = neighbor_table(width)
+    result = Verification(
+        cells=size - free.count(0),
+        edges=sum(dirs.translate(popcount)) // 2,
+        components=count_components(nbrs, dirs, free),
+    )
+    if result.components > 1:
+        no_walls = [bytes(width)] * height
+        open_dirs = direction_buffer(no_walls, maze.blocked_cells, width,
+                                     height, vectorized)
+        result.enclosed = count_components(
+            nbrs, dirs, _enclosed_cells(nbrs, open_dirs, free))
+    _wall_defects(maze, result)
+    _pattern_defects(maze, result)
+    return result
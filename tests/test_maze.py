@@ -1,8 +1,25 @@
 """Test suite for maze generation and pathfinding."""
 
+import asyncio
+import hashlib
+import json
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from mazegen import (
+    analysis, dataset, dynamic, graph, hierarchy, instrument, mmap_maze,
+    moves, placement, search, service, shared, stencil, validate, vectorized,
+    verify)
 from mazegen.maze_generator import Maze
+from mazegen.output_writer import (
+    format_output, read_output_file, solve_moves, write_output_file)
 from mazegen.path_finder import bfs_find_path, path_to_moves
 from mazegen.parser import parse_dict
+from mazegen.random_source import draw_below, make_rng, random_sources
 
 
 def test_maze_creation() -> None:
@@ -78,3 +95,730 @@ def test_42_pattern() -> None:
     small_maze = Maze(5, 5)
     placed_small = small_maze.create_42_pattern()
     assert not placed_small
+
+
+def _assert_spanning_tree(maze: Maze) -> None:
+    """Assert the open passages form one tree over the open cells."""
+    open_edges = sum(
+        1
+        for y in range(maze.height)
+        for x in range(maze.width)
+        for bit in (maze.E, maze.S)
+        if not maze.walls[y][x] & bit
+    )
+    cells = maze.width * maze.height - len(maze.blocked_cells)
+    assert open_edges == cells - 1
+    assert all(maze.walls[y][x] == 15 for x, y in maze.blocked_cells)
+    end = (maze.width - 1, maze.height - 1)
+    assert bfs_find_path(maze, (0, 0), end) is not None
+
+
+def test_kruskal_generation() -> None:
+    """Test Kruskal generation yields a spanning tree."""
+    maze = Maze(30, 20)
+    maze.generate_maze(seed=7, algo="kruskal", perfect=True)
+    _assert_spanning_tree(maze)
+
+    config = parse_dict({
+        "width": 20,
+        "height": 15,
+        "entry": (0, 0),
+        "exit": (19, 14),
+        "perfect": True,
+        "output_file": "maze.txt",
+        "algo": "KRUSKAL",
+    })
+    assert config.algo == "kruskal"
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+@pytest.mark.parametrize("algo", ["binarytree", "sidewinder"])
+def test_row_generators(
+    monkeypatch: pytest.MonkeyPatch, algo: str, use_numpy: bool
+) -> None:
+    """Test Binary Tree and Sidewinder around the 42 pattern."""
+    if use_numpy and not vectorized.HAVE_NUMPY:
+        pytest.skip("numpy not installed")
+    monkeypatch.setattr(vectorized, "HAVE_NUMPY", use_numpy)
+    for seed in range(5):
+        maze = Maze(23, 17)
+        maze.generate_maze(seed=seed, algo=algo, perfect=True)
+        assert maze.pattern_origin is not None
+        _assert_spanning_tree(maze)
+
+    first, second = Maze(23, 17), Maze(23, 17)
+    first.generate_maze(seed=3, algo=algo)
+    second.generate_maze(seed=3, algo=algo)
+    assert first.walls == second.walls
+
+
+def test_tiled_generation() -> None:
+    """Test tiled generation is perfect and independent of workers."""
+    serial = Maze(30, 20)
+    serial.generate_maze(seed=5, algo="dfs", tile_size=7, workers=1)
+    _assert_spanning_tree(serial)
+
+    parallel = Maze(30, 20)
+    parallel.generate_maze(seed=5, algo="dfs", tile_size=7, workers=2)
+    assert parallel.walls == serial.walls
+    assert parallel.blocked_cells == serial.blocked_cells
+
+
+@pytest.mark.parametrize("algo, digest", [
+    ("dfs", "95ded00ebc179da0"),
+    ("prim", "80fdb324411f216e"),
+    ("hunt", "6a271965370da748"),
+])
+def test_seeded_output_is_stable(algo: str, digest: str) -> None:
+    """Test seeded dfs/prim/hunt output is stable (hunt since its fix)."""
+    maze = Maze(21, 17)
+    maze.generate_maze(seed=42, algo=algo, perfect=False)
+    cells = bytes(cell for row in maze.walls for cell in row)
+    assert hashlib.sha256(cells).hexdigest()[:16] == digest
+
+
+@pytest.mark.parametrize("source", random_sources())
+def test_random_sources(source: str) -> None:
+    """Test every random source is deterministic and in range."""
+    draws = draw_below(make_rng(source, 9), 3)
+    values = [draws() for _ in range(2000)]
+    assert set(values) == {0, 1, 2}
+    again = draw_below(make_rng(source, 9), 3)
+    assert values == [again() for _ in range(2000)]
+
+    first, second = Maze(25, 15), Maze(25, 15)
+    first.generate_maze(seed=1, algo="dfs", random_source=source)
+    second.generate_maze(seed=1, algo="dfs", random_source=source)
+    assert first.walls == second.walls
+    _assert_spanning_tree(first)
+
+
+def test_block_source_keeps_prim_output() -> None:
+    """Test the block source only changes draws made through below()."""
+    std, block = Maze(25, 15), Maze(25, 15)
+    std.generate_maze(seed=2, algo="prim", perfect=False)
+    block.generate_maze(seed=2, algo="prim", perfect=False,
+                        random_source="block")
+    assert std.walls == block.walls
+
+
+def test_instrumentation_report(tmp_path: Path) -> None:
+    """Instrumentation records nested spans and counters when enabled."""
+    report = tmp_path / "profile.json"
+    instrument.enable(None)
+    try:
+        maze = Maze(20, 15)
+        maze.generate_maze(seed=3, algo="dfs", perfect=False)
+        write_output_file(str(tmp_path / "maze.txt"), maze, (0, 0), (19, 14))
+        instrument.dump(str(report))
+    finally:
+        instrument.disable()
+        instrument.reset()
+
+    data = json.loads(report.read_text())
+    assert {"generate", "generate;pattern", "generate;carve",
+            "generate;loops", "bfs", "write", "write;hex_encode"} <= set(
+                data["spans"])
+    counters = data["counters"]
+    assert counters["cells_carved"] == 20 * 15 - len(maze.blocked_cells)
+    assert counters["bytes_written"] == (tmp_path / "maze.txt").stat().st_size
+    assert counters["bfs_nodes_visited"] > 0
+    assert data["maxima"]["max_stack"] > 1
+    folded = (tmp_path / "profile.json.folded").read_text().splitlines()
+    assert "generate;carve" in {line.rsplit(" ", 1)[0] for line in folded}
+    assert instrument.span("idle") is instrument.span("other")
+
+
+async def _http(port: int, method: str, target: str,
+                body: bytes = b"") -> Tuple[int, bytes]:
+    """Send one HTTP request to the service and de-chunk the reply."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"{method} {target} HTTP/1.1\r\nHost: x\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    raw = await reader.read()
+    writer.close()
+    head, _, rest = raw.partition(b"\r\n\r\n")
+    data = b""
+    while True:
+        size_line, _, rest = rest.partition(b"\r\n")
+        size = int(size_line, 16)
+        if not size:
+            break
+        data, rest = data + rest[:size], rest[size + 2:]
+    return int(head.split()[1]), data
+
+
+def test_service(tmp_path: Path) -> None:
+    """The service streams output, coalesces duplicates and sheds load."""
+    request = {"WIDTH": 40, "HEIGHT": 30, "ENTRY": [0, 0],
+               "EXIT": [39, 29], "PERFECT": True, "SEED": 5}
+
+    async def scenario() -> Tuple[List[Tuple[int, bytes]], Dict[str, Any]]:
+        svc = service.MazeService(workers=1, max_pending=1)
+        server = await asyncio.start_server(svc.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        body = json.dumps(request).encode()
+        other = json.dumps(dict(request, SEED=6)).encode()
+        try:
+            replies = await asyncio.gather(
+                _http(port, "POST", "/generate", body),
+                _http(port, "POST", "/generate", body),
+                _http(port, "POST", "/generate", other),
+            )
+            replies.append(await _http(port, "POST", "/generate?format=binary",
+                                       body))
+            replies.append(await _http(port, "POST", "/solve", body))
+            metrics = json.loads((await _http(port, "GET", "/metrics"))[1])
+        finally:
+            server.close()
+            svc.close()
+        return list(replies), metrics
+
+    replies, metrics = asyncio.run(scenario())
+    maze = Maze(40, 30)
+    maze.generate_maze(seed=5, algo="dfs", perfect=True)
+    moves = write_output_file(str(tmp_path / "m.txt"), maze, (0, 0), (39, 29))
+    expected = (tmp_path / "m.txt").read_bytes()
+
+    assert replies[0] == replies[1] == (200, expected)
+    assert replies[2][0] == 503
+    status, binary = replies[3]
+    assert status == 200
+    header = service.BINARY_HEADER.unpack_from(binary)
+    assert header == (b"AMZ1", 40, 30, 0, 0, 39, 29)
+    cells = binary[service.BINARY_HEADER.size:][:40 * 30]
+    assert cells == b"".join(bytes(row) for row in maze.walls)
+    assert json.loads(replies[4][1]) == {
+        "moves": moves, "length": len(moves), "entry": [0, 0],
+        "exit": [39, 29]}
+    assert metrics["coalesced"] == 1 and metrics["rejected"] == 1
+    assert metrics["queue_depth"] == 0
+    assert metrics["latency_ms"]["samples"] == 4
+
+    with pytest.raises(ValueError, match="LOOPS"):
+        service.config_from_json(dict(request, PERFECT=False, LOOPS=True))
+    with pytest.raises(ValueError, match="limited to 1000 cells"):
+        service.config_from_json(request, max_cells=1000)
+
+
+@pytest.mark.parametrize("perfect", [True, False])
+def test_analysis(tmp_path: Path, perfect: bool) -> None:
+    """Statistics agree with BFS, the file reader and the NumPy path."""
+    maze = Maze(25, 19)
+    maze.generate_maze(seed=11, algo="kruskal", perfect=perfect)
+    out = tmp_path / "maze.txt"
+    moves = write_output_file(str(out), maze, (0, 0), (24, 18))
+
+    stats = analysis.analyze(maze, (0, 0), (24, 18), vectorized=False)
+    assert stats.solution_length == len(moves)
+    assert stats.open_cells == 25 * 19 - len(maze.blocked_cells)
+    assert stats.loops == (
+        stats.passages - stats.open_cells + stats.components)
+    assert (stats.loops == 0) == perfect
+    assert sum(k * v for k, v in stats.corridor_lengths.items()) == (
+        stats.passages)
+    assert analysis.analyze_file(str(out), vectorized=False) == stats
+    if vectorized.HAVE_NUMPY:
+        assert analysis.analyze_file(str(out), vectorized=True) == stats
+
+
+def _long_solution(stats: analysis.MazeStats) -> bool:
+    """Predicate used by the seed search test."""
+    return (stats.solution_length or 0) >= 100
+
+
+def test_seed_search() -> None:
+    """Seed search returns the same first matches for any worker count."""
+    criteria = ["solution_length>=68", "dead_ends<=290"]
+    serial = search.search_seeds(30, 30, criteria, matches=3, workers=1,
+                                 limit=200, chunk_size=4)
+    parallel = search.search_seeds(30, 30, criteria, matches=3, workers=2,
+                                   limit=200, chunk_size=4)
+    assert [m.seed for m in serial] == [m.seed for m in parallel]
+    assert len(serial) == 3
+    for match in serial:
+        assert match.stats.solution_length is not None
+        assert match.stats.solution_length >= 68
+        assert match.stats.dead_ends <= 290
+
+    found = search.search_seeds(20, 20, [_long_solution], algo="dfs",
+                                workers=1, limit=50)
+    assert found and found[0].stats.solution_length >= 100
+    with pytest.raises(ValueError):
+        search.Criterion.parse("moves>3")
+
+
+@pytest.mark.parametrize("encoding", moves.MOVE_ENCODINGS)
+def test_move_encodings(tmp_path: Path, encoding: str) -> None:
+    """Every move encoding round-trips through the writer and reader."""
+    for plain in ["", "E", "EEEESNN", "NESW" * 7 + "SSSSSSSSSSSS"]:
+        encoded = moves.encode_moves(plain, encoding)
+        assert moves.decode_moves(encoded) == plain
+        assert moves.decode_moves(encoded, encoding) == plain
+
+    maze = Maze(30, 20)
+    maze.generate_maze(seed=4, algo="dfs", perfect=True)
+    out = tmp_path / "maze.txt"
+    solution = write_output_file(str(out), maze, (0, 0), (29, 19), encoding)
+    path = bfs_find_path(maze, (0, 0), (29, 19))
+    assert path is not None and solution == path_to_moves(path)
+    assert moves.flat_path_to_moves(
+        [y * 30 + x for x, y in path], 30) == solution
+    loaded, _, _, decoded = read_output_file(str(out))
+    assert decoded == solution and loaded.walls == maze.walls
+    with pytest.raises(ValueError):
+        moves.decode_moves("E4X")
+    with pytest.raises(ValueError):
+        moves.rle_decode("E0S")
+
+    column = Maze(1, 5)
+    column.generate_maze(seed=1)
+    assert solve_moves(column, (0, 4), (0, 0)) == "NNNN"
+    assert solve_moves(column, (0, 0), (0, 4)) == "SSSS"
+
+
+@pytest.mark.parametrize("suffix, module", [
+    (".gz", "gzip"), (".bz2", "bz2"), (".xz", "lzma")])
+@pytest.mark.parametrize("threaded", [False, True])
+def test_compressed_output(
+    tmp_path: Path, suffix: str, module: str, threaded: bool
+) -> None:
+    """Compressed files decompress to the plain output and read back."""
+    codec = __import__(module)
+    maze = Maze(40, 25)
+    maze.generate_maze(seed=9, algo="prim", perfect=True)
+    plain = tmp_path / "maze.txt"
+    packed = tmp_path / ("maze" + suffix)
+    write_output_file(str(plain), maze, (0, 0), (39, 24))
+    moves_out = write_output_file(str(packed), maze, (0, 0), (39, 24),
+                                  threaded=threaded)
+    assert codec.decompress(packed.read_bytes()) == plain.read_bytes()
+    loaded, entry, exit_pos, decoded = read_output_file(str(packed))
+    assert loaded.walls == maze.walls and decoded == moves_out
+    assert (entry, exit_pos) == ((0, 0), (39, 24))
+
+    renamed = tmp_path / "renamed.txt"
+    write_output_file(str(renamed), maze, (0, 0), (39, 24),
+                      compression="gzip")
+    assert read_output_file(str(renamed))[0].walls == maze.walls
+
+
+def test_streaming_validator(tmp_path: Path) -> None:
+    """The validator accepts real output and reports broken files."""
+    maze = Maze(24, 16)
+    maze.generate_maze(seed=6, algo="hunt", perfect=False)
+    good = tmp_path / "maze.txt.gz"
+    write_output_file(str(good), maze, (0, 0), (23, 15))
+    result = validate.validate_file(str(good))
+    assert result.ok and (result.width, result.height) == (24, 16)
+
+    lines = format_output(
+        maze, (0, 0), (23, 15), "E").splitlines(keepends=True)
+    lines[3] = "0" + lines[3][1:]
+    lines[5] = lines[5][:-2] + "\n"
+    kinds = {(i.kind, i.line) for i in validate.validate_lines(lines).issues}
+    assert {("border", 4), ("mismatch", 4), ("width", 6),
+            ("trailer", 20)} <= kinds
+
+    capped = validate.validate_lines(lines[:16], max_issues=1)
+    assert capped.issue_count > 1 and len(capped.issues) == 1
+    assert validate.validate_lines(lines[:17]).issues[-1].message == (
+        "missing entry line")
+    assert validate.validate_lines([]).issues[0].kind == "empty"
+
+
+def test_bulk_validation(tmp_path: Path, capsys: Any) -> None:
+    """Bulk validation expands directories and globs and can stop early."""
+    maze = Maze(12, 9)
+    for seed in range(5):
+        maze.generate_maze(seed=seed, algo="dfs", perfect=True)
+        sub = tmp_path / ("gz" if seed % 2 else "plain")
+        sub.mkdir(exist_ok=True)
+        suffix = ".txt.gz" if seed % 2 else ".txt"
+        write_output_file(str(sub / f"m{seed}{suffix}"), maze, (0, 0),
+                          (11, 8))
+    bad = tmp_path / "plain" / "m1_bad.txt"
+    bad.write_text("7\n\n0,0\n0,0\n\n")
+
+    paths = validate.expand_paths([str(tmp_path / "plain"),
+                                   str(tmp_path / "**" / "*.gz")])
+    assert len(paths) == 6 and paths[1] == str(bad)
+    reports = list(validate.validate_many(paths, workers=2, chunk_size=2))
+    assert [r.path for r in reports] == paths
+    assert [r.ok for r in reports] == [True, False, True, True, True, True]
+
+    stopped = list(validate.validate_many(paths, workers=1, fail_fast=True))
+    assert len(stopped) == 2 and not stopped[-1].ok
+    assert validate.main([str(tmp_path), "--quiet", "--workers", "1"]) == 1
+    out = capsys.readouterr().out
+    assert "m1_bad.txt: FAILED" in out and "6 of 6 files checked" in out
+
+
+@pytest.mark.parametrize("perfect", [True, False])
+def test_verify_generated_mazes(perfect: bool) -> None:
+    """Generated mazes are connected, and perfect ones spanning trees."""
+    for algo in ["dfs", "prim", "hunt", "kruskal", "binarytree",
+                 "sidewinder"]:
+        maze = Maze(31, 23)
+        maze.generate_maze(seed=8, algo=algo, perfect=perfect)
+        result = verify.verify(maze)
+        assert result.cells == 31 * 23 - len(maze.blocked_cells)
+        result.check(perfect)
+        assert verify.verify(maze, vectorized=True) == result
+
+
+def test_verify_reports_defects(monkeypatch: Any) -> None:
+    """Broken walls, borders and pattern cells are reported."""
+    maze = Maze(20, 15)
+    maze.generate_maze(seed=2, algo="dfs", perfect=True)
+    assert verify.verify(maze).perfect
+    maze.walls[0][3] &= ~Maze.N
+    maze.walls[5][5] &= ~Maze.E
+    x, y = min(maze.blocked_cells)
+    maze.walls[y][x] = 0
+    result = verify.verify(maze)
+    assert result.border_openings == [(3, 0)]
+    assert result.mismatched_walls >= 1 and result.pattern_openings
+    with pytest.raises(verify.MazeVerificationError):
+        result.check()
+
+    monkeypatch.setattr("mazegen.maze_generator.VERIFY", True)
+    maze.generate_maze(seed=2, algo="prim", perfect=True)
+    # Perfect hunt mazes and cells the pattern walls in against the
+    # border pass the hook.
+    hunted = Maze(31, 23)
+    hunted.generate_maze(seed=8, algo="hunt", perfect=True)
+    assert verify.verify(hunted).perfect
+    narrow = Maze(8, 10)
+    narrow.generate_maze(seed=39, algo="prim", perfect=True)
+    result = verify.verify(narrow)
+    assert result.components == 3 and result.enclosed == 2
+    monkeypatch.setattr(Maze, "_dfs_algo", lambda self, rng: None)
+    with pytest.raises(verify.MazeVerificationError, match="disconnected"):
+        maze.generate_maze(seed=2, algo="dfs", perfect=True)
+
+
+@pytest.mark.parametrize("border", [False, True])
+def test_auto_entry_exit(tmp_path: Path, border: bool) -> None:
+    """Auto placement finds the farthest pair that brute force finds."""
+    config = parse_dict({"width": 15, "height": 11, "entry": "auto",
+                         "exit": "AUTO", "output_file": "x.txt",
+                         "perfect": True, "auto_border": border})
+    assert config.entry is None and config.exit is None
+    maze = Maze(15, 11)
+    maze.generate_maze(seed=3, algo="prim", perfect=True)
+    entry, exit_pos = placement.place_entry_exit(
+        maze, config.entry, config.exit, config.auto_border)
+    cells = [(x, y) for y in range(11) for x in range(15)
+             if (x, y) not in maze.blocked_cells
+             and (not border or x in (0, 14) or y in (0, 10))]
+    lengths = [len(bfs_find_path(maze, a, b) or [])
+               for i, a in enumerate(cells) for b in cells[i + 1:]]
+    path = bfs_find_path(maze, entry, exit_pos)
+    assert path is not None and len(path) == max(lengths)
+    assert entry in cells and exit_pos in cells
+
+    _, far = placement.place_entry_exit(maze, (7, 0), None, border)
+    assert len(bfs_find_path(maze, (7, 0), far) or []) == max(
+        len(bfs_find_path(maze, (7, 0), cell) or []) for cell in cells)
+
+    # An enclosed, uncarved first cell and a blocked explicit EXIT.
+    corner = stencil.Stencil.from_text(".#...\n##...\n\n\n.....\n")
+    walled = Maze(5, 5)
+    walled.generate_maze(seed=1, algo="kruskal", stencil=corner)
+    entry, exit_pos = placement.farthest_pair(walled, border)
+    assert (0, 0) not in (entry, exit_pos)
+    assert bfs_find_path(walled, entry, exit_pos)
+    with pytest.raises(ValueError, match="EXIT is on a blocked cell"):
+        placement.place_entry_exit(walled, None, (1, 0), border)
+
+
+@pytest.mark.skipif(not vectorized.HAVE_NUMPY, reason="needs numpy")
+@pytest.mark.parametrize("small_frontier", [1, 64])
+def test_level_synchronous_bfs(monkeypatch: Any, small_frontier: int) -> None:
+    """The level-by-level search returns the queue-based paths."""
+    monkeypatch.setattr(vectorized, "SMALL_FRONTIER", small_frontier)
+    for algo, perfect in [("dfs", True), ("kruskal", False),
+                          ("sidewinder", False)]:
+        maze = Maze(37, 29)
+        maze.generate_maze(seed=12, algo=algo, perfect=perfect)
+        for start, end in [((0, 0), (36, 28)), ((20, 3), (1, 27)),
+                           ((5, 5), (5, 5))]:
+            assert bfs_find_path(maze, start, end, vectorize=True) == (
+                bfs_find_path(maze, start, end, vectorize=False))
+        dist, parent_dir = vectorized.bfs_levels(maze, 0)
+        stats = analysis.analyze(maze, (0, 0), (36, 28))
+        assert dist[28 * 37 + 36] == stats.solution_length
+        assert (dist >= 0).sum() == stats.open_cells
+        assert parent_dir[0] == -1 and (parent_dir[dist > 0] >= 0).all()
+    blocked = next(iter(maze.blocked_cells))
+    assert bfs_find_path(maze, (0, 0), blocked, vectorize=True) is None
+
+
+def test_shared_memory_maze() -> None:
+    """A published maze is seen unchanged, read-only, by other processes."""
+    maze = Maze(45, 33)
+    maze.generate_maze(seed=13, algo="prim", perfect=False)
+    expected = analysis.analyze(maze, (0, 0), (44, 32))
+    with shared.SharedMaze(maze) as published:
+        with published.view() as view:
+            assert [bytes(row) for row in view.walls] == [
+                bytes(row) for row in maze.walls]
+            assert view.blocked_cells == maze.blocked_cells
+            assert view.pattern_origin == maze.pattern_origin
+            assert bfs_find_path(view, (0, 0), (44, 32)) == bfs_find_path(
+                maze, (0, 0), (44, 32))
+            with pytest.raises(TypeError):
+                view.walls[0][0] = 0
+        assert len(pickle.dumps(published)) < 100
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            stats = pool.submit(
+                analysis.analyze, published, (0, 0), (44, 32)).result()
+        assert stats == expected
+    with pytest.raises(FileNotFoundError):
+        shared.attach(published.name)
+
+
+@pytest.mark.parametrize("suffix", [".csr", ".npz"])
+def test_csr_export(tmp_path: Path, suffix: str) -> None:
+    """CSR arrays list every passage both ways and reload unchanged."""
+    maze = Maze(26, 18)
+    maze.generate_maze(seed=7, algo="kruskal", perfect=False)
+    csr = graph.to_csr(maze, vectorized=False)
+    stats = analysis.analyze(maze)
+    assert csr.num_nodes == 26 * 18 and csr.num_edges == stats.passages
+    for x, y in maze.blocked_cells:
+        assert csr.neighbors(y * 26 + x) == []
+    start = 5 * 26 + 4
+    expected = [(4 + dx) + (5 + dy) * 26 for dx, dy, bit, _ in sorted(
+        Maze.dirs, key=lambda d: (d[1], d[0])) if not maze.walls[5][4] & bit]
+    assert csr.neighbors(start) == expected
+    path = str(tmp_path / ("maze" + suffix))
+    if vectorized.HAVE_NUMPY:
+        fast = graph.to_csr(maze)
+        assert list(fast.indptr) == list(csr.indptr)
+        assert list(fast.indices) == list(csr.indices)
+    elif suffix == ".npz":
+        pytest.skip("needs numpy")
+    graph.save_csr(csr, path)
+    loaded = graph.load_csr(path)
+    assert (loaded.width, loaded.height) == (26, 18)
+    assert list(loaded.indptr) == list(csr.indptr)
+    assert list(loaded.indices) == list(csr.indices)
+
+
+def test_dataset_writer(tmp_path: Path) -> None:
+    """Dataset records match direct generation and resume after a cut."""
+    path = str(tmp_path / "mazes.amzd")
+    assert dataset.write_dataset(path, 9, 7, 6, seed_start=40,
+                                 algo="dfs", workers=1, chunk_size=4) == 6
+    size = dataset.DatasetSpec(9, 7, 6, 40, "dfs").record_size
+    with open(path, "r+b") as f:
+        for index in (1, 4):
+            f.seek(dataset.DATASET_HEADER.size + index * size)
+            f.write(bytes(size))
+    assert dataset.write_dataset(path, 9, 7, 6, seed_start=40,
+                                 algo="dfs", workers=2, chunk_size=1) == 2
+    with pytest.raises(ValueError):
+        dataset.write_dataset(path, 9, 7, 6, algo="prim", workers=1)
+    with pytest.raises(ValueError):
+        dataset.write_dataset(str(tmp_path / "long.amzd"), 9, 7, 1,
+                              random_source="x" * 17, workers=1)
+    with dataset.MazeDataset(path) as data:
+        assert len(data) == 6 and data.missing() == []
+        for index in range(6):
+            maze = Maze(9, 7)
+            maze.generate_maze(seed=40 + index, algo="dfs")
+            record = data[index]
+            assert record.seed == 40 + index
+            assert record.maze.walls == maze.walls
+            assert record.maze.blocked_cells == maze.blocked_cells
+            path_len = len(bfs_find_path(maze, (0, 0), (8, 6)) or []) - 1
+            assert record.solution_length == path_len
+        if vectorized.HAVE_NUMPY:
+            table = data.as_numpy()
+            assert table["done"].all()
+            with data.walls(3) as walls:
+                assert bytes(table["walls"][3]) == bytes(walls)
+            assert table["solution_length"][5] == data[5].solution_length
+        walls = data.walls(2)
+        expected = b"".join(map(bytes, data[2].maze.walls))
+    # Views outliving the context keep the mapping readable.
+    assert bytes(walls) == expected
+
+
+@pytest.mark.parametrize("region", [(3, 2, 9, 6), (0, 0, 30, 20),
+                                    (10, 4, 1, 12), (0, 15, 30, 5)])
+def test_regenerate_region(region: Tuple[int, int, int, int]) -> None:
+    """Only the region changes and a perfect maze stays perfect."""
+    x0, y0, width, height = region
+    for seed, algo in enumerate(("dfs", "kruskal", "sidewinder")):
+        maze = Maze(30, 20)
+        maze.generate_maze(seed=seed, algo=algo)
+        before = [row[:] for row in maze.walls]
+        maze.regenerate_region(x0, y0, width, height, seed=seed + 50,
+                               algo="prim")
+        assert verify.verify(maze).perfect
+        for y in range(20):
+            for x in range(30):
+                dx = max(x0 - x, 0, x - (x0 + width - 1))
+                dy = max(y0 - y, 0, y - (y0 + height - 1))
+                if dx + dy > 1:
+                    assert maze.walls[y][x] == before[y][x]
+        maze.regenerate_region(x0, y0, width, height, seed=1,
+                               perfect=False)
+        result = verify.verify(maze)
+        assert result.connected and not result.problems()
+    with pytest.raises(ValueError):
+        Maze(30, 20).regenerate_region(25, 0, 6, 2)
+
+
+@pytest.mark.parametrize("fraction", [0.02, 1.0])
+def test_dynamic_solver(fraction: float) -> None:
+    """Incremental repairs match a fresh search after every wall edit."""
+    maze = Maze(20, 15)
+    maze.generate_maze(seed=11, algo="dfs", perfect=False)
+    solver = dynamic.DynamicSolver(maze, (0, 0), (19, 14), fraction)
+    rng = make_rng("std", 3)
+    free = [(x, y) for y in range(15) for x in range(20)
+            if (x, y) not in maze.blocked_cells]
+    edits = 0
+    while edits < 150:
+        x, y = rng.choice(free)
+        bit = rng.choice([Maze.N, Maze.E, Maze.S, Maze.W])
+        try:
+            if rng.random() < 0.5:
+                solver.open_wall(x, y, bit)
+            else:
+                solver.close_wall(x, y, bit)
+        except ValueError:
+            continue
+        edits += 1
+        expected = bfs_find_path(maze, (0, 0), (19, 14))
+        path = solver.path
+        assert (path is None) == (expected is None)
+        if path and expected:
+            assert len(path) == len(expected)
+            assert path[0] == (0, 0) and path[-1] == (19, 14)
+            assert all(not maze.walls[ay][ax] & bit
+                       for (ax, ay), (bx, by) in zip(path, path[1:])
+                       for dx, dy, bit, _ in Maze.dirs
+                       if (ax + dx, ay + dy) == (bx, by))
+            assert solver.distance((19, 14)) == len(path) - 1
+    assert (solver.full_searches > 1) == (fraction < 0.5)
+    with pytest.raises(ValueError):
+        maze.set_wall(0, 0, Maze.N, closed=False)
+
+
+def test_cluster_index() -> None:
+    """Hierarchical queries are shortest paths; the cache follows edits."""
+    maze = Maze(45, 37)
+    maze.generate_maze(seed=21, algo="prim", perfect=False)
+    index = hierarchy.index_for(maze, cluster_size=8)
+    assert hierarchy.index_for(maze, cluster_size=8) is index
+    parallel = hierarchy.ClusterIndex(maze, cluster_size=8, workers=2)
+    assert parallel.edges == index.edges
+    rng = make_rng("std", 4)
+    free = [(x, y) for y in range(37) for x in range(45)
+            if (x, y) not in maze.blocked_cells]
+    for _ in range(30):
+        start, goal = rng.choice(free), rng.choice(free)
+        path = index.find_path(start, goal)
+        expected = bfs_find_path(maze, start, goal)
+        assert path is not None and expected is not None
+        assert len(path) == len(expected)
+        assert path[0] == start and path[-1] == goal
+        assert len(path_to_moves(path)) == len(path) - 1
+    maze.set_wall(0, 0, Maze.E, closed=True)
+    maze.set_wall(0, 0, Maze.S, closed=True)
+    assert hierarchy.index_for(maze, cluster_size=8) is not index
+    assert hierarchy.find_path(maze, (0, 0), (44, 36), 8) is None
+
+
+@pytest.mark.parametrize("algo", ["sidewinder", "dfs"])
+def test_mmap_maze(tmp_path: Path, algo: str) -> None:
+    """A file-backed maze matches an in-memory one and reopens intact."""
+    path = str(tmp_path / "maze.amzm")
+    expected = Maze(33, 21)
+    expected.generate_maze(seed=8, algo=algo)
+    with mmap_maze.MmapMaze.create(path, 33, 21) as maze:
+        maze.generate_maze(seed=8, algo=algo)
+        assert [list(row) for row in maze.walls] == expected.walls
+        out = str(tmp_path / "maze.txt")
+        moves = write_output_file(out, maze, (0, 0), (32, 20))
+    reopened = pickle.loads(pickle.dumps(
+        mmap_maze.MmapMaze(path, writable=False)))
+    assert reopened.blocked_cells == expected.blocked_cells
+    assert bfs_find_path(reopened, (0, 0), (32, 20)) == bfs_find_path(
+        expected, (0, 0), (32, 20))
+    assert verify.verify(reopened).perfect
+    assert validate.validate_file(out).ok
+    assert moves == solve_moves(expected, (0, 0), (32, 20))
+    with pytest.raises(TypeError):
+        reopened.walls[0][0] = 0
+    reopened.close()
+
+
+@pytest.mark.parametrize("algo", ["prim", "sidewinder"])
+def test_loops_and_braid(algo: str) -> None:
+    """Exact loop counts, braiding, and the matching config keys."""
+    maze = Maze(31, 23)
+    for source in random_sources():
+        maze.generate_maze(seed=4, algo=algo, perfect=False, loops=25,
+                           random_source=source)
+        assert verify.verify(maze).cycles == 25
+    open_cells = 31 * 23 - len(maze.blocked_cells)
+    maze.generate_maze(seed=4, algo=algo, perfect=False, loop_density=0.1)
+    assert verify.verify(maze).cycles == round(0.1 * open_cells)
+
+    def dead_ends(m: Maze) -> int:
+        return sum(1 for y, row in enumerate(m.walls)
+                   for x, cell in enumerate(row)
+                   if not m.is_blocked(x, y) and bin(cell).count("1") == 3)
+
+    maze.generate_maze(seed=4, algo=algo)
+    before = dead_ends(maze)
+    maze.generate_maze(seed=4, algo=algo, perfect=False, braid=0.5)
+    assert before // 2 - 1 <= before - dead_ends(maze) <= before // 2 + 2
+    assert verify.verify(maze).connected
+    with pytest.raises(ValueError):
+        maze.generate_maze(seed=4, perfect=False, loops=10 ** 6)
+    base = {"width": 20, "height": 15, "entry": (0, 0), "exit": (19, 14),
+            "output_file": "maze.txt", "perfect": False}
+    assert parse_dict({**base, "loops": 5, "braid": 0.5}).braid == 0.5
+    for bad in ({"loops": -1}, {"braid": 2.0},
+                {"loops": 3, "loop_density": 0.1},
+                {"loops": 3, "perfect": True}):
+        with pytest.raises(ValueError):
+            parse_dict({**base, **bad})
+
+
+def test_stencil(tmp_path: Path) -> None:
+    """Stencils load, scale and place obstacles stored as row bitsets."""
+    logo = {(dx, dy) for dx, dy in Maze.four_pattern} | {
+        (5 + dx, dy) for dx, dy in Maze.two_pattern}
+    assert set(stencil.LOGO_42.cells()) == logo
+    text = stencil.Stencil.from_text("#.#\n.#\n")
+    assert stencil.Stencil.from_pbm(b"P1\n# comment\n3 2\n1 0 1\n010\n") \
+        == text
+    path = tmp_path / "shape.pbm"
+    path.write_bytes(text.scaled(3).to_pbm())
+    shape = stencil.Stencil.load(str(path))
+    assert (shape.width, shape.height, shape.count) == (9, 6, 27)
+
+    maze = Maze(40, 30)
+    maze.generate_maze(seed=5, algo="kruskal", stencil=shape)
+    assert maze.blocked_cells == {(16 + x, 12 + y) for x, y in shape.cells()}
+    assert maze.is_blocked(16, 12) and not maze.is_blocked(-1, 12)
+    assert verify.verify(maze).perfect
+    with pytest.raises(ValueError):
+        Maze(8, 5).generate_maze(seed=5, stencil=shape)
+
+    blank = Maze(40, 30)
+    assert blank.apply_stencil(shape, (31, 0)) == (31, 0)
+    assert blank.apply_stencil(shape, (31, 24)) == (31, 24)
+    assert len(blank.blocked_cells) == 2 * shape.count
+    assert blank.is_blocked(31, 0) and not blank.is_blocked(34, 1)
+    with pytest.raises(ValueError):
+        blank.apply_stencil(shape, (35, 0))